@@ -4,7 +4,7 @@ from django.contrib.auth.forms import UserCreationForm
 from django.conf import settings
 import os
 from .models import Profile
-from .utils import get_allowed_email_domains
+from .utils import get_domain_matcher
 
 class UserRegisterForm(UserCreationForm):
     email = forms.EmailField()
@@ -17,14 +17,11 @@ class UserRegisterForm(UserCreationForm):
         email = self.cleaned_data.get('email')
         if email:
             domain = email.split('@')[-1]
-            allowed_domains = get_allowed_email_domains()
+            matcher = get_domain_matcher()
             
-            if allowed_domains and domain not in allowed_domains:
-                allowed_domains_str = ', '.join(allowed_domains[:5])
-                if len(allowed_domains) > 5:
-                    allowed_domains_str += f" and {len(allowed_domains) - 5} more"
+            if matcher and not matcher.matches(domain):
                 raise forms.ValidationError(
-                    f"Registration is restricted to approved email domains. Currently allowed: {allowed_domains_str}"
+                    f"Registration is restricted to approved email domains. Currently allowed: {matcher.describe()}"
                 )
         return email
 
@@ -39,14 +36,11 @@ class UserUpdateForm(forms.ModelForm):
         email = self.cleaned_data.get('email')
         if email:
             domain = email.split('@')[-1]
-            allowed_domains = get_allowed_email_domains()
+            matcher = get_domain_matcher()
             
-            if allowed_domains and domain not in allowed_domains:
-                allowed_domains_str = ', '.join(allowed_domains[:5])
-                if len(allowed_domains) > 5:
-                    allowed_domains_str += f" and {len(allowed_domains) - 5} more"
+            if matcher and not matcher.matches(domain):
                 raise forms.ValidationError(
-                    f"Email addresses must use an approved domain. Currently allowed: {allowed_domains_str}"
+                    f"Email addresses must use an approved domain. Currently allowed: {matcher.describe()}"
                 )
         return email
 
@@ -60,7 +54,7 @@ class ProfileUpdateForm(forms.ModelForm):
     
     class Meta:
         model = Profile
-        fields = ['image', 'job_title', 'department']
+        fields = ['image', 'job_title', 'department', 'email_digest']
     
     def clean_image(self):
         image = self.cleaned_data.get('image')
@@ -0,0 +1,74 @@
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import Profile, THUMBNAIL_SIZES
+
+THUMBNAIL_DIR = 'profile_pics/thumbs'
+
+
+def crop_to_square(img):
+    """Crop an image to a centred square."""
+    if img.width == img.height:
+        return img
+    side = min(img.width, img.height)
+    left = (img.width - side) // 2
+    top = (img.height - side) // 2
+    return img.crop((left, top, left + side, top + side))
+
+
+def make_thumbnails(content, digest, storage):
+    """
+    Write a square JPEG thumbnail for each of THUMBNAIL_SIZES and return
+    {size: storage name}. Names are derived from the content hash, so the
+    same picture uploaded twice reuses the existing files.
+    """
+    img = Image.open(BytesIO(content))
+    img = crop_to_square(ImageOps.exif_transpose(img)).convert('RGB')
+
+    thumbnails = {}
+    for size in THUMBNAIL_SIZES:
+        name = f'{THUMBNAIL_DIR}/{digest[:32]}_{size}.jpg'
+        if not storage.exists(name):
+            thumb = img.resize((min(size, img.width),) * 2, Image.LANCZOS)
+            buffer = BytesIO()
+            thumb.save(buffer, 'JPEG', quality=85)
+            name = storage.save(name, ContentFile(buffer.getvalue()))
+        thumbnails[str(size)] = name
+    return thumbnails
+
+
+def process_profile_image(profile_id):
+    """
+    Build the thumbnails for a profile whose image changed and return a
+    short status. Work is skipped when the file's content hash matches the
+    one the current thumbnails were made from.
+    """
+    profile = Profile.objects.filter(pk=profile_id).first()
+    if profile is None or not profile.image_pending:
+        return 'skipped'
+    image_name = profile.image.name
+    changes = {'image_pending': False}
+
+    try:
+        with profile.image.open('rb') as handle:
+            content = handle.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if digest == profile.image_hash and profile.thumbnails:
+            status = 'unchanged'
+        else:
+            changes.update(
+                image_hash=digest,
+                thumbnails=make_thumbnails(content, digest, profile.image.storage)
+            )
+            status = 'processed'
+    except Exception as e:
+        # Unreadable or unsupported images (e.g. SVG) keep using the original
+        changes.update(image_hash='', thumbnails={})
+        status = f'failed: {e}'
+
+    # Leave the profile pending if another image was uploaded meanwhile
+    Profile.objects.filter(pk=profile_id, image=image_name).update(**changes)
+    return status
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from accounts.models import Profile
+from accounts.images import process_profile_image
+import time
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails for profile images that changed since they were last processed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process the profiles that are currently pending and exit'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Seconds to wait between polls when nothing is pending (default: 5)'
+        )
+
+    def handle(self, *args, **kwargs):
+        processed = 0
+        try:
+            while True:
+                pending = list(Profile.objects.filter(image_pending=True).values_list('pk', flat=True)[:100])
+                for profile_id in pending:
+                    status = process_profile_image(profile_id)
+                    self.stdout.write(f'Profile {profile_id}: {status}')
+                    processed += 1
+                if pending:
+                    continue
+                if kwargs['once']:
+                    break
+                time.sleep(kwargs['interval'])
+        except KeyboardInterrupt:
+            pass
+        
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} profile images'))
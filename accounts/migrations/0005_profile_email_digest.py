@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_alter_profile_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='email_digest',
+            field=models.BooleanField(default=False, help_text='Receive tag and comment notifications as one periodic digest email'),
+        ),
+    ]
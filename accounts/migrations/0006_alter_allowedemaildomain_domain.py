@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_profile_email_digest'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='allowedemaildomain',
+            name='domain',
+            field=models.CharField(help_text="Domain name without @ (e.g., 'company.com'), or '*.company.com' to allow any subdomain", max_length=100, unique=True),
+        ),
+    ]
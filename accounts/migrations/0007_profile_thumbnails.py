@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:30
+
+from django.db import migrations, models
+
+
+def queue_existing_images(apps, schema_editor):
+    # Let process_profile_images build thumbnails for pictures uploaded earlier
+    Profile = apps.get_model('accounts', 'Profile')
+    Profile.objects.exclude(image='').exclude(image='profile_pics/default.jpg').update(image_pending=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_alter_allowedemaildomain_domain'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='image_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 of the image the thumbnails were made from', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='image_pending',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(queue_existing_images, migrations.RunPython.noop),
+    ]
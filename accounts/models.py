@@ -1,57 +1,106 @@
 from django.db import models
 from django.contrib.auth.models import User
-from PIL import Image
-import os
+import copy
+
+DEFAULT_PROFILE_IMAGE = 'profile_pics/default.jpg'
+
+# Square thumbnail sizes (px) generated for each uploaded profile image
+THUMBNAIL_SIZES = (32, 64, 300)
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    image = models.ImageField(default='profile_pics/default.jpg', upload_to='profile_pics')
+    image = models.ImageField(default=DEFAULT_PROFILE_IMAGE, upload_to='profile_pics')
     job_title = models.CharField(max_length=100, blank=True)
     department = models.CharField(max_length=100, blank=True)
+    email_digest = models.BooleanField(default=False,
+                                       help_text="Receive tag and comment notifications as one periodic digest email")
+    # Thumbnails are produced by the process_profile_images command
+    image_hash = models.CharField(max_length=64, blank=True,
+                                  help_text="SHA-256 of the image the thumbnails were made from")
+    thumbnails = models.JSONField(default=dict, blank=True)
+    image_pending = models.BooleanField(default=False, db_index=True)
     
     def __str__(self):
         return f'{self.user.username} Profile'
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance._tracked_values()
+        return instance
+    
+    def _tracked_values(self):
+        """Snapshot of the loaded field values, with files reduced to their names."""
+        values = {}
+        for field in self._meta.concrete_fields:
+            if field.attname not in self.__dict__:
+                continue
+            if isinstance(field, models.FileField):
+                values[field.attname] = getattr(self, field.attname).name
+            else:
+                values[field.attname] = copy.deepcopy(self.__dict__[field.attname])
+        return values
+    
+    def get_dirty_fields(self):
+        """
+        Names of the fields changed since the profile was loaded or last
+        saved, or None for a profile that has never been saved.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        dirty = {
+            name for name, value in self._tracked_values().items()
+            if name not in loaded or loaded[name] != value
+        }
+        if self.image and not self.image._committed:
+            dirty.add('image')
+        return dirty
+    
     def save(self, *args, **kwargs):
-        # Check if this is a new profile without an image
-        is_new = self.pk is None
+        dirty = self.get_dirty_fields()
+        if dirty is not None and not self._state.adding and kwargs.get('update_fields') is None:
+            # Nothing changed (e.g. the re-save done for every User save), so
+            # skip the UPDATE entirely; otherwise only write what changed.
+            if not dirty:
+                return
+            kwargs['update_fields'] = dirty
         
-        super().save(*args, **kwargs)
+        # Only note that the image changed; the decoding, cropping and resizing
+        # happen in the background so saving a profile never touches the file.
+        image_changed = bool(self.image) and (dirty is None or 'image' in dirty)
+        if image_changed and self.image.name != DEFAULT_PROFILE_IMAGE:
+            self.image_pending = True
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'image_pending'}
         
-        # Process the image for resizing/cropping
-        try:
-            if self.image and hasattr(self.image, 'path') and os.path.exists(self.image.path):
-                img = Image.open(self.image.path)
-                
-                # Ensure the image is a square by cropping to the center if necessary
-                if img.width != img.height:
-                    # Get the smaller dimension
-                    min_dimension = min(img.width, img.height)
-                    
-                    # Calculate cropping coordinates to center the image
-                    left = (img.width - min_dimension) // 2
-                    top = (img.height - min_dimension) // 2
-                    right = left + min_dimension
-                    bottom = top + min_dimension
-                    
-                    # Crop to square
-                    img = img.crop((left, top, right, bottom))
-                
-                # Resize to a standard profile size
-                if img.height > 300 or img.width > 300:
-                    output_size = (300, 300)
-                    img.thumbnail(output_size)
-                
-                img.save(self.image.path)
-        except Exception as e:
-            # Log the error but don't crash
-            print(f"Error processing profile image: {e}")
-            pass
+        super().save(*args, **kwargs)
+        self._loaded_values = self._tracked_values()
+    
+    def thumbnail_url(self, size):
+        """URL of the thumbnail of the given size, falling back to the original."""
+        name = self.thumbnails.get(str(size))
+        if name and not self.image_pending:
+            return self.image.storage.url(name)
+        return self.image.url
+    
+    @property
+    def image_small_url(self):
+        return self.thumbnail_url(32)
+    
+    @property
+    def image_medium_url(self):
+        return self.thumbnail_url(64)
+    
+    @property
+    def image_large_url(self):
+        return self.thumbnail_url(300)
 
 class AllowedEmailDomain(models.Model):
     """Model for storing domains that are allowed for registration"""
     domain = models.CharField(max_length=100, unique=True, 
-                             help_text="Domain name without @ (e.g., 'company.com')")
+                             help_text="Domain name without @ (e.g., 'company.com'), or '*.company.com' to allow any subdomain")
     description = models.CharField(max_length=255, blank=True,
                                  help_text="Optional description or organization name")
     is_active = models.BooleanField(default=True,
@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile
+from django.db import transaction
+from .models import Profile, AllowedEmailDomain
+from .utils import invalidate_allowed_email_domains
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
@@ -9,7 +11,11 @@ def create_profile(sender, instance, created, **kwargs):
         Profile.objects.create(user=instance)
 
 @receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
+def save_profile(sender, instance, update_fields=None, **kwargs):
+    # Logins only write last_login, which can never affect the profile
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    
     # Check if the profile exists before trying to save it
     # This handles existing users who may not have a profile yet
     try:
@@ -17,4 +23,11 @@ def save_profile(sender, instance, **kwargs):
             instance.profile.save()
     except Profile.DoesNotExist:
         # Create a profile for existing users
-        Profile.objects.create(user=instance)
\ No newline at end of file
+        Profile.objects.create(user=instance)
+
+@receiver(post_save, sender=AllowedEmailDomain)
+@receiver(post_delete, sender=AllowedEmailDomain)
+def invalidate_allowed_domains(sender, **kwargs):
+    # Invalidating before the commit would let another request cache the old
+    # list again from the rows it can still see
+    transaction.on_commit(invalidate_allowed_email_domains)
@@ -9,6 +9,19 @@ import os
 
 from .models import Profile
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm
+from .models import AllowedEmailDomain
+from .utils import DomainMatcher, get_domain_matcher, invalidate_allowed_email_domains
+from .utils import ALLOWED_DOMAINS_CACHE_KEY
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from unittest.mock import patch
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
+import tempfile
+from .models import THUMBNAIL_SIZES
+from .images import process_profile_image
 
 class AccountsModelTests(TestCase):
     """Tests for the accounts models."""
@@ -310,4 +323,247 @@ class AccountsViewsTests(TestCase):
         
         # Verify that the user is logged out
         response = self.client.get(self.profile_url)
-        self.assertRedirects(response, f'{self.login_url}?next={self.profile_url}')
\ No newline at end of file
+        self.assertRedirects(response, f'{self.login_url}?next={self.profile_url}')
+
+class AllowedEmailDomainTests(TestCase):
+    """Tests for the cached, precompiled allowed-domain matcher."""
+    
+    def setUp(self):
+        cache.clear()
+        AllowedEmailDomain.objects.create(domain='company.com')
+        AllowedEmailDomain.objects.create(domain='*.organization.org')
+        
+    def register_form(self, email):
+        return UserRegisterForm(data={
+            'username': 'newuser',
+            'email': email,
+            'password1': 'complex-password-123',
+            'password2': 'complex-password-123',
+        })
+        
+    def test_matcher_exact_and_wildcard_domains(self):
+        """Test exact, case-insensitive and wildcard subdomain matching."""
+        matcher = DomainMatcher(['company.com', '*.organization.org', 'Example.NET'])
+        self.assertTrue(matcher.matches('company.com'))
+        self.assertTrue(matcher.matches('COMPANY.com'))
+        self.assertTrue(matcher.matches('example.net'))
+        self.assertTrue(matcher.matches('research.organization.org'))
+        self.assertTrue(matcher.matches('lab.research.organization.org'))
+        self.assertFalse(matcher.matches('organization.org'))
+        self.assertFalse(matcher.matches('sub.company.com'))
+        self.assertFalse(matcher.matches('evilcompany.com'))
+        self.assertFalse(matcher.matches('research.organization.org.evil.com'))
+        self.assertFalse(DomainMatcher([]))
+        
+    def test_register_form_accepts_wildcard_subdomain(self):
+        """Test that registration accepts subdomains of a wildcard entry."""
+        self.assertNotIn('email', self.register_form('user@team.organization.org').errors)
+        self.assertIn('email', self.register_form('user@other.com').errors)
+        
+    def test_saving_a_domain_invalidates_cache(self):
+        """Test that adding or deactivating a domain takes effect once committed."""
+        self.assertIn('email', self.register_form('user@newcorp.com').errors)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            domain = AllowedEmailDomain.objects.create(domain='newcorp.com')
+        self.assertNotIn('email', self.register_form('user@newcorp.com').errors)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            domain.is_active = False
+            domain.save()
+        self.assertIn('email', self.register_form('user@newcorp.com').errors)
+        
+    def test_deleting_a_domain_invalidates_cache(self):
+        """Test that a deleted domain is rejected once the delete is committed."""
+        self.assertNotIn('email', self.register_form('user@company.com').errors)
+        with self.captureOnCommitCallbacks(execute=True):
+            AllowedEmailDomain.objects.filter(domain='company.com').delete()
+        self.assertIn('email', self.register_form('user@company.com').errors)
+        
+    def test_cache_is_invalidated_on_commit(self):
+        """Test that the cached list is only dropped after the transaction commits."""
+        self.assertNotIn('email', self.register_form('user@company.com').errors)
+        with self.captureOnCommitCallbacks() as callbacks:
+            AllowedEmailDomain.objects.create(domain='newcorp.com')
+            # Still cached until the commit, so no request re-reads the
+            # uncommitted rows into the shared cache
+            self.assertIsNotNone(cache.get(ALLOWED_DOMAINS_CACHE_KEY))
+        self.assertEqual(callbacks, [invalidate_allowed_email_domains])
+        
+        callbacks[0]()
+        self.assertIsNone(cache.get(ALLOWED_DOMAINS_CACHE_KEY))
+        self.assertNotIn('email', self.register_form('user@newcorp.com').errors)
+        
+    def test_large_allow_list_is_compiled_once(self):
+        """Test that validation against thousands of domains needs no queries once compiled."""
+        AllowedEmailDomain.objects.bulk_create([
+            AllowedEmailDomain(domain=f'partner{i}.com') for i in range(5000)
+        ])
+        invalidate_allowed_email_domains()
+        matcher = get_domain_matcher()
+        self.assertTrue(matcher.matches('partner4999.com'))
+        
+        with self.assertNumQueries(0):
+            self.assertIs(get_domain_matcher(), matcher)
+            self.assertTrue(matcher.matches('partner1234.com'))
+            self.assertFalse(matcher.matches('partner5000.com'))
+        self.assertIn('and 4997 more', matcher.describe())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ProfileImagePipelineTests(TestCase):
+    """Tests for background profile thumbnail generation."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        
+    def upload(self, name='avatar.jpg', size=(500, 300), color='blue'):
+        image_file = BytesIO()
+        Image.new('RGB', size, color=color).save(image_file, 'jpeg')
+        return SimpleUploadedFile(name=name, content=image_file.getvalue(), content_type='image/jpeg')
+        
+    def test_save_only_marks_image_pending(self):
+        """Test that saving a new image does no image processing inline."""
+        profile = self.user.profile
+        self.assertFalse(profile.image_pending)
+        
+        with patch('PIL.Image.open') as image_open:
+            profile.image = self.upload()
+            profile.save()
+        image_open.assert_not_called()
+        
+        profile.refresh_from_db()
+        self.assertTrue(profile.image_pending)
+        self.assertEqual(profile.image_small_url, profile.image.url)
+        
+    def test_user_save_does_no_image_io(self):
+        """Test that logins and other User saves never open the profile image."""
+        profile = self.user.profile
+        profile.image = self.upload()
+        profile.save()
+        process_profile_image(profile.pk)
+        
+        user = User.objects.get(pk=self.user.pk)
+        with patch('PIL.Image.open') as image_open, \
+             patch('django.core.files.storage.FileSystemStorage.open') as storage_open:
+            self.client.login(username='testuser', password='testpassword')
+            user.first_name = 'Changed'
+            user.save()
+        image_open.assert_not_called()
+        storage_open.assert_not_called()
+        self.assertFalse(Profile.objects.get(pk=profile.pk).image_pending)
+        
+    def test_worker_generates_square_thumbnails(self):
+        """Test that the command builds every thumbnail size from a cropped square."""
+        profile = self.user.profile
+        profile.image = self.upload()
+        profile.save()
+        
+        out = StringIO()
+        call_command('process_profile_images', '--once', stdout=out)
+        self.assertIn(f'Profile {profile.pk}: processed', out.getvalue())
+        
+        profile.refresh_from_db()
+        self.assertFalse(profile.image_pending)
+        self.assertEqual(len(profile.image_hash), 64)
+        self.assertEqual(set(profile.thumbnails), {str(size) for size in THUMBNAIL_SIZES})
+        for size in THUMBNAIL_SIZES:
+            with profile.image.storage.open(profile.thumbnails[str(size)]) as handle:
+                self.assertEqual(Image.open(handle).size, (min(size, 300), min(size, 300)))
+        self.assertNotEqual(profile.image_small_url, profile.image.url)
+        
+        # The original upload is kept as it was
+        with profile.image.open('rb') as handle:
+            self.assertEqual(Image.open(handle).size, (500, 300))
+        
+    def test_unchanged_content_is_not_reprocessed(self):
+        """Test that re-uploading the same picture skips thumbnail generation."""
+        profile = self.user.profile
+        profile.image = self.upload()
+        profile.save()
+        self.assertEqual(process_profile_image(profile.pk), 'processed')
+        
+        profile.refresh_from_db()
+        profile.image = self.upload(name='same.jpg')
+        profile.save()
+        with patch('accounts.images.make_thumbnails') as make_thumbnails:
+            self.assertEqual(process_profile_image(profile.pk), 'unchanged')
+        make_thumbnails.assert_not_called()
+        self.assertFalse(Profile.objects.get(pk=profile.pk).image_pending)
+        
+    def test_unreadable_image_falls_back_to_original(self):
+        """Test that files PIL cannot decode leave the original in use."""
+        profile = self.user.profile
+        profile.image = SimpleUploadedFile('logo.svg', b'<svg></svg>', content_type='image/svg+xml')
+        profile.save()
+        self.assertTrue(process_profile_image(profile.pk).startswith('failed'))
+        
+        profile.refresh_from_db()
+        self.assertFalse(profile.image_pending)
+        self.assertEqual(profile.image_large_url, profile.image.url)
+
+
+class ProfileDirtyTrackingTests(TestCase):
+    """Tests that profile saves only write what changed."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        
+    def test_unchanged_profile_save_is_a_no_op(self):
+        """Test that saving a clean profile issues no queries."""
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual(profile.get_dirty_fields(), set())
+        with self.assertNumQueries(0):
+            profile.save()
+        
+    def test_only_changed_fields_are_written(self):
+        """Test that the UPDATE covers just the modified columns."""
+        profile = Profile.objects.get(user=self.user)
+        profile.job_title = 'Engineer'
+        profile.thumbnails['32'] = 'thumb.jpg'
+        self.assertEqual(profile.get_dirty_fields(), {'job_title', 'thumbnails'})
+        
+        with CaptureQueriesContext(connection) as ctx:
+            profile.save()
+        # The other queries look up lesson fragments showing the new job title
+        updates = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"job_title"', updates[0])
+        self.assertNotIn('"department"', updates[0])
+        
+        self.assertEqual(profile.get_dirty_fields(), set())
+        profile.refresh_from_db()
+        self.assertEqual((profile.job_title, profile.thumbnails), ('Engineer', {'32': 'thumb.jpg'}))
+        
+    def test_user_save_skips_clean_profile(self):
+        """Test that the save_profile signal does not rewrite an unchanged profile."""
+        user = User.objects.get(pk=self.user.pk)
+        user.profile  # Load the profile as views do
+        with CaptureQueriesContext(connection) as ctx:
+            user.first_name = 'Test'
+            user.save()
+        self.assertFalse(any('UPDATE "accounts_profile"' in query['sql'] for query in ctx.captured_queries))
+        
+    def test_login_is_cheap(self):
+        """Test that logging in touches neither the profile row nor any file."""
+        with patch('PIL.Image.open') as image_open, \
+             patch('django.core.files.storage.FileSystemStorage.open') as storage_open, \
+             CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(self.client.login(username='testuser', password='testpassword'))
+        
+        image_open.assert_not_called()
+        storage_open.assert_not_called()
+        self.assertFalse(any('accounts_profile' in query['sql'] for query in ctx.captured_queries))
+        # The only write to the user is the last_login stamp
+        user_writes = [query['sql'] for query in ctx.captured_queries
+                       if query['sql'].startswith('UPDATE "auth_user"')]
+        self.assertEqual(len(user_writes), 1)
+        self.assertIn('SET "last_login"', user_writes[0])
@@ -1,23 +1,111 @@
+import time
+
 from django.conf import settings
 from django.core.cache import cache
 from .models import AllowedEmailDomain
 
+ALLOWED_DOMAINS_CACHE_KEY = 'allowed_email_domains'
+ALLOWED_DOMAINS_VERSION_KEY = 'allowed_email_domains:version'
+
+# Compiled matcher for this process, as (version, DomainMatcher)
+_compiled_matcher = (None, None)
+
 def get_allowed_email_domains():
     """
     Get allowed email domains from the database, with fallback to settings.py
-    Uses caching to avoid frequent database queries
+    Uses caching to avoid frequent database queries; the cached list is
+    dropped by accounts.signals once a change to an AllowedEmailDomain commits.
     """
     # Try to get from cache first
-    domains = cache.get('allowed_email_domains')
+    domains = cache.get(ALLOWED_DOMAINS_CACHE_KEY)
     if domains is None:
         # If not in cache, query the database
         domains = list(AllowedEmailDomain.objects.filter(is_active=True).values_list('domain', flat=True))
-        
+
         # If database has no domains, use fallback from settings
         if not domains:
             domains = getattr(settings, 'ALLOWED_EMAIL_DOMAINS', [])
-        
+
         # Cache the results for 1 hour (3600 seconds)
-        cache.set('allowed_email_domains', domains, 3600)
-    
-    return domains
\ No newline at end of file
+        cache.set(ALLOWED_DOMAINS_CACHE_KEY, domains, 3600)
+
+    return domains
+
+def invalidate_allowed_email_domains():
+    """Drop the cached domain list and make every process recompile its matcher."""
+    cache.delete(ALLOWED_DOMAINS_CACHE_KEY)
+    cache.set(ALLOWED_DOMAINS_VERSION_KEY, time.time_ns(), None)
+
+class DomainMatcher:
+    """
+    Precompiled allow-list of email domains.
+
+    Plain entries ("company.com") go in a set. Wildcard entries
+    ("*.company.com", any subdomain of company.com) go in a trie keyed on the
+    domain's labels from right to left, so a lookup costs one set probe plus
+    one step per label of the address, however many domains are allowed.
+    """
+
+    WILDCARD = '*'
+
+    def __init__(self, domains):
+        self.domains = list(domains)
+        self.exact = set()
+        self.trie = {}
+        for entry in self.domains:
+            entry = self.normalize(entry)
+            if entry.startswith('*.'):
+                node = self.trie
+                for label in reversed(entry[2:].split('.')):
+                    node = node.setdefault(label, {})
+                node[self.WILDCARD] = True
+            elif entry:
+                self.exact.add(entry)
+
+    def __bool__(self):
+        return bool(self.exact or self.trie)
+
+    @staticmethod
+    def normalize(domain):
+        return domain.strip().lower().rstrip('.')
+
+    def matches(self, domain):
+        domain = self.normalize(domain)
+        if domain in self.exact:
+            return True
+        labels = domain.split('.')
+        node = self.trie
+        # Walk from the top-level label; a wildcard only covers names with at
+        # least one more label to the left of it
+        for remaining in range(len(labels) - 1, 0, -1):
+            node = node.get(labels[remaining])
+            if node is None:
+                return False
+            if self.WILDCARD in node:
+                return True
+        return False
+
+    def describe(self, limit=5):
+        """Human-readable summary of the allowed domains for error messages."""
+        described = ', '.join(self.domains[:limit])
+        if len(self.domains) > limit:
+            described += f" and {len(self.domains) - limit} more"
+        return described
+
+def get_domain_matcher():
+    """
+    Return the compiled DomainMatcher for the allowed domains. It is built
+    once per process and rebuilt only when the shared version key shows that
+    the allow-list changed.
+    """
+    global _compiled_matcher
+    version = cache.get(ALLOWED_DOMAINS_VERSION_KEY)
+    if version is None:
+        cache.add(ALLOWED_DOMAINS_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(ALLOWED_DOMAINS_VERSION_KEY)
+
+    compiled_version, matcher = _compiled_matcher
+    if matcher is None or compiled_version != version:
+        matcher = DomainMatcher(get_allowed_email_domains())
+        _compiled_matcher = (version, matcher)
+    return matcher
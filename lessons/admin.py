@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django_summernote.admin import SummernoteModelAdmin
-from .models import Category, Lesson, Attachment, Comment
+from .models import Category, Lesson, Attachment, Comment, ExportJob, OutboxEmail, NotificationEvent
+from .bulk import bulk_update_lessons
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -21,6 +22,15 @@ class CommentInline(admin.TabularInline):
     extra = 0
     readonly_fields = ('created_date',)
 
+def bulk_update_action(name, description, **changes):
+    """An admin action applying changes to the selected lessons with one UPDATE."""
+    @admin.action(description=description, permissions=['change'])
+    def action(modeladmin, request, queryset):
+        updated = bulk_update_lessons(queryset, **changes)
+        modeladmin.message_user(request, f"Updated {updated} lesson{'s' if updated != 1 else ''}.")
+    action.__name__ = name
+    return action
+
 @admin.register(Lesson)
 class LessonAdmin(SummernoteModelAdmin):
     summernote_fields = ('description', 'recommendations', 'implementation_notes')
@@ -31,6 +41,13 @@ class LessonAdmin(SummernoteModelAdmin):
     filter_horizontal = ('tags', 'starred_by')
     inlines = [AttachmentInline, CommentInline]
     readonly_fields = ('created_date', 'modified_date')
+    actions = [
+        bulk_update_action(f'set_status_{code.lower()}', f'Set status to {label}', status=code)
+        for code, label in Lesson.STATUS_CHOICES
+    ] + [
+        bulk_update_action(f'set_impact_{code.lower()}', f'Set impact to {label}', impact=code)
+        for code, label in Lesson.IMPACT_CHOICES
+    ]
     
     fieldsets = (
         ('Basic Information', {
@@ -49,4 +66,24 @@ class LessonAdmin(SummernoteModelAdmin):
             'fields': ('created_date', 'modified_date'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'export_format', 'status', 'row_count', 'created_date', 'finished_date')
+    list_filter = ('status', 'export_format')
+    search_fields = ('user__username', 'cache_key')
+    readonly_fields = ('created_date', 'started_date', 'finished_date')
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_date', 'created_date', 'sent_date')
+    list_filter = ('status',)
+    search_fields = ('subject', 'recipients')
+    readonly_fields = ('created_date', 'sent_date', 'last_error')
+
+@admin.register(NotificationEvent)
+class NotificationEventAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'kind', 'lesson', 'created_date', 'sent_date')
+    list_filter = ('kind',)
+    search_fields = ('recipient__username', 'lesson__title')
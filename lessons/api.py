@@ -0,0 +1,258 @@
+"""
+Read-only JSON API over lessons, projects, categories and comments.
+
+Every endpoint answers for the logged-in user's projects only. ?fields=
+(comma-separated) limits a response to the named fields, and only those
+columns are read. Lessons accept the same filters as the lesson list and
+are paged with keyset cursors: follow "next" from the previous response.
+
+Responses carry a strong ETag. For lessons it is derived from
+modified_date with one aggregate query plus the lesson and project
+generation counters, so a poll with a matching If-None-Match is answered 304
+without building the page. Projects, categories and comments have no modification date, so their
+ETag is a hash of the response body: a 304 still saves the transfer.
+"""
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from lessons_learned.query_budget import query_budget
+from projects.access import project_generation
+from .conditional import make_etag, not_modified, set_validators
+from .filters import LessonFilter
+from .models import Category, Comment, Lesson
+from .pagination import CursorPaginator, lesson_generation
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+# Field name in responses -> path passed to .values()
+LESSON_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'project': 'project_id',
+    'project_name': 'project__name',
+    'category': 'category_id',
+    'category_name': 'category__name',
+    'date_identified': 'date_identified',
+    'description': 'description',
+    'recommendations': 'recommendations',
+    'implementation_notes': 'implementation_notes',
+    'impact': 'impact',
+    'status': 'status',
+    'submitted_by': 'submitted_by_id',
+    'submitted_by_username': 'submitted_by__username',
+    'created_date': 'created_date',
+    'modified_date': 'modified_date',
+}
+
+PROJECT_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'start_date': 'start_date',
+    'end_date': 'end_date',
+    'is_active': 'is_active',
+    'created_by': 'created_by_id',
+    'created_date': 'created_date',
+}
+
+CATEGORY_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+}
+
+COMMENT_FIELDS = {
+    'id': 'id',
+    'lesson': 'lesson_id',
+    'author': 'author_id',
+    'author_username': 'author__username',
+    'text': 'text',
+    'created_date': 'created_date',
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def api_view(view_func):
+    """Session-authenticated, read-only JSON view; ApiError becomes a JSON error."""
+    @require_safe
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required.'}, status=401)
+        try:
+            return view_func(request, *args, **kwargs)
+        except ApiError as e:
+            return JsonResponse({'error': e.message}, status=e.status)
+    return wrapper
+
+
+def requested_fields(request, available):
+    """The response fields named in ?fields=, or all of them."""
+    value = request.GET.get('fields', '')
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if not names:
+        return list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(400, f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}")
+    return list(dict.fromkeys(names))
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError(400, 'limit must be a number.')
+    return max(1, min(limit, API_MAX_PAGE_SIZE))
+
+
+def serialize(row, fields, available):
+    return {name: row[available[name]] for name in fields}
+
+
+def api_response(data, etag, last_modified=None):
+    return set_validators(JsonResponse(data), etag, last_modified)
+
+
+def content_response(request, data):
+    """Respond with data, using a hash of it as the ETag."""
+    etag = make_etag(data)
+    return not_modified(request, etag) or api_response(data, etag)
+
+
+def user_lessons(request):
+    return Lesson.objects.filter(project__in=request.user.projects.all())
+
+
+@query_budget(6)
+@api_view
+def lesson_list(request):
+    fields = requested_fields(request, LESSON_FIELDS)
+    limit = page_size(request)
+
+    lesson_filter = LessonFilter(request.GET, queryset=user_lessons(request), request=request)
+    if not lesson_filter.is_valid():
+        raise ApiError(400, lesson_filter.errors.get_json_data())
+    lessons = lesson_filter.qs
+
+    # The aggregate covers edits, additions and removals of the matched
+    # lessons; the generations cover renamed projects, categories and users
+    # (returned as *_name fields) and membership changes. There is no
+    # Last-Modified: no timestamp advances on deletions or renames.
+    version = lessons.order_by().aggregate(latest=Max('modified_date'), total=Count('id'))
+    etag = make_etag(
+        'lessons', request.user.pk, sorted(request.GET.lists()), version['total'], version['latest'],
+        lesson_generation(), project_generation()
+    )
+    response = not_modified(request, etag)
+    if response:
+        return response
+
+    paths = {LESSON_FIELDS[name] for name in fields} | {'id', 'created_date'}
+    page = CursorPaginator(lessons.values(*paths), limit).get_page(request.GET.get('cursor'))
+
+    next_url = None
+    if page.next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = page.next_cursor
+        next_url = f'{request.path}?{params.urlencode()}'
+
+    return api_response({
+        'count': version['total'],
+        'next': next_url,
+        'results': [serialize(row, fields, LESSON_FIELDS) for row in page],
+    }, etag)
+
+
+@query_budget(5)
+@api_view
+def lesson_detail(request, pk):
+    fields = requested_fields(request, LESSON_FIELDS)
+    lessons = user_lessons(request).filter(pk=pk)
+
+    modified = lessons.values_list('modified_date', flat=True).first()
+    if modified is None:
+        raise ApiError(404, 'Lesson not found.')
+    # As for the list, related names can change without touching modified_date,
+    # so modified_date is only one input to the ETag. It is not sent as
+    # Last-Modified: a client revalidating with If-Modified-Since alone would
+    # keep getting 304s for a lesson whose project or category was renamed.
+    etag = make_etag('lesson', pk, modified, fields, lesson_generation(), project_generation())
+    response = not_modified(request, etag)
+    if response:
+        return response
+
+    row = lessons.values(*{LESSON_FIELDS[name] for name in fields}).first()
+    if row is None:
+        raise ApiError(404, 'Lesson not found.')
+    return api_response(serialize(row, fields, LESSON_FIELDS), etag)
+
+
+@query_budget(6)
+@api_view
+def lesson_comments(request, pk):
+    fields = requested_fields(request, COMMENT_FIELDS)
+    limit = page_size(request)
+    if not user_lessons(request).filter(pk=pk).exists():
+        raise ApiError(404, 'Lesson not found.')
+
+    # Comments are paged oldest first by id; ?after= is the last id seen
+    comments = Comment.objects.filter(lesson_id=pk).order_by('id')
+    try:
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        raise ApiError(400, 'after must be a comment id.')
+    paths = {COMMENT_FIELDS[name] for name in fields} | {'id'}
+    rows = list(comments.filter(id__gt=after).values(*paths)[:limit + 1])
+
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        params = request.GET.copy()
+        params['after'] = rows[-1]['id']
+        next_url = f'{request.path}?{params.urlencode()}'
+
+    return content_response(request, {
+        'next': next_url,
+        'results': [serialize(row, fields, COMMENT_FIELDS) for row in rows],
+    })
+
+
+@query_budget(5)
+@api_view
+def project_list(request):
+    fields = requested_fields(request, PROJECT_FIELDS)
+    projects = request.user.projects.order_by('pk').values(*{PROJECT_FIELDS[name] for name in fields})
+    return content_response(request, {
+        'results': [serialize(row, fields, PROJECT_FIELDS) for row in projects],
+    })
+
+
+@query_budget(5)
+@api_view
+def project_detail(request, pk):
+    fields = requested_fields(request, PROJECT_FIELDS)
+    row = request.user.projects.filter(pk=pk).values(*{PROJECT_FIELDS[name] for name in fields}).first()
+    if row is None:
+        raise ApiError(404, 'Project not found.')
+    return content_response(request, serialize(row, fields, PROJECT_FIELDS))
+
+
+@query_budget(5)
+@api_view
+def category_list(request):
+    fields = requested_fields(request, CATEGORY_FIELDS)
+    categories = Category.objects.order_by('name', 'pk').values(*{CATEGORY_FIELDS[name] for name in fields})
+    return content_response(request, {
+        'results': [serialize(row, fields, CATEGORY_FIELDS) for row in categories],
+    })
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import api
+
+urlpatterns = [
+    path('lessons/', api.lesson_list, name='api-lesson-list'),
+    path('lessons/<int:pk>/', api.lesson_detail, name='api-lesson-detail'),
+    path('lessons/<int:pk>/comments/', api.lesson_comments, name='api-lesson-comments'),
+    path('projects/', api.project_list, name='api-project-list'),
+    path('projects/<int:pk>/', api.project_detail, name='api-project-detail'),
+    path('categories/', api.category_list, name='api-category-list'),
+]
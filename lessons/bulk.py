@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Lesson
+
+# Model signals with receivers in this project that fire per row or per
+# relation change; bulk loads mute them and recompute derived data once.
+MODEL_SIGNALS = (pre_save, post_save, pre_delete, post_delete, post_init, m2m_changed)
+
+# Sent once by bulk_update_lessons() for all the lessons it changed, in place
+# of a post_save per lesson. Arguments: lesson_ids, project_ids, fields.
+lessons_bulk_updated = Signal()
+
+
+@contextmanager
+def mute_signals(*signals):
+    """
+    Disconnect every receiver of the given signals (all MODEL_SIGNALS by
+    default) for the duration of the block, restoring them afterwards.
+
+    Anything the receivers maintain (the ProjectLessonStats rollup, the search
+    index, cached list totals, notifications) must be rebuilt by the caller.
+    """
+    signals = signals or MODEL_SIGNALS
+    saved = [(signal, signal.receivers) for signal in signals]
+    for signal in signals:
+        with signal.lock:
+            signal.receivers = []
+            signal.sender_receivers_cache.clear()
+    try:
+        yield
+    finally:
+        for signal, receivers in saved:
+            with signal.lock:
+                signal.receivers = receivers
+                signal.sender_receivers_cache.clear()
+
+
+def bulk_update_lessons(queryset, **changes):
+    """
+    Apply field changes to every lesson in queryset that does not already
+    have them, with a single UPDATE that also bumps modified_date, then send
+    one lessons_bulk_updated signal. Returns the number of lessons changed.
+    """
+    with transaction.atomic():
+        rows = list(queryset.exclude(**changes).order_by().values_list('pk', 'project_id'))
+        if not rows:
+            return 0
+        lesson_ids = [pk for pk, _ in rows]
+        updated = Lesson.objects.filter(pk__in=lesson_ids).update(modified_date=timezone.now(), **changes)
+        lessons_bulk_updated.send(
+            sender=Lesson,
+            lesson_ids=lesson_ids,
+            project_ids={project_id for _, project_id in rows},
+            fields=set(changes) | {'modified_date'},
+        )
+    return updated
@@ -0,0 +1,66 @@
+"""
+Conditional GET helpers shared by the JSON API and the HTML pages.
+
+A view computes an ETag (and, where one exists, a Last-Modified time) from
+cheap version signals before doing any real work; when the client already
+holds that version it gets an empty 304 and nothing is queried or rendered.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.serializers.json import DjangoJSONEncoder
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """A strong ETag hashed from JSON-serializable version signals."""
+    payload = json.dumps(parts, sort_keys=True, cls=DjangoJSONEncoder)
+    return quote_etag(hashlib.sha256(payload.encode()).hexdigest())
+
+
+def not_modified(request, etag, last_modified=None):
+    """A 304 (or 412) response when the client's validators match, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        response['ETag'] = etag
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Per-user content: browsers may keep it but must revalidate every time
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def page_etag(request, *parts):
+    """
+    ETag for an HTML page: the view's own version signals plus what every
+    page shows for the user (the navbar) or embeds in its forms (the CSRF
+    secret), and PAGE_ETAG_SALT so a deploy revalidates every page.
+    """
+    user = request.user
+    # get_token() creates the secret when the request has none, so the ETag
+    # matches the cookie the rendered page goes out with
+    get_token(request)
+    return make_etag(
+        settings.PAGE_ETAG_SALT, user.pk, user.username, user.is_staff,
+        request.META['CSRF_COOKIE'], *parts
+    )
+
+
+def page_not_modified(request, etag, last_modified=None):
+    """
+    not_modified() for HTML pages. Pages with flash messages waiting to be
+    shown are always rendered, since a cached copy would not contain them.
+    """
+    if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+        return None
+    return not_modified(request, etag, last_modified)
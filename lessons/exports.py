@@ -0,0 +1,261 @@
+import csv
+import hashlib
+import json
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Count, Max
+from django.http import QueryDict
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from projects.access import project_generation
+from .models import Lesson, ExportJob
+from .filters import LessonFilter
+from .pagination import lesson_generation
+
+CSV_EXPORT_HEADER = ['Project', 'Title', 'Category', 'Date Identified', 'Status', 'Impact', 'Description', 'Recommendations', 'Submitted By']
+
+CSV_EXPORT_FIELDS = [
+    'project__name', 'title', 'category__name', 'date_identified', 'status',
+    'impact', 'description', 'recommendations', 'submitted_by__username',
+]
+
+CSV_EXPORT_CHUNK_SIZE = 2000
+
+# Query parameters that do not change which lessons are exported
+IGNORED_EXPORT_PARAMS = {'export', 'page', 'cursor', 'paginate'}
+
+# Filters whose result depends on who is asking, so their exports are never shared
+USER_DEPENDENT_EXPORT_PARAMS = {'is_starred'}
+
+# Error recorded on a RUNNING job handed back to the queue after its worker died
+REQUEUED_EXPORT_ERROR = 'Requeued after the export worker stopped'
+
+PDF_PRINT_SCRIPT = """
+    <script>
+        window.onload = function() {
+            document.title = "Lessons Learned Report";
+            setTimeout(function() {
+                window.print();
+            }, 500);
+        }
+    </script>
+    """
+
+
+class Echo:
+    """A file-like object that returns what is written, for streaming csv rows."""
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=CSV_EXPORT_CHUNK_SIZE):
+    """
+    Yield the CSV header followed by one row per lesson. Rows are read as
+    tuples with values_list() and fetched in chunks, so memory use does not
+    grow with the size of the export.
+    """
+    status_labels = dict(Lesson.STATUS_CHOICES)
+    impact_labels = dict(Lesson.IMPACT_CHOICES)
+    
+    yield CSV_EXPORT_HEADER
+    
+    rows = queryset.values_list(*CSV_EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for project, title, category, date_identified, status, impact, description, recommendations, username in rows:
+        yield [
+            project,
+            title,
+            category or '',
+            date_identified,
+            status_labels.get(status, status),
+            impact_labels.get(impact, impact),
+            description,
+            recommendations,
+            username,
+        ]
+
+
+def render_lessons_html(queryset):
+    """Render the printable HTML report used for the PDF export."""
+    html_string = render_to_string('lessons/pdf_template.html', {'lessons': queryset})
+    # Insert the print script right before the closing </body> tag
+    return html_string.replace('</body>', f'{PDF_PRINT_SCRIPT}</body>')
+
+
+def normalize_export_params(query_dict):
+    """Reduce request.GET to the sorted filter parameters that affect an export."""
+    return {
+        key: sorted(value for value in query_dict.getlist(key) if value != '')
+        for key in sorted(query_dict.keys())
+        if key not in IGNORED_EXPORT_PARAMS and any(v != '' for v in query_dict.getlist(key))
+    }
+
+
+def export_queryset(user, params):
+    """Rebuild the filtered lesson queryset an export job was requested for."""
+    data = QueryDict(mutable=True)
+    for key, values in params.items():
+        data.setlist(key, values)
+    
+    lessons = Lesson.objects.filter(project__in=user.projects.all()).select_related(
+        'project', 'category', 'submitted_by'
+    )
+    request = SimpleNamespace(user=user)
+    return LessonFilter(data, queryset=lessons, request=request).qs
+
+
+def data_version(queryset):
+    """
+    A cheap fingerprint that changes whenever the exported lessons change.
+    The generations cover the project, category and user names written next
+    to each lesson, whose renames leave the lessons' own rows untouched.
+    """
+    version = queryset.order_by().aggregate(latest=Max('modified_date'), total=Count('id'))
+    latest = version['latest'].isoformat() if version['latest'] else ''
+    return f"{version['total']}:{latest}:{lesson_generation()}:{project_generation()}"
+
+
+def export_cache_key(user, export_format, params, queryset):
+    """
+    Identify an export artifact by format, filters, the user's project scope
+    and the data version, so identical requests can share one file. Exports
+    filtered on the user's own stars are keyed on the user as well.
+    """
+    project_ids = sorted(user.projects.values_list('id', flat=True))
+    payload = {
+        'format': export_format,
+        'params': params,
+        'projects': project_ids,
+        'version': data_version(queryset),
+    }
+    if USER_DEPENDENT_EXPORT_PARAMS & set(params):
+        payload['user'] = user.pk
+    payload = json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def find_finished_export(cache_key):
+    """Return a finished job for cache_key whose file still exists, if any."""
+    for job in ExportJob.objects.filter(cache_key=cache_key, status='DONE').exclude(file=''):
+        if job.file.storage.exists(job.file.name):
+            return job
+    return None
+
+
+def request_export(user, export_format, query_dict):
+    """
+    Return an ExportJob for the user's export request, reusing a stored
+    artifact or an in-flight job for the same data when one exists.
+    """
+    params = normalize_export_params(query_dict)
+    queryset = export_queryset(user, params)
+    cache_key = export_cache_key(user, export_format, params, queryset)
+    
+    finished = find_finished_export(cache_key)
+    if finished:
+        if finished.user_id == user.id:
+            return finished
+        return ExportJob.objects.create(
+            user=user, export_format=export_format, params=params, cache_key=cache_key,
+            status='DONE', file=finished.file.name, row_count=finished.row_count,
+            started_date=timezone.now(), finished_date=timezone.now()
+        )
+    
+    in_flight = ExportJob.objects.filter(
+        user=user, cache_key=cache_key, status__in=['PENDING', 'RUNNING']
+    ).first()
+    if in_flight:
+        return in_flight
+    
+    return ExportJob.objects.create(
+        user=user, export_format=export_format, params=params, cache_key=cache_key
+    )
+
+
+def requeue_stale_export_jobs(timeout=None):
+    """
+    Recover jobs left RUNNING by a worker that crashed or was killed: after
+    EXPORT_JOB_TIMEOUT seconds a job goes back to the queue once, and fails
+    if it goes stale again, so an export that kills its worker is not retried
+    forever. Returns the number of jobs requeued and failed.
+    """
+    timeout = settings.EXPORT_JOB_TIMEOUT if timeout is None else timeout
+    stale = ExportJob.objects.filter(
+        status='RUNNING', started_date__lt=timezone.now() - timedelta(seconds=timeout)
+    )
+    failed = stale.filter(error=REQUEUED_EXPORT_ERROR).update(
+        status='FAILED', error='The export worker stopped before the export finished',
+        finished_date=timezone.now()
+    )
+    requeued = stale.update(status='PENDING', started_date=None, error=REQUEUED_EXPORT_ERROR)
+    return requeued, failed
+
+
+def claim_export_jobs(limit):
+    """Atomically mark up to limit pending jobs as running and return their ids."""
+    requeue_stale_export_jobs()
+    claimed = []
+    pending = ExportJob.objects.filter(status='PENDING').order_by('created_date').values_list('id', flat=True)
+    for job_id in pending[:limit]:
+        updated = ExportJob.objects.filter(pk=job_id, status='PENDING').update(
+            status='RUNNING', started_date=timezone.now()
+        )
+        if updated:
+            claimed.append(job_id)
+    return claimed
+
+
+def write_export(queryset, export_format, handle):
+    """Write an export to an open text file and return the number of lessons."""
+    if export_format == 'csv':
+        writer = csv.writer(handle)
+        row_count = -1
+        for row in export_rows(queryset):
+            writer.writerow(row)
+            row_count += 1
+        return row_count
+    
+    lessons = list(queryset)
+    handle.write(render_lessons_html(lessons))
+    return len(lessons)
+
+
+def run_export_job(job_id):
+    """Render a claimed export job to MEDIA_ROOT/exports and record the outcome."""
+    job = ExportJob.objects.select_related('user').get(pk=job_id)
+    job.error = ''
+    
+    try:
+        finished = find_finished_export(job.cache_key)
+        if finished and finished.pk != job.pk:
+            job.file.name = finished.file.name
+            job.row_count = finished.row_count
+        else:
+            queryset = export_queryset(job.user, job.params)
+            extension = 'csv' if job.export_format == 'csv' else 'html'
+            with tempfile.TemporaryFile(mode='w+', newline='', encoding='utf-8') as handle:
+                job.row_count = write_export(queryset, job.export_format, handle)
+                handle.seek(0)
+                job.file.save(f'{job.cache_key}.{extension}', File(handle), save=False)
+        job.status = 'DONE'
+    except Exception as e:
+        job.status = 'FAILED'
+        job.error = str(e)
+    
+    job.finished_date = timezone.now()
+    job.save(update_fields=['file', 'row_count', 'status', 'error', 'finished_date'])
+    return job.status
+
+
+def init_export_worker():
+    """Process pool initializer: make Django usable in a freshly started worker."""
+    import django
+    from django.db import connections
+    
+    django.setup()
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
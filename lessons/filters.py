@@ -1,15 +1,23 @@
 import django_filters
 from django import forms
 from .models import Lesson, Category
+from .search import search_lessons
 from django.contrib.auth.models import User
 from projects.models import Project
 
 class LessonFilter(django_filters.FilterSet):
-    title = django_filters.CharFilter(
-        lookup_expr='icontains',
+    q = django_filters.CharFilter(
+        method='filter_search',
+        label='Search',
         widget=forms.TextInput(attrs={'placeholder': 'Search lessons...', 'class': 'form-control'})
     )
     
+    # Kept so existing ?title= links still work; searches the same index as q
+    title = django_filters.CharFilter(
+        method='filter_search',
+        widget=forms.HiddenInput()
+    )
+    
     project = django_filters.ModelChoiceFilter(
         queryset=Project.objects.all(),
         widget=forms.Select(attrs={'class': 'form-select'})
@@ -53,6 +61,12 @@ class LessonFilter(django_filters.FilterSet):
         widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
     )
     
+    def filter_search(self, queryset, name, value):
+        """Full-text search across title, description, recommendations and notes."""
+        if not value:
+            return queryset
+        return search_lessons(queryset, value)
+    
     def filter_starred(self, queryset, name, value):
         """Filter lessons by whether they are starred by the current user."""
     # Only apply the filter if value is True (checkbox is checked)
@@ -65,7 +79,7 @@ class LessonFilter(django_filters.FilterSet):
         return queryset
     
     def __init__(self, *args, **kwargs):
-        self.request = kwargs.pop('request', None)
+        # FilterSet keeps the request as self.request, which filter_starred reads
         super().__init__(*args, **kwargs)
         
         # If user is logged in, filter projects by user's projects
@@ -80,6 +94,6 @@ class LessonFilter(django_filters.FilterSet):
     class Meta:
         model = Lesson
         fields = [
-            'title', 'project', 'category', 'status', 
+            'q', 'title', 'project', 'category', 'status', 
             'impact', 'submitted_by', 'date_from', 'date_to'
         ]
\ No newline at end of file
@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.models import User
 from django_summernote.widgets import SummernoteWidget
 from .models import Lesson, Attachment, Comment, Category
+from .imports import LessonImportError, detect_format
 from projects.models import Project
 
 class LessonForm(forms.ModelForm):
@@ -127,4 +128,75 @@ class CommentForm(forms.ModelForm):
         fields = ['text']
         widgets = {
             'text': forms.Textarea(attrs={'rows': 3, 'placeholder': 'Add your comment here...'}),
-        }
\ No newline at end of file
+        }
+
+
+class LessonImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV, JSON, JSON Lines or XLSX with one lesson per row")
+    skip_invalid = forms.BooleanField(
+        required=False,
+        label="Skip invalid rows",
+        help_text="Import the valid rows even if some rows have errors"
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label="Validate only",
+        help_text="Check the file without importing anything"
+    )
+    
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        try:
+            self.file_format = detect_format(file.name)
+        except LessonImportError as e:
+            raise forms.ValidationError(str(e))
+        return file
+
+
+class LessonIdsField(forms.Field):
+    """The ids of the lessons ticked in a list, posted as repeated values."""
+    widget = forms.MultipleHiddenInput
+    
+    def to_python(self, value):
+        try:
+            return sorted({int(pk) for pk in value or []})
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid lesson selection.")
+
+
+class LessonBulkActionForm(forms.Form):
+    # Most lessons one request may change, keeping the id list of the UPDATE bounded
+    MAX_LESSONS = 1000
+    
+    ACTION_CHOICES = [
+        ('status', 'Set status'),
+        ('impact', 'Set impact'),
+        ('category', 'Set category'),
+        ('archive', 'Archive'),
+    ]
+    
+    lessons = LessonIdsField(error_messages={'required': "Select at least one lesson."})
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    status = forms.ChoiceField(choices=Lesson.STATUS_CHOICES, required=False)
+    impact = forms.ChoiceField(choices=Lesson.IMPACT_CHOICES, required=False)
+    category = forms.ModelChoiceField(queryset=Category.objects.all(), required=False, empty_label="Uncategorized")
+    
+    def clean_lessons(self):
+        lessons = self.cleaned_data['lessons']
+        if len(lessons) > self.MAX_LESSONS:
+            raise forms.ValidationError(f"Select at most {self.MAX_LESSONS} lessons at a time.")
+        return lessons
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        if action == 'archive':
+            self.changes = {'status': 'ARCHIVED'}
+        elif action == 'category':
+            # No category means the lessons become uncategorized
+            self.changes = {'category': cleaned_data.get('category')}
+        elif action in ('status', 'impact'):
+            if not cleaned_data.get(action):
+                self.add_error(action, "Choose a value to set.")
+            self.changes = {action: cleaned_data.get(action)}
+        return cleaned_data
@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+
+# Cache keys of the fragment hit/miss counters, per fragment name
+FRAGMENT_STATS_KEY = 'fragments:stats:{outcome}:{name}'
+FRAGMENT_NAMES_KEY = 'fragments:names'
+
+# Lookups are counted in memory and added to the shared counters at most this
+# often, so page views do not each write to the cache
+FRAGMENT_STATS_FLUSH_SECONDS = 60
+
+_pending_stats = Counter()
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def lesson_version_key(lesson_id):
+    return f'lessons:version:{lesson_id}'
+
+
+def lesson_version(lesson_id):
+    """
+    Version counter for a lesson's cached detail fragments. It is part of
+    every fragment key, so bumping it makes all of them miss at once. A
+    missing counter starts from the clock rather than 1, so fragments cached
+    under an evicted counter are never picked up again.
+    """
+    key = lesson_version_key(lesson_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_lesson_version(*lesson_ids):
+    for lesson_id in lesson_ids:
+        try:
+            cache.incr(lesson_version_key(lesson_id))
+        except ValueError:
+            # Nothing cached for this lesson yet
+            pass
+
+
+def record_fragment(name, hit):
+    """Count a fragment cache lookup so hit ratios can be reported."""
+    with _pending_lock:
+        _pending_stats[name, 'hits' if hit else 'misses'] += 1
+        due = time.monotonic() - _last_flush >= FRAGMENT_STATS_FLUSH_SECONDS
+    if due:
+        flush_fragment_stats()
+
+
+def flush_fragment_stats():
+    """Add this process's pending lookup counts to the shared counters."""
+    global _last_flush
+    with _pending_lock:
+        pending = dict(_pending_stats)
+        _pending_stats.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+
+    names = cache.get(FRAGMENT_NAMES_KEY, set())
+    for (name, outcome), count in pending.items():
+        key = FRAGMENT_STATS_KEY.format(outcome=outcome, name=name)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            cache.set(key, count, None)
+    new_names = {name for name, _ in pending} - names
+    if new_names:
+        cache.set(FRAGMENT_NAMES_KEY, names | new_names, None)
+
+
+def fragment_stats():
+    """Return {name: {'hits', 'misses', 'ratio'}} for every counted fragment."""
+    flush_fragment_stats()
+    stats = {}
+    for name in sorted(cache.get(FRAGMENT_NAMES_KEY, set())):
+        hits = cache.get(FRAGMENT_STATS_KEY.format(outcome='hits', name=name), 0)
+        misses = cache.get(FRAGMENT_STATS_KEY.format(outcome='misses', name=name), 0)
+        total = hits + misses
+        stats[name] = {'hits': hits, 'misses': misses, 'ratio': hits / total if total else 0.0}
+    return stats
+
+
+def reset_fragment_stats():
+    with _pending_lock:
+        _pending_stats.clear()
+    names = cache.get(FRAGMENT_NAMES_KEY, set())
+    cache.delete_many([
+        FRAGMENT_STATS_KEY.format(outcome=outcome, name=name)
+        for name in names for outcome in ('hits', 'misses')
+    ] + [FRAGMENT_NAMES_KEY])
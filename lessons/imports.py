@@ -0,0 +1,392 @@
+"""
+Bulk import of lessons from CSV, JSON, JSON Lines or XLSX files.
+
+Rows are read as a stream and validated against lookup maps of projects,
+categories and users loaded once up front, instead of running a LessonForm
+(and its queries) per row. Valid rows are inserted with bulk_create in
+batches. bulk_create sends no save or m2m signals, so the work their
+receivers do per lesson (the ProjectLessonStats rollup, the search index,
+cached totals and tag notifications) is done once per batch or once at the
+end of the import.
+
+Columns (case-insensitive; spaces and underscores are interchangeable):
+
+    title, project, date_identified, description, recommendations  required
+    category, impact, status, implementation_notes, submitted_by, tags
+
+Projects and categories are matched by name or id, users by username or
+email. Tags are usernames separated by ";" or "," (or a JSON list) and must
+be members of the lesson's project.
+"""
+import csv
+from collections import defaultdict
+from datetime import date, datetime
+import io
+import json
+import os
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from projects.models import Project
+from . import notifications
+from .models import Category, Lesson
+from .pagination import bump_lesson_generation
+from .search import index_new_lessons
+from .stats import rebuild_project_stats
+
+IMPORT_FORMATS = ('csv', 'json', 'jsonl', 'xlsx')
+IMPORT_BATCH_SIZE = 500
+REQUIRED_COLUMNS = ('title', 'project', 'date_identified', 'description', 'recommendations')
+OPTIONAL_COLUMNS = ('category', 'impact', 'status', 'implementation_notes', 'submitted_by', 'tags')
+
+# Rows beyond this many errors are still counted, but not described
+MAX_REPORTED_ERRORS = 100
+
+
+class LessonImportError(Exception):
+    """The file as a whole cannot be imported (unreadable, unknown format, missing columns)."""
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    if extension == 'ndjson':
+        return 'jsonl'
+    if extension not in IMPORT_FORMATS:
+        raise LessonImportError(f"Unsupported file type '.{extension}'; use one of: {', '.join(IMPORT_FORMATS)}")
+    return extension
+
+
+def normalize_column(name):
+    return str(name or '').strip().lower().replace(' ', '_')
+
+
+def check_columns(columns):
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise LessonImportError(f"Missing required columns: {', '.join(missing)}")
+
+
+def read_rows(file, file_format):
+    """
+    Yield (row number, {column: value}) for each record in an open binary
+    file. CSV, JSON Lines and XLSX are streamed; a JSON file holds one array
+    and is parsed in one go.
+    """
+    if file_format == 'csv':
+        yield from read_csv(file)
+    elif file_format == 'jsonl':
+        yield from read_json_lines(file)
+    elif file_format == 'json':
+        yield from read_json(file)
+    elif file_format == 'xlsx':
+        yield from read_xlsx(file)
+    else:
+        raise LessonImportError(f"Unsupported format '{file_format}'")
+
+
+def read_csv(file):
+    stream = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(stream)
+        columns = [normalize_column(column) for column in next(reader, [])]
+        check_columns(columns)
+        for values in reader:
+            if any(value.strip() for value in values):
+                yield reader.line_num, dict(zip(columns, values))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise LessonImportError(f'Could not read the CSV file: {e}')
+    finally:
+        # Leave the underlying file open for the caller
+        stream.detach()
+
+
+def json_record(number, record):
+    if not isinstance(record, dict):
+        raise LessonImportError(f'Row {number}: expected a JSON object')
+    return {normalize_column(key): value for key, value in record.items()}
+
+
+def read_json(file):
+    try:
+        records = json.load(file)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise LessonImportError(f'Could not read the JSON file: {e}')
+    if not isinstance(records, list):
+        raise LessonImportError('A JSON import must contain a list of lesson objects')
+    if records:
+        check_columns(json_record(1, records[0]))
+    for number, record in enumerate(records, 1):
+        yield number, json_record(number, record)
+
+
+def read_json_lines(file):
+    checked = False
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json_record(number, json.loads(line))
+        except (UnicodeDecodeError, ValueError) as e:
+            raise LessonImportError(f'Could not read line {number}: {e}')
+        if not checked:
+            check_columns(row)
+            checked = True
+        yield number, row
+
+
+def read_xlsx(file):
+    try:
+        import openpyxl
+    except ImportError:
+        raise LessonImportError('XLSX import needs the openpyxl package; upload a CSV or JSON file instead')
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise LessonImportError(f'Could not read the XLSX file: {e}')
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        columns = [normalize_column(column) for column in next(rows, ())]
+        check_columns(columns)
+        for number, values in enumerate(rows, 2):
+            if any(value not in (None, '') for value in values):
+                yield number, dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+
+def choice_map(choices):
+    """Accept a choice by its stored value or its label, case-insensitively."""
+    mapping = {}
+    for value, label in choices:
+        mapping[value.lower()] = value
+        mapping[label.lower()] = value
+        mapping[label.lower().replace(' ', '_')] = value
+    return mapping
+
+
+def text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheet cells hold ids as floats
+        value = int(value)
+    return str(value).strip()
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.invalid = 0
+        self.errors = []
+        self.project_ids = set()
+        self.committed = False
+
+    @property
+    def valid(self):
+        return self.rows - self.invalid
+
+    def add_error(self, number, message):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((number, message))
+
+
+class LessonImporter:
+    """
+    Validate and insert lessons from rows produced by read_rows().
+
+    With a user, lessons may only be imported into that user's projects and
+    are submitted by them (staff may name another submitter). Unless skip_invalid is set, any
+    invalid row rolls the whole import back; with dry_run nothing is written.
+    """
+
+    def __init__(self, user=None, submitted_by=None, batch_size=IMPORT_BATCH_SIZE,
+                 skip_invalid=False, create_categories=False, dry_run=False, notify=True):
+        self.user = user
+        self.submitted_by = submitted_by or user
+        self.batch_size = batch_size
+        self.skip_invalid = skip_invalid
+        self.create_categories = create_categories
+        self.dry_run = dry_run
+        self.notify = notify
+        self.impacts = choice_map(Lesson.IMPACT_CHOICES)
+        self.statuses = choice_map(Lesson.STATUS_CHOICES)
+        self.title_length = Lesson._meta.get_field('title').max_length
+
+    def load_lookups(self):
+        """Load every project, category and user a row may refer to, once."""
+        projects = Project.objects.all()
+        if self.user is not None:
+            projects = projects.filter(team_members=self.user)
+        self.projects = {}
+        for pk, name in projects.values_list('pk', 'name'):
+            self.projects[str(pk)] = pk
+            self.projects.setdefault(name.strip().lower(), pk)
+
+        self.categories = {}
+        for pk, name in Category.objects.values_list('pk', 'name'):
+            self.categories[str(pk)] = pk
+            self.categories.setdefault(name.strip().lower(), pk)
+
+        self.users = {}
+        for pk, username, email in User.objects.values_list('pk', 'username', 'email'):
+            self.users[username.lower()] = pk
+            if email:
+                self.users.setdefault(email.lower(), pk)
+
+        # Like LessonForm, only a project's own members may be tagged on its lessons
+        self.members = defaultdict(set)
+        memberships = Project.team_members.through.objects.filter(project__in=projects)
+        for project_id, user_id in memberships.values_list('project_id', 'user_id'):
+            self.members[project_id].add(user_id)
+
+    def run(self, rows):
+        self.load_lookups()
+        result = ImportResult()
+        # user id -> ids of the imported lessons they were tagged in
+        self.tagged = defaultdict(list)
+
+        with transaction.atomic():
+            batch = []
+            for number, row in rows:
+                result.rows += 1
+                lesson, tag_ids, errors = self.clean_row(row)
+                if errors:
+                    result.invalid += 1
+                    result.add_error(number, '; '.join(errors))
+                    continue
+                batch.append((lesson, tag_ids))
+                if len(batch) >= self.batch_size:
+                    self.insert(batch, result)
+                    batch = []
+            self.insert(batch, result)
+
+            if self.dry_run or (result.invalid and not self.skip_invalid):
+                transaction.set_rollback(True)
+                result.created = 0
+            else:
+                result.committed = True
+                if self.notify and self.tagged:
+                    tagged = dict(self.tagged)
+                    transaction.on_commit(lambda: notifications.notify_tagged_in_import(tagged))
+
+        if result.committed and result.created:
+            # The per-lesson signal receivers did not run; catch up once
+            rebuild_project_stats(result.project_ids)
+            bump_lesson_generation()
+        return result
+
+    def clean_row(self, row):
+        """Return (unsaved Lesson, tagged user ids, error messages) for one row."""
+        errors = []
+        values = {column: text(row.get(column)) for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if column != 'tags'}
+
+        for column in REQUIRED_COLUMNS:
+            if not values[column]:
+                errors.append(f'{column} is required')
+
+        if len(values['title']) > self.title_length:
+            errors.append(f'title is longer than {self.title_length} characters')
+
+        project_id = None
+        if values['project']:
+            project_id = self.projects.get(values['project'].lower())
+            if project_id is None:
+                errors.append(f"unknown project '{values['project']}'")
+
+        category_id = None
+        if values['category']:
+            category_id = self.lookup_category(values['category'])
+            if category_id is None:
+                errors.append(f"unknown category '{values['category']}'")
+
+        date_identified = self.parse_date(row.get('date_identified'))
+        if values['date_identified'] and date_identified is None:
+            errors.append(f"invalid date_identified '{values['date_identified']}' (use YYYY-MM-DD)")
+
+        impact = self.impacts.get(values['impact'].lower()) if values['impact'] else 'MEDIUM'
+        if impact is None:
+            errors.append(f"invalid impact '{values['impact']}'")
+        status = self.statuses.get(values['status'].lower()) if values['status'] else 'NEW'
+        if status is None:
+            errors.append(f"invalid status '{values['status']}'")
+
+        submitted_by_id = getattr(self.submitted_by, 'pk', None)
+        if values['submitted_by']:
+            submitted_by_id = self.users.get(values['submitted_by'].lower())
+            if submitted_by_id is None:
+                errors.append(f"unknown user '{values['submitted_by']}' in submitted_by")
+            elif self.user is not None and not self.user.is_staff and submitted_by_id != self.user.pk:
+                # Members can only submit lessons as themselves, as in lesson_create
+                errors.append(f"you cannot import lessons submitted by '{values['submitted_by']}'")
+        elif submitted_by_id is None:
+            errors.append('submitted_by is required')
+
+        tag_ids = []
+        for name in self.tag_names(row.get('tags')):
+            user_id = self.users.get(name.lower())
+            if user_id is None:
+                errors.append(f"unknown user '{name}' in tags")
+            elif project_id is not None and user_id not in self.members[project_id]:
+                errors.append(f"'{name}' in tags is not a member of the project")
+            elif user_id not in tag_ids:
+                tag_ids.append(user_id)
+
+        if errors:
+            return None, None, errors
+        lesson = Lesson(
+            project_id=project_id,
+            category_id=category_id,
+            title=values['title'],
+            date_identified=date_identified,
+            description=values['description'],
+            recommendations=values['recommendations'],
+            implementation_notes=values['implementation_notes'],
+            impact=impact,
+            status=status,
+            submitted_by_id=submitted_by_id,
+        )
+        return lesson, tag_ids, []
+
+    def lookup_category(self, name):
+        category_id = self.categories.get(name.lower())
+        if category_id is None and self.create_categories and not name.isdigit():
+            category_id = self.categories[name.lower()] = Category.objects.create(name=name).pk
+        return category_id
+
+    def parse_date(self, value):
+        if isinstance(value, datetime):
+            # XLSX cells hold datetimes
+            return value.date()
+        if isinstance(value, date):
+            return value
+        try:
+            return parse_date(text(value))
+        except ValueError:
+            return None
+
+    def tag_names(self, value):
+        if isinstance(value, (list, tuple)):
+            names = value
+        else:
+            names = text(value).replace(',', ';').split(';')
+        return [text(name) for name in names if text(name)]
+
+    def insert(self, batch, result):
+        """Insert one batch of lessons with their tags and search index rows."""
+        if not batch or self.dry_run:
+            return
+        lessons = Lesson.objects.bulk_create([lesson for lesson, _ in batch])
+        Tag = Lesson.tags.through
+        Tag.objects.bulk_create([
+            Tag(lesson_id=lesson.pk, user_id=user_id)
+            for lesson, tag_ids in batch for user_id in tag_ids
+        ])
+        for lesson, tag_ids in batch:
+            for user_id in tag_ids:
+                self.tagged[user_id].append(lesson.pk)
+        index_new_lessons(lessons)
+        result.created += len(lessons)
+        result.project_ids.update(lesson.project_id for lesson in lessons)
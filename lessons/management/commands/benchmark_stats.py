@@ -0,0 +1,107 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import time
+
+from projects.models import Project
+from lessons.models import Category, Lesson
+from lessons.stats import summarize_lessons, summarize_projects, rebuild_project_stats
+
+
+class Command(BaseCommand):
+    help = 'Benchmark dashboard statistics queries against growing lesson volumes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--volumes', nargs='+', type=int, default=[100, 1000, 10000, 100000],
+            help='Lesson counts to benchmark (default: 100 1000 10000 100000)'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Number of timed runs per volume; the best run is reported'
+        )
+
+    def legacy_stats(self, queryset):
+        """The per-counter queries the dashboard used to issue."""
+        total = queryset.count()
+        list(queryset.values('category__name').annotate(count=Count('category')).order_by('-count'))
+        list(queryset.values('status').annotate(count=Count('status')).order_by('status'))
+        queryset.filter(impact='HIGH').count()
+        queryset.filter(status='NEW').count()
+        return total
+
+    def measure(self, func, queryset, repeat):
+        best = None
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                func(queryset)
+                elapsed = time.perf_counter() - start
+            queries = len(ctx.captured_queries)
+            best = elapsed if best is None else min(best, elapsed)
+        return queries, best * 1000
+
+    def handle(self, *args, **options):
+        volumes = sorted(options['volumes'])
+        repeat = options['repeat']
+
+        self.stdout.write(
+            f"{'lessons':>10} | {'legacy q':>8} {'legacy ms':>10} | {'engine q':>8} {'engine ms':>10}"
+            f" | {'rollup q':>8} {'rollup ms':>10}"
+        )
+        self.stdout.write('-' * 81)
+
+        # Everything is created inside a transaction that is rolled back, so
+        # the benchmark never leaves data behind.
+        with transaction.atomic():
+            user = User.objects.create_user(username='__benchmark_stats__')
+            project = Project.objects.create(
+                name='Benchmark Project',
+                description='Temporary project for statistics benchmarks',
+                start_date=timezone.now().date(),
+                created_by=user
+            )
+            project.team_members.add(user)
+            categories = [
+                Category.objects.create(name=f'Benchmark Category {i}') for i in range(5)
+            ]
+            statuses = [code for code, _ in Lesson.STATUS_CHOICES]
+            impacts = [code for code, _ in Lesson.IMPACT_CHOICES]
+
+            created = 0
+            today = timezone.now().date()
+            for volume in volumes:
+                batch = []
+                for i in range(created, volume):
+                    batch.append(Lesson(
+                        project=project,
+                        category=categories[i % len(categories)] if i % 7 else None,
+                        title=f'Benchmark Lesson {i}',
+                        date_identified=today,
+                        description='Benchmark description',
+                        recommendations='Benchmark recommendations',
+                        impact=impacts[i % len(impacts)],
+                        status=statuses[i % len(statuses)],
+                        submitted_by=user
+                    ))
+                Lesson.objects.bulk_create(batch, batch_size=1000)
+                rebuild_project_stats([project.id])
+                created = max(created, volume)
+
+                queryset = Lesson.objects.filter(project__in=user.projects.all())
+                legacy_q, legacy_ms = self.measure(self.legacy_stats, queryset, repeat)
+                engine_q, engine_ms = self.measure(summarize_lessons, queryset, repeat)
+                rollup_q, rollup_ms = self.measure(summarize_projects, user.projects.all(), repeat)
+
+                self.stdout.write(
+                    f'{created:>10} | {legacy_q:>8} {legacy_ms:>10.2f} | {engine_q:>8} {engine_ms:>10.2f}'
+                    f' | {rollup_q:>8} {rollup_ms:>10.2f}'
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete (all benchmark data rolled back)'))
@@ -0,0 +1,232 @@
+from datetime import datetime, timezone as dt_timezone
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lessons.models import Lesson
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(samples, pct):
+    """Linearly interpolated percentile of a non-empty list of numbers."""
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the core views through the test client, reporting latency percentiles, '
+        'query counts and query time. Seed data first, e.g. with generate_test_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Username to benchmark as (default: the member of the most projects)'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Timed requests per scenario (default: 20)'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=2,
+            help='Untimed requests per scenario to fill caches first (default: 2)'
+        )
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Only run scenarios whose name starts with this (may be repeated)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results as JSON to this file'
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON results of an earlier run to compare against'
+        )
+        parser.add_argument(
+            '--max-regression', type=float,
+            help='With --compare, fail if any p50 grows by more than this percentage '
+                 'or any query count grows'
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        scenarios = self.build_scenarios(user)
+        if options['scenarios']:
+            scenarios = [
+                scenario for scenario in scenarios
+                if any(scenario[0].startswith(prefix) for prefix in options['scenarios'])
+            ]
+        if not scenarios:
+            raise CommandError('No scenarios to run')
+
+        client = Client()
+        client.force_login(user)
+
+        self.stdout.write(
+            f"{'scenario':<28} {'p50 ms':>9} {'p90 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+            f" {'queries':>8} {'query ms':>9}"
+        )
+        self.stdout.write('-' * 87)
+
+        results = []
+        # Exports above the threshold are normally handed to run_export_worker;
+        # render them inline so the benchmark measures the export itself.
+        with override_settings(ALLOWED_HOSTS=['testserver'], EXPORT_BACKGROUND_THRESHOLD=2 ** 62):
+            for name, url in scenarios:
+                result = self.run_scenario(client, name, url, options['repeat'], options['warmup'])
+                results.append(result)
+                self.stdout.write(
+                    f"{name:<28} {result['p50_ms']:>9.2f} {result['p90_ms']:>9.2f} {result['p95_ms']:>9.2f}"
+                    f" {result['p99_ms']:>9.2f} {result['queries']:>8} {result['query_ms']:>9.2f}"
+                )
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': datetime.now(dt_timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cache': settings.CACHES['default']['BACKEND'],
+                'user': user.username,
+                'lessons': Lesson.objects.count(),
+                'user_lessons': Lesson.objects.filter(project__in=user.projects.all()).count(),
+                'repeat': options['repeat'],
+                'warmup': options['warmup'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['compare']:
+            self.compare(results, options['compare'], options['max_regression'])
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User "{username}" does not exist')
+        user = User.objects.annotate(project_count=Count('projects')).order_by('-project_count', 'pk').first()
+        if user is None or not user.project_count:
+            raise CommandError('No user belongs to a project; seed data first (e.g. generate_test_data)')
+        return user
+
+    def build_scenarios(self, user):
+        """(name, url) pairs covering the core views with data the user can see."""
+        lessons = Lesson.objects.filter(project__in=user.projects.all())
+        project = user.projects.annotate(lesson_count=Count('lessons')).order_by('-lesson_count', 'pk').first()
+        lesson = lessons.order_by('-created_date', '-pk').first()
+        category_id = lessons.exclude(category=None).values_list('category_id', flat=True).first()
+        search_term = lesson.title.split()[0].lower() if lesson else 'lesson'
+
+        lesson_list = reverse('lesson-list')
+        scenarios = [
+            ('dashboard', reverse('dashboard')),
+            ('lesson-list', lesson_list),
+            ('lesson-list:status', f'{lesson_list}?status=NEW'),
+            ('lesson-list:impact', f'{lesson_list}?impact=HIGH'),
+            ('lesson-list:project', f'{lesson_list}?project={project.pk}'),
+            ('lesson-list:search', f'{lesson_list}?q={search_term}'),
+            ('lesson-list:starred', f'{lesson_list}?is_starred=on'),
+            ('lesson-list:page-10', f'{lesson_list}?page=10'),
+            ('project-list', reverse('project-list')),
+            ('project-detail', reverse('project-detail', args=[project.pk])),
+            ('export:csv', f'{lesson_list}?project={project.pk}&export=csv'),
+            ('export:pdf', f'{lesson_list}?project={project.pk}&export=pdf'),
+        ]
+        if category_id:
+            scenarios.insert(5, ('lesson-list:category', f'{lesson_list}?category={category_id}'))
+        if lesson:
+            scenarios.insert(1, ('lesson-detail', reverse('lesson-detail', args=[lesson.pk])))
+        return scenarios
+
+    def request(self, client, url):
+        response = client.get(url)
+        if response.streaming:
+            # Streamed exports do their work while the body is consumed
+            b''.join(response.streaming_content)
+        return response
+
+    def run_scenario(self, client, name, url, repeat, warmup):
+        for _ in range(warmup):
+            self.request(client, url)
+
+        timings, query_counts, query_times = [], [], []
+        status = None
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = self.request(client, url)
+                timings.append((time.perf_counter() - start) * 1000)
+            status = response.status_code
+            query_counts.append(len(ctx.captured_queries))
+            query_times.append(sum(float(query['time']) for query in ctx.captured_queries) * 1000)
+
+        result = {'name': name, 'url': url, 'status': status, 'runs': repeat}
+        for pct in PERCENTILES:
+            result[f'p{pct}_ms'] = round(percentile(timings, pct), 3)
+        result.update(
+            min_ms=round(min(timings), 3),
+            max_ms=round(max(timings), 3),
+            mean_ms=round(sum(timings) / repeat, 3),
+            queries=max(query_counts),
+            query_ms=round(percentile(query_times, 50), 3),
+        )
+        return result
+
+    def compare(self, results, path, max_regression):
+        try:
+            with open(path) as handle:
+                baseline = {result['name']: result for result in json.load(handle)['results']}
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Could not read baseline results from {path}: {e}')
+
+        self.stdout.write(f"\nCompared with {path}:")
+        regressions = []
+        for result in results:
+            before = baseline.get(result['name'])
+            if before is None:
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            self.stdout.write(
+                f"{result['name']:<28} p50 {before['p50_ms']:>9.2f} -> {result['p50_ms']:>9.2f} ms"
+                f" ({change:+.1f}%)  queries {before['queries']} -> {result['queries']}"
+            )
+            if max_regression is not None and (change > max_regression or result['queries'] > before['queries']):
+                regressions.append(result['name'])
+
+        if regressions:
+            raise CommandError(f"Performance regressed in: {', '.join(regressions)}")
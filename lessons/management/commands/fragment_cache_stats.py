@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from lessons.fragments import fragment_stats, reset_fragment_stats
+
+
+class Command(BaseCommand):
+    help = 'Report hit ratios of the cached lesson page fragments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Clear the counters after reporting them'
+        )
+
+    def handle(self, *args, **options):
+        stats = fragment_stats()
+        if not stats:
+            self.stdout.write('No fragment cache lookups recorded yet')
+        else:
+            self.stdout.write(f"{'fragment':<20} {'hits':>8} {'misses':>8} {'ratio':>7}")
+            for name, counts in stats.items():
+                self.stdout.write(
+                    f"{name:<20} {counts['hits']:>8} {counts['misses']:>8} {counts['ratio']:>7.1%}"
+                )
+
+        if options['reset']:
+            reset_fragment_stats()
+            self.stdout.write(self.style.SUCCESS('Fragment cache counters reset'))
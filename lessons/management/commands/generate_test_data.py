@@ -0,0 +1,231 @@
+from datetime import timedelta
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Profile
+from projects.models import Project, ProjectRole
+from lessons.bulk import mute_signals
+from lessons.models import Category, Comment, Lesson
+from lessons.pagination import bump_lesson_generation
+from lessons.search import rebuild_search_index
+from lessons.stats import rebuild_project_stats
+
+CATEGORY_NAMES = [
+    'Technical', 'Process', 'Communication', 'Planning', 'Procurement',
+    'Quality', 'Safety', 'Stakeholders', 'Resourcing', 'Tooling',
+]
+
+WORDS = (
+    'schedule budget vendor design review testing deployment handover risk scope '
+    'requirement estimate meeting approval contract supplier integration training '
+    'documentation feedback delay change milestone resource quality audit backlog '
+    'release customer incident escalation dependency migration capacity workshop '
+    'prototype baseline forecast sign-off rollout outage defect interface permit'
+).split()
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words)).capitalize() + '.'
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a large, reproducible synthetic dataset for load testing, e.g. '
+        '--users 50000 --projects 2000 --lessons 1000000'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Users to create (default: 50)')
+        parser.add_argument('--projects', type=int, default=10, help='Projects to create (default: 10)')
+        parser.add_argument(
+            '--memberships', type=int, default=3,
+            help='Projects each user joins (default: 3)'
+        )
+        parser.add_argument('--lessons', type=int, default=1000, help='Lessons to create (default: 1000)')
+        parser.add_argument(
+            '--comments', type=float, default=2,
+            help='Average comments per lesson (default: 2)'
+        )
+        parser.add_argument(
+            '--stars', type=float, default=1,
+            help='Average stars per lesson (default: 1)'
+        )
+        parser.add_argument(
+            '--tags', type=float, default=0.5,
+            help='Average tagged users per lesson (default: 0.5)'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=1,
+            help='Random seed; the same seed and volumes produce the same data (default: 1)'
+        )
+        parser.add_argument(
+            '--prefix', default='loadtest',
+            help='Prefix for generated usernames and project names (default: loadtest)'
+        )
+        parser.add_argument(
+            '--password', default='password123',
+            help='Password for every generated user (default: password123)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Rows per INSERT batch (default: 5000)'
+        )
+        parser.add_argument(
+            '--skip-search-index', action='store_true',
+            help='Do not build the search index for the new lessons (run rebuild_search_index later)'
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+
+        if options['users'] < 1 or options['projects'] < 1:
+            raise CommandError('At least one user and one project are needed')
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Users prefixed "{prefix}_" already exist; choose another --prefix')
+
+        started = time.perf_counter()
+        # Bulk inserts send no per-row signals, but the receivers would still
+        # run for model construction and any save; derived data is rebuilt below.
+        with mute_signals(), transaction.atomic():
+            users = self.create_users(prefix, options['users'], options['password'])
+            categories = self.create_categories()
+            members = self.create_projects(prefix, options['projects'], users, options['memberships'])
+            lesson_count = self.create_lessons(options, members, categories)
+
+        self.step('Rebuilding lesson statistics')
+        rebuild_project_stats(list(members))
+        if not options['skip_search_index']:
+            self.step('Building search index')
+            rebuild_search_index(Lesson.objects.filter(project_id__in=list(members)), batch_size=1000)
+        bump_lesson_generation()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(users)} users, {len(members)} projects and {lesson_count} lessons '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def step(self, message):
+        self.stdout.write(f'{message}...')
+
+    def count(self, options, name):
+        """Per-lesson count for an average such as 2.5 (two, or three half the time)."""
+        average = options[name]
+        return int(average) + (self.rng.random() < average - int(average))
+
+    def create_users(self, prefix, total, password):
+        self.step(f'Creating {total} users')
+        # Hashing is deliberately slow, so every user shares one hash
+        password = make_password(password)
+        now = timezone.now()
+        User.objects.bulk_create((
+            User(
+                username=f'{prefix}_{i}', email=f'{prefix}_{i}@example.com', password=password,
+                first_name='Load', last_name=f'Tester {i}', date_joined=now
+            )
+            for i in range(total)
+        ), batch_size=self.batch_size)
+        users = list(
+            User.objects.filter(username__startswith=f'{prefix}_').order_by('pk').values_list('pk', flat=True)
+        )
+        Profile.objects.bulk_create((
+            Profile(user_id=user_id, job_title=self.rng.choice(['Engineer', 'Manager', 'Analyst', 'Lead']))
+            for user_id in users
+        ), batch_size=self.batch_size)
+        return users
+
+    def create_categories(self):
+        existing = {category.name: category.pk for category in Category.objects.filter(name__in=CATEGORY_NAMES)}
+        Category.objects.bulk_create([Category(name=name) for name in CATEGORY_NAMES if name not in existing])
+        return list(Category.objects.filter(name__in=CATEGORY_NAMES).order_by('pk').values_list('pk', flat=True))
+
+    def create_projects(self, prefix, total, users, memberships):
+        """Create the projects and memberships; returns {project_id: [member user ids]}."""
+        self.step(f'Creating {total} projects')
+        rng = self.rng
+        today = timezone.now().date()
+        owners = [rng.choice(users) for _ in range(total)]
+        projects = Project.objects.bulk_create([
+            Project(
+                name=f'{prefix} project {i}', description=sentence(rng, 20),
+                start_date=today - timedelta(days=rng.randrange(1500)), is_active=rng.random() < 0.8,
+                created_by_id=owners[i]
+            )
+            for i in range(total)
+        ], batch_size=self.batch_size)
+        project_ids = [project.pk for project in projects]
+
+        members = {project_id: {owner} for project_id, owner in zip(project_ids, owners)}
+        for user_id in users:
+            for project_id in rng.sample(project_ids, min(memberships, total)):
+                members[project_id].add(user_id)
+
+        self.step('Creating memberships')
+        Membership = Project.team_members.through
+        Membership.objects.bulk_create((
+            Membership(project_id=project_id, user_id=user_id)
+            for project_id, user_ids in members.items() for user_id in user_ids
+        ), batch_size=self.batch_size)
+        ProjectRole.objects.bulk_create((
+            ProjectRole(
+                project_id=project_id, user_id=user_id,
+                role='OWNER' if user_id == owner else rng.choice(['MANAGER', 'MEMBER', 'MEMBER', 'VIEWER'])
+            )
+            for (project_id, user_ids), owner in zip(members.items(), owners) for user_id in user_ids
+        ), batch_size=self.batch_size)
+        return {project_id: sorted(user_ids) for project_id, user_ids in members.items()}
+
+    def create_lessons(self, options, members, categories):
+        """Create lessons batch by batch, with their comments, stars and tags."""
+        total = options['lessons']
+        self.step(f'Creating {total} lessons')
+        rng = self.rng
+        today = timezone.now().date()
+        project_ids = list(members)
+        statuses = [code for code, _ in Lesson.STATUS_CHOICES]
+        impacts = [code for code, _ in Lesson.IMPACT_CHOICES]
+        Star = Lesson.starred_by.through
+        Tag = Lesson.tags.through
+
+        created = 0
+        while created < total:
+            batch = []
+            for _ in range(min(self.batch_size, total - created)):
+                project_id = rng.choice(project_ids)
+                batch.append(Lesson(
+                    project_id=project_id,
+                    category_id=rng.choice(categories) if rng.random() < 0.9 else None,
+                    submitted_by_id=rng.choice(members[project_id]),
+                    title=sentence(rng, 6)[:200],
+                    date_identified=today - timedelta(days=rng.randrange(1500)),
+                    description=f'<p>{sentence(rng, 40)}</p>',
+                    recommendations=f'<p>{sentence(rng, 25)}</p>',
+                    impact=rng.choice(impacts),
+                    status=rng.choice(statuses),
+                ))
+            lessons = Lesson.objects.bulk_create(batch)
+
+            comments, stars, tags = [], [], []
+            for lesson in lessons:
+                team = members[lesson.project_id]
+                for _ in range(self.count(options, 'comments')):
+                    comments.append(Comment(lesson_id=lesson.pk, author_id=rng.choice(team), text=sentence(rng, 15)))
+                for user_id in rng.sample(team, min(self.count(options, 'stars'), len(team))):
+                    stars.append(Star(lesson_id=lesson.pk, user_id=user_id))
+                for user_id in rng.sample(team, min(self.count(options, 'tags'), len(team))):
+                    tags.append(Tag(lesson_id=lesson.pk, user_id=user_id))
+            Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+            Star.objects.bulk_create(stars, batch_size=self.batch_size)
+            Tag.objects.bulk_create(tags, batch_size=self.batch_size)
+
+            created += len(lessons)
+            if created % (self.batch_size * 20) == 0 or created == total:
+                self.stdout.write(f'  {created}/{total} lessons')
+        return created
@@ -0,0 +1,91 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from lessons.imports import (
+    IMPORT_BATCH_SIZE, IMPORT_FORMATS, LessonImportError, LessonImporter, detect_format, read_rows
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Import lessons from a CSV, JSON, JSON Lines or XLSX file. Any invalid row aborts '
+        'the import unless --skip-invalid is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument(
+            '--format', choices=IMPORT_FORMATS,
+            help='File format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--submitted-by',
+            help='Username recorded as submitter for rows without a submitted_by column'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help=f'Lessons per INSERT batch (default: {IMPORT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--skip-invalid', action='store_true',
+            help='Import the valid rows and report the invalid ones'
+        )
+        parser.add_argument(
+            '--create-categories', action='store_true',
+            help='Create categories that do not exist yet instead of rejecting the row'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Validate every row without writing anything'
+        )
+        parser.add_argument(
+            '--no-notify', action='store_false', dest='notify',
+            help='Do not notify users tagged in the imported lessons'
+        )
+
+    def handle(self, *args, **options):
+        submitted_by = None
+        if options['submitted_by']:
+            try:
+                submitted_by = User.objects.get(username=options['submitted_by'])
+            except User.DoesNotExist:
+                raise CommandError(f"User \"{options['submitted_by']}\" does not exist")
+
+        importer = LessonImporter(
+            submitted_by=submitted_by,
+            batch_size=options['batch_size'],
+            skip_invalid=options['skip_invalid'],
+            create_categories=options['create_categories'],
+            dry_run=options['dry_run'],
+            notify=options['notify'],
+        )
+        started = time.perf_counter()
+        try:
+            file_format = options['format'] or detect_format(options['path'])
+            with open(options['path'], 'rb') as file:
+                result = importer.run(read_rows(file, file_format))
+        except OSError as e:
+            raise CommandError(f'Could not open {options["path"]}: {e}')
+        except LessonImportError as e:
+            raise CommandError(str(e))
+
+        for number, message in result.errors:
+            self.stderr.write(f'Row {number}: {message}')
+        if result.invalid > len(result.errors):
+            self.stderr.write(f'...and {result.invalid - len(result.errors)} more invalid rows')
+
+        if options['dry_run']:
+            self.stdout.write(f'Dry run: {result.valid} of {result.rows} rows are valid')
+        elif not result.committed:
+            raise CommandError(
+                f'{result.invalid} of {result.rows} rows are invalid; nothing was imported '
+                '(use --skip-invalid to import the valid rows)'
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Imported {result.created} lessons into {len(result.project_ids)} projects '
+                f'in {time.perf_counter() - started:.1f}s'
+                + (f', skipped {result.invalid} invalid rows' if result.invalid else '')
+            ))
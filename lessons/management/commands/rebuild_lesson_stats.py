@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lessons.stats import find_stats_drift, rebuild_project_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ProjectLessonStats rollup from the lessons table, or check it for drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drift between the rollup and the lessons table; do not rebuild'
+        )
+        parser.add_argument(
+            '--project', type=int, action='append', dest='projects',
+            help='Limit to the given project id (may be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        project_ids = options['projects']
+
+        if options['check']:
+            drift = find_stats_drift(project_ids)
+            for (project_id, status, impact, category_id), (expected, stored) in sorted(
+                drift.items(), key=lambda item: tuple(str(part) for part in item[0])
+            ):
+                self.stdout.write(
+                    f'Project {project_id} {status}/{impact} category={category_id}: '
+                    f'expected {expected}, stored {stored}'
+                )
+            if drift:
+                raise CommandError(f'{len(drift)} rollup rows are out of date; run without --check to rebuild')
+            self.stdout.write(self.style.SUCCESS('Lesson statistics are up to date'))
+            return
+
+        rows = rebuild_project_stats(project_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} lesson statistics rows'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from lessons.models import Lesson
+from lessons.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for lessons'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--project', type=int, action='append', dest='projects',
+            help='Limit to lessons in the given project id (may be repeated)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of lessons to read per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        lessons = Lesson.objects.all()
+        if options['projects']:
+            lessons = lessons.filter(project_id__in=options['projects'])
+
+        indexed = rebuild_search_index(lessons, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} lessons'))
@@ -0,0 +1,58 @@
+from concurrent.futures import ProcessPoolExecutor
+import time
+
+from django.core.management.base import BaseCommand
+
+from lessons.exports import claim_export_jobs, init_export_worker, run_export_job
+
+
+class Command(BaseCommand):
+    help = 'Render queued lesson exports in the background using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Number of worker processes; 0 renders exports in this process (default: 2)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process the jobs that are currently queued and exit'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Seconds to wait between polls when the queue is empty (default: 5)'
+        )
+
+    def process(self, job_ids, pool):
+        if pool is None:
+            statuses = [run_export_job(job_id) for job_id in job_ids]
+        else:
+            statuses = list(pool.map(run_export_job, job_ids))
+        for job_id, status in zip(job_ids, statuses):
+            self.stdout.write(f'Export job {job_id}: {status}')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        batch_size = max(workers, 1) * 2
+        pool = None
+        if workers > 0:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=init_export_worker)
+
+        processed = 0
+        try:
+            while True:
+                job_ids = claim_export_jobs(batch_size)
+                if job_ids:
+                    self.process(job_ids, pool)
+                    processed += len(job_ids)
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} export jobs'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from lessons.notifications import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Queue one digest email per user for their pending tag and comment notifications'
+
+    def handle(self, *args, **options):
+        digests = send_digests()
+        self.stdout.write(self.style.SUCCESS(f'Queued {digests} digest emails'))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from lessons.outbox import dispatch_outbox
+
+
+class Command(BaseCommand):
+    help = 'Send queued notification emails in batches over a single mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Emails sent per connection (default: EMAIL_OUTBOX_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Send the emails that are currently due and exit'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Seconds to wait between polls when nothing is due (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = dispatch_outbox(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent} emails, {failed} failed')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Sent {total_sent} emails ({total_failed} failed attempts)'))
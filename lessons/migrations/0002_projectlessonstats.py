@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_stats(apps, schema_editor):
+    Lesson = apps.get_model('lessons', 'Lesson')
+    ProjectLessonStats = apps.get_model('lessons', 'ProjectLessonStats')
+    rows = Lesson.objects.order_by().values(
+        'project_id', 'status', 'impact', 'category_id'
+    ).annotate(total=models.Count('id'))
+    ProjectLessonStats.objects.bulk_create([
+        ProjectLessonStats(
+            project_id=row['project_id'],
+            status=row['status'],
+            impact=row['impact'],
+            category_id=row['category_id'],
+            count=row['total'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('lessons', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectLessonStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('NEW', 'New'), ('ACKNOWLEDGED', 'Acknowledged'), ('IN_PROGRESS', 'In Progress'), ('IMPLEMENTED', 'Implemented'), ('ARCHIVED', 'Archived')], max_length=15)),
+                ('impact', models.CharField(choices=[('HIGH', 'High'), ('MEDIUM', 'Medium'), ('LOW', 'Low')], max_length=10)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='lessons.category')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lesson_stats', to='projects.project')),
+            ],
+            options={
+                'verbose_name_plural': 'Project lesson stats',
+                'unique_together': {('project', 'status', 'impact', 'category')},
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
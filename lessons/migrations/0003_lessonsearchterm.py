@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 00:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_index(apps, schema_editor):
+    from lessons.search import lesson_terms
+
+    Lesson = apps.get_model('lessons', 'Lesson')
+    LessonSearchTerm = apps.get_model('lessons', 'LessonSearchTerm')
+    batch = []
+    for lesson in Lesson.objects.order_by('pk').iterator(chunk_size=500):
+        batch.extend(
+            LessonSearchTerm(lesson_id=lesson.pk, term=term, weight=weight)
+            for term, weight in lesson_terms(lesson).items()
+        )
+        if len(batch) >= 10000:
+            LessonSearchTerm.objects.bulk_create(batch, batch_size=1000)
+            batch = []
+    LessonSearchTerm.objects.bulk_create(batch, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0002_projectlessonstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='lessons.lesson')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'lesson'], name='lessons_search_term_idx')],
+                'unique_together': {('lesson', 'term')},
+            },
+        ),
+        migrations.RunPython(populate_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0004_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['created_date', 'id'], name='lessons_created_id_idx'),
+        ),
+    ]
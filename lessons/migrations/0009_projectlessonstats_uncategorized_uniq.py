@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:10
+
+from django.db import migrations, models
+
+
+def merge_uncategorized_duplicates(apps, schema_editor):
+    """Fold duplicate uncategorized rows into one so the constraint can be added."""
+    ProjectLessonStats = apps.get_model('lessons', 'ProjectLessonStats')
+    duplicates = ProjectLessonStats.objects.filter(category__isnull=True).order_by().values(
+        'project_id', 'status', 'impact'
+    ).annotate(rows=models.Count('id'), total=models.Sum('count')).filter(rows__gt=1)
+    for key in duplicates:
+        rows = ProjectLessonStats.objects.filter(
+            category__isnull=True, project_id=key['project_id'],
+            status=key['status'], impact=key['impact']
+        ).order_by('pk')
+        keep = rows.first()
+        rows.exclude(pk=keep.pk).delete()
+        ProjectLessonStats.objects.filter(pk=keep.pk).update(count=key['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0008_notificationevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_uncategorized_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='projectlessonstats',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('project', 'status', 'impact'), name='lessons_stats_uncategorized_uniq'),
+        ),
+    ]
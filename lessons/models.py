@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from projects.models import Project
 
@@ -44,6 +45,19 @@ class Lesson(models.Model):
     tags = models.ManyToManyField(User, related_name='tagged_lessons', blank=True)
     starred_by = models.ManyToManyField(User, related_name='starred_lessons', blank=True)
     
+    class Meta:
+        indexes = [
+            # Supports keyset pagination of the lesson list (lessons.pagination)
+            models.Index(fields=['created_date', 'id'], name='lessons_created_id_idx'),
+            # Composite indexes for the project-scoped LessonFilter lookups
+            # used by the lesson list, dashboard and project pages
+            models.Index(fields=['project', '-created_date'], name='lessons_project_created_idx'),
+            models.Index(fields=['project', 'status'], name='lessons_project_status_idx'),
+            models.Index(fields=['project', 'impact'], name='lessons_project_impact_idx'),
+            models.Index(fields=['project', 'date_identified'], name='lessons_project_date_idx'),
+            models.Index(fields=['project', 'category'], name='lessons_project_category_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.title} ({self.project.name})"
 
@@ -64,4 +78,158 @@ class Comment(models.Model):
     created_date = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
-        return f"Comment by {self.author.username} on {self.lesson.title}"
\ No newline at end of file
+        return f"Comment by {self.author.username} on {self.lesson.title}"
+
+class ProjectLessonStats(models.Model):
+    """
+    Denormalized lesson counts per project, broken down by status, impact and
+    category. Rows are kept current by the Lesson signal handlers in
+    lessons.signals and can be rebuilt with `manage.py rebuild_lesson_stats`.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='lesson_stats')
+    status = models.CharField(max_length=15, choices=Lesson.STATUS_CHOICES)
+    impact = models.CharField(max_length=10, choices=Lesson.IMPACT_CHOICES)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('project', 'status', 'impact', 'category')
+        constraints = [
+            # NULLs never compare equal, so unique_together does not cover
+            # the uncategorized rows
+            models.UniqueConstraint(
+                fields=['project', 'status', 'impact'],
+                condition=models.Q(category__isnull=True),
+                name='lessons_stats_uncategorized_uniq',
+            ),
+        ]
+        verbose_name_plural = 'Project lesson stats'
+    
+    def __str__(self):
+        return f"{self.project.name}: {self.status}/{self.impact} = {self.count}"
+
+
+class LessonSearchTerm(models.Model):
+    """
+    Inverted index entry for full-text lesson search. Each row records how
+    strongly a term occurs in a lesson; see lessons.search for how rows are
+    built and queried.
+    """
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField(default=1)
+    
+    class Meta:
+        unique_together = ('lesson', 'term')
+        indexes = [
+            models.Index(fields=['term', 'lesson'], name='lessons_search_term_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.term} ({self.weight})"
+
+
+class ExportJob(models.Model):
+    """
+    A CSV or PDF export rendered in the background by the run_export_worker
+    command. Finished files are stored under MEDIA_ROOT/exports and reused for
+    identical requests while the underlying data is unchanged.
+    """
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('pdf', 'PDF'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    export_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    cache_key = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    file = models.FileField(upload_to='exports', blank=True)
+    row_count = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    started_date = models.DateTimeField(null=True, blank=True)
+    finished_date = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_date']
+        indexes = [
+            models.Index(fields=['status', 'created_date'], name='lessons_export_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_export_format_display()} export for {self.user.username} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('DONE', 'FAILED')
+
+
+class OutboxEmail(models.Model):
+    """
+    A notification email queued by the lesson signal handlers. Rows are sent
+    in batches over one SMTP connection by the send_queued_email command and
+    retried with exponential backoff when delivery fails.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_date = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    sent_date = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_date']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_date'], name='lessons_outbox_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
+
+
+class NotificationEvent(models.Model):
+    """
+    A tag or comment notification held back for a user who receives digest
+    emails. Pending events are collected into one email per recipient by the
+    send_notification_digests command.
+    """
+    KIND_CHOICES = [
+        ('TAG', 'Tagged in a lesson'),
+        ('COMMENT', 'Comment on a lesson'),
+    ]
+    
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_events')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='notification_events')
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, null=True, blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    sent_date = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_date']
+        indexes = [
+            models.Index(fields=['sent_date', 'recipient'], name='lessons_digest_pending_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} for {self.recipient.username}"
@@ -0,0 +1,121 @@
+from itertools import groupby
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from accounts.models import Profile
+from .models import Lesson, NotificationEvent
+from .outbox import enqueue_email
+
+
+def split_digest_users(users):
+    """Split users into (digest, immediate) lists by their profile preference."""
+    digest_ids = set(Profile.objects.filter(
+        user__in=users, email_digest=True
+    ).values_list('user_id', flat=True))
+    digest = [user for user in users if user.pk in digest_ids]
+    immediate = [user for user in users if user.pk not in digest_ids]
+    return digest, immediate
+
+
+def notify_tagged_users(lesson, user_ids):
+    """
+    Notify newly tagged users about a lesson. Users who opted into digests
+    get a pending NotificationEvent; everyone else shares one queued email.
+    """
+    users = list(User.objects.filter(pk__in=user_ids))
+    digest, immediate = split_digest_users(users)
+
+    NotificationEvent.objects.bulk_create([
+        NotificationEvent(recipient=user, kind='TAG', lesson=lesson) for user in digest
+    ])
+
+    if immediate:
+        html_message = render_to_string('lessons/email/tagged_notification.html', {
+            'lesson': lesson,
+            'project': lesson.project,
+            'submitted_by': lesson.submitted_by,
+            'site_url': settings.SITE_URL,
+        })
+        enqueue_email(
+            f'You were tagged in a lesson: {lesson.title}',
+            html_message,
+            [user.email for user in immediate]
+        )
+
+
+def notify_tagged_in_import(lesson_ids_by_user):
+    """
+    Notify the users tagged in a bulk import: one email per user listing all
+    of their lessons, rather than one per lesson. Digest users get the usual
+    pending NotificationEvent per lesson.
+    """
+    users = list(User.objects.filter(pk__in=lesson_ids_by_user))
+    digest, immediate = split_digest_users(users)
+
+    NotificationEvent.objects.bulk_create([
+        NotificationEvent(recipient=user, kind='TAG', lesson_id=lesson_id)
+        for user in digest for lesson_id in lesson_ids_by_user[user.pk]
+    ], batch_size=500)
+
+    lesson_ids = {lesson_id for user in immediate for lesson_id in lesson_ids_by_user[user.pk]}
+    lessons = Lesson.objects.select_related('project').in_bulk(lesson_ids)
+    for user in immediate:
+        tagged = [lessons[lesson_id] for lesson_id in lesson_ids_by_user[user.pk] if lesson_id in lessons]
+        html_message = render_to_string('lessons/email/import_tagged_notification.html', {
+            'lessons': tagged,
+            'site_url': settings.SITE_URL,
+        })
+        enqueue_email(
+            f'You were tagged in {len(tagged)} imported lesson{"s" if len(tagged) != 1 else ""}',
+            html_message,
+            [user.email]
+        )
+
+
+def notify_lesson_owner(comment):
+    """Notify a lesson's submitter about a new comment by someone else."""
+    lesson = comment.lesson
+    owner = lesson.submitted_by
+    if comment.author_id == owner.pk:
+        return
+
+    digest, _ = split_digest_users([owner])
+    if digest:
+        NotificationEvent.objects.create(recipient=owner, kind='COMMENT', lesson=lesson, comment=comment)
+        return
+
+    html_message = render_to_string('lessons/email/comment_notification.html', {
+        'lesson': lesson,
+        'comment': comment,
+        'author': comment.author,
+        'site_url': settings.SITE_URL,
+    })
+    enqueue_email(f'New comment on your lesson: {lesson.title}', html_message, [owner.email])
+
+
+def send_digests():
+    """
+    Queue one digest email per recipient covering all of their pending
+    notification events, and return the number of digests queued.
+    """
+    pending = NotificationEvent.objects.filter(sent_date__isnull=True).select_related(
+        'recipient', 'lesson__project', 'comment__author'
+    ).order_by('recipient_id', 'created_date')
+
+    digests = 0
+    now = timezone.now()
+    for recipient, events in groupby(pending, key=lambda event: event.recipient):
+        events = list(events)
+        html_message = render_to_string('lessons/email/digest_notification.html', {
+            'recipient': recipient,
+            'events': events,
+            'site_url': settings.SITE_URL,
+        })
+        subject = f'Lessons Learned digest: {len(events)} new notification{"s" if len(events) != 1 else ""}'
+        enqueue_email(subject, html_message, [recipient.email])
+        NotificationEvent.objects.filter(pk__in=[event.pk for event in events]).update(sent_date=now)
+        digests += 1
+    return digests
@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import OutboxEmail
+
+
+def enqueue_email(subject, html_message, recipient_list, from_email=None):
+    """
+    Queue an email for the send_queued_email dispatcher and return the row,
+    or None when there is nobody to send it to. Nothing touches the mail
+    server here, so callers never wait on SMTP.
+    """
+    recipients = [address for address in recipient_list if address]
+    if not recipients:
+        return None
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=strip_tags(html_message),
+        html_body=html_message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=recipients,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts."""
+    delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_MAX_RETRY_DELAY))
+
+
+def claim_outbox(limit):
+    """
+    Lease up to limit due emails and return them. A leased row is pushed into
+    the future rather than locked, so a dispatcher that dies mid-batch simply
+    lets its rows become due again.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+    due = OutboxEmail.objects.filter(
+        status='PENDING', next_attempt_date__lte=now
+    ).order_by('next_attempt_date').values_list('id', 'next_attempt_date')
+
+    claimed = []
+    for email_id, next_attempt_date in due[:limit]:
+        updated = OutboxEmail.objects.filter(
+            pk=email_id, status='PENDING', next_attempt_date=next_attempt_date
+        ).update(next_attempt_date=lease_until)
+        if updated:
+            claimed.append(email_id)
+    return list(OutboxEmail.objects.filter(pk__in=claimed))
+
+
+def build_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email, email.recipients, connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def dispatch_outbox(batch_size=None):
+    """
+    Send one batch of due emails over a single mail connection and return
+    (sent, failed) counts. Messages go out one at a time on the shared
+    connection so a rejected recipient only fails its own email; failures
+    are rescheduled with backoff until EMAIL_OUTBOX_MAX_ATTEMPTS is reached.
+    """
+    emails = claim_outbox(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not emails:
+        return 0, 0
+
+    sent = failed = 0
+    try:
+        connection = get_connection()
+        connection.open()
+    except Exception as exc:
+        # The server is unreachable; every claimed email counts as a failed attempt
+        for email in emails:
+            record_failure(email, exc)
+        return 0, len(emails)
+
+    try:
+        for email in emails:
+            try:
+                connection.send_messages([build_message(email, connection)])
+            except Exception as exc:
+                record_failure(email, exc)
+                failed += 1
+            else:
+                OutboxEmail.objects.filter(pk=email.pk).update(
+                    status='SENT', attempts=email.attempts + 1,
+                    sent_date=timezone.now(), last_error=''
+                )
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def record_failure(email, exc):
+    attempts = email.attempts + 1
+    if attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        changes = {'status': 'FAILED'}
+    else:
+        changes = {'next_attempt_date': timezone.now() + retry_delay(attempts)}
+    OutboxEmail.objects.filter(pk=email.pk).update(
+        attempts=attempts, last_error=f'{type(exc).__name__}: {exc}', **changes
+    )
@@ -0,0 +1,145 @@
+import base64
+import hashlib
+import json
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Cache key of a counter bumped whenever lessons change; cached list totals
+# include it in their keys so they are invalidated without being tracked.
+LESSON_GENERATION_KEY = 'lessons:generation'
+
+
+def lesson_generation():
+    # Like lesson_version(), a missing counter restarts from the clock so a
+    # value handed out before it was evicted (e.g. in an ETag) never recurs
+    generation = cache.get(LESSON_GENERATION_KEY)
+    if generation is None:
+        cache.add(LESSON_GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(LESSON_GENERATION_KEY)
+    return generation
+
+
+def bump_lesson_generation():
+    try:
+        cache.incr(LESSON_GENERATION_KEY)
+    except ValueError:
+        cache.set(LESSON_GENERATION_KEY, time.time_ns(), None)
+
+
+def lesson_count_cache_key(user, params):
+    """Cache key for the total of a user's filtered lesson list."""
+    payload = json.dumps({'user': user.pk, 'params': params}, sort_keys=True)
+    digest = hashlib.sha1(payload.encode()).hexdigest()
+    return f'lessons:count:{lesson_generation()}:{digest}'
+
+
+def encode_cursor(lesson, direction):
+    if isinstance(lesson, dict):
+        # A row from .values(), as used by the JSON API
+        created_date, pk = lesson['created_date'], lesson['id']
+    else:
+        created_date, pk = lesson.created_date, lesson.pk
+    payload = json.dumps({'d': created_date.isoformat(), 'i': pk, 'r': direction})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (created_date, id, direction) for a cursor token, or None if invalid."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        direction = payload['r']
+        if direction not in ('next', 'prev'):
+            return None
+        return datetime.fromisoformat(payload['d']), int(payload['i']), direction
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class CursorPage:
+    """A page of results from CursorPaginator, shaped like a Paginator page."""
+    
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+    
+    def __iter__(self):
+        return iter(self.object_list)
+    
+    def __len__(self):
+        return len(self.object_list)
+    
+    def has_next(self):
+        return self._has_next
+    
+    def has_previous(self):
+        return self._has_previous
+    
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+    
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1], 'next')
+        return None
+    
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0], 'prev')
+        return None
+
+
+class CursorPaginator:
+    """
+    Keyset pagination over (created_date, id), newest first.
+
+    Each page is fetched with a range condition on the indexed columns
+    instead of OFFSET, so deep pages cost the same as the first one. The
+    total count is cached (see lesson_count_cache_key) rather than
+    recomputed for every page.
+    """
+    
+    def __init__(self, queryset, per_page, count_cache_key=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.count_cache_key = count_cache_key
+    
+    @cached_property
+    def count(self):
+        if self.count_cache_key is None:
+            return self.queryset.count()
+        return cache.get_or_set(
+            self.count_cache_key,
+            lambda: self.queryset.count(),
+            settings.LESSON_COUNT_CACHE_TIMEOUT
+        )
+    
+    def get_page(self, cursor=None):
+        position = decode_cursor(cursor) if cursor else None
+        
+        if position is None:
+            items = list(self.queryset.order_by('-created_date', '-id')[:self.per_page + 1])
+            return CursorPage(items[:self.per_page], self, len(items) > self.per_page, False)
+        
+        created_date, pk, direction = position
+        if direction == 'next':
+            items = list(self.queryset.filter(
+                Q(created_date__lt=created_date) | Q(created_date=created_date, id__lt=pk)
+            ).order_by('-created_date', '-id')[:self.per_page + 1])
+            return CursorPage(items[:self.per_page], self, len(items) > self.per_page, True)
+        
+        items = list(self.queryset.filter(
+            Q(created_date__gt=created_date) | Q(created_date=created_date, id__gt=pk)
+        ).order_by('created_date', 'id')[:self.per_page + 1])
+        page_items = items[:self.per_page]
+        page_items.reverse()
+        return CursorPage(page_items, self, True, len(items) > self.per_page)
@@ -0,0 +1,146 @@
+import html
+import re
+
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.utils.html import strip_tags
+
+from .models import Lesson, LessonSearchTerm
+
+# Relative weight of a term occurrence in each indexed field
+FIELD_WEIGHTS = {
+    'title': 5,
+    'description': 2,
+    'recommendations': 2,
+    'implementation_notes': 1,
+}
+
+# Lesson fields whose changes require the lesson to be re-indexed
+INDEXED_FIELDS = set(FIELD_WEIGHTS)
+
+MAX_TERM_LENGTH = 64
+MIN_TERM_LENGTH = 2
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'in',
+    'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was',
+    'were', 'will', 'with',
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Split text (plain or Summernote HTML) into normalized search terms."""
+    if not text:
+        return []
+    text = html.unescape(strip_tags(text)).lower()
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall(text)
+        if len(token) >= MIN_TERM_LENGTH and token not in STOP_WORDS
+    ]
+
+
+def lesson_terms(lesson):
+    """Return {term: weight} for a lesson, summing weighted occurrences across fields."""
+    terms = {}
+    for field, field_weight in FIELD_WEIGHTS.items():
+        for token in tokenize(getattr(lesson, field, '')):
+            terms[token] = terms.get(token, 0) + field_weight
+    return terms
+
+
+def index_lesson(lesson):
+    """Replace the search index rows for a single lesson."""
+    with transaction.atomic():
+        LessonSearchTerm.objects.filter(lesson_id=lesson.pk).delete()
+        LessonSearchTerm.objects.bulk_create([
+            LessonSearchTerm(lesson_id=lesson.pk, term=term, weight=weight)
+            for term, weight in lesson_terms(lesson).items()
+        ])
+
+
+def index_new_lessons(lessons):
+    """Index lessons that have no index rows yet (e.g. just bulk-created)."""
+    LessonSearchTerm.objects.bulk_create([
+        LessonSearchTerm(lesson_id=lesson.pk, term=term, weight=weight)
+        for lesson in lessons
+        for term, weight in lesson_terms(lesson).items()
+    ], batch_size=1000)
+
+
+def rebuild_search_index(queryset=None, batch_size=500):
+    """Rebuild the index for the given lessons (or every lesson) in batches."""
+    if queryset is None:
+        queryset = Lesson.objects.all()
+    lessons = queryset.only('id', *FIELD_WEIGHTS).order_by('pk')
+
+    indexed = 0
+    with transaction.atomic():
+        LessonSearchTerm.objects.filter(lesson__in=queryset.values('pk')).delete()
+        batch = []
+        for lesson in lessons.iterator(chunk_size=batch_size):
+            batch.extend(
+                LessonSearchTerm(lesson_id=lesson.pk, term=term, weight=weight)
+                for term, weight in lesson_terms(lesson).items()
+            )
+            indexed += 1
+            if len(batch) >= batch_size * 20:
+                LessonSearchTerm.objects.bulk_create(batch, batch_size=1000)
+                batch = []
+        LessonSearchTerm.objects.bulk_create(batch, batch_size=1000)
+    return indexed
+
+
+def search_matches(query):
+    """
+    Return a values queryset of (lesson, score) for lessons containing every
+    term in the query, or None if the query has no searchable terms.
+
+    The final term is matched as a prefix so results update while the user is
+    still typing. Prefix matching uses a range on the indexed `term` column
+    rather than LIKE, so it can use the index on every database.
+    """
+    tokens = list(dict.fromkeys(tokenize(query)))
+    if not tokens:
+        return None
+
+    *exact, prefix = tokens
+    prefix_match = Q(term__gte=prefix, term__lt=prefix + '\uffff')
+    condition = prefix_match
+    whens = [When(prefix_match, then=Value(len(exact)))]
+    for position, token in enumerate(exact):
+        condition |= Q(term=token)
+        whens.insert(0, When(term=token, then=Value(position)))
+
+    return LessonSearchTerm.objects.filter(condition).values('lesson').annotate(
+        score=Sum('weight'),
+        matched=Count(Case(*whens, output_field=IntegerField()), distinct=True),
+    ).filter(matched=len(tokens)).order_by()
+
+
+def search_lessons(queryset, query):
+    """
+    Filter a lesson queryset to full-text matches for query and annotate each
+    lesson with a `search_rank` (higher is better).
+
+    Queries made only of terms the index skips (single characters such as
+    "C" in "C#", or stop words) fall back to an unranked substring match on
+    the indexed fields, since they would otherwise match every lesson.
+    """
+    matches = search_matches(query)
+    if matches is None:
+        text = query.strip()
+        if not text:
+            return queryset
+        condition = Q()
+        for field in FIELD_WEIGHTS:
+            condition |= Q(**{f'{field}__icontains': text})
+        return queryset.filter(condition)
+    return queryset.filter(pk__in=matches.values('lesson')).annotate(
+        search_rank=Subquery(
+            matches.filter(lesson=OuterRef('pk')).values('score')[:1],
+            output_field=IntegerField()
+        )
+    )
@@ -1,60 +1,193 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, post_init, pre_delete, m2m_changed
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from .models import Lesson, Comment
+from django.db import transaction
+from django.contrib.auth.models import User
+from django.db.models import Q
+from accounts.models import Profile
+from projects.models import Project
+from .models import Lesson, Comment, Category, Attachment
+from .stats import stats_key, adjust_project_stats, rebuild_project_stats
+from .search import index_lesson, rebuild_search_index, INDEXED_FIELDS
+from .pagination import bump_lesson_generation
+from .fragments import bump_lesson_version
+from .bulk import lessons_bulk_updated
+from . import notifications
 
-@receiver(post_save, sender=Lesson)
-def notify_tagged_users(sender, instance, created, **kwargs):
-    if created:
-        # Email tagged users
-        tagged_users = instance.tags.all()
-        if tagged_users:
-            subject = f'You were tagged in a lesson: {instance.title}'
-            
-            html_message = render_to_string('lessons/email/tagged_notification.html', {
-                'lesson': instance,
-                'project': instance.project,
-                'submitted_by': instance.submitted_by,
-                'site_url': settings.SITE_URL,
-            })
-            
-            plain_message = strip_tags(html_message)
-            
-            # Send to each tagged user
-            recipient_list = [user.email for user in tagged_users if user.email]
-            if recipient_list:
-                send_mail(
-                    subject,
-                    plain_message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    recipient_list,
-                    html_message=html_message,
-                )
+# Profile fields rendered next to user names in the cached lesson fragments
+FRAGMENT_PROFILE_FIELDS = {'job_title', 'image', 'thumbnails'}
+
+# Lesson fields whose changes move a lesson between ProjectLessonStats rows
+STATS_FIELD_NAMES = {'project', 'project_id', 'status', 'impact', 'category', 'category_id'}
+
+@receiver(m2m_changed, sender=Lesson.tags.through)
+def notify_tagged_users(sender, instance, action, reverse, pk_set, **kwargs):
+    # Tags are assigned after the lesson is saved, so notify on the m2m change
+    # itself, once the surrounding transaction has committed. Only users in
+    # pk_set were newly added; re-saving an unchanged tag list notifies nobody.
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        user_ids = [instance.pk]
+        lessons = list(Lesson.objects.filter(pk__in=pk_set).select_related('project', 'submitted_by'))
+    else:
+        user_ids = list(pk_set)
+        lessons = [instance]
+    
+    def send():
+        for lesson in lessons:
+            notifications.notify_tagged_users(lesson, user_ids)
+    transaction.on_commit(send)
 
 @receiver(post_save, sender=Comment)
 def notify_lesson_owner(sender, instance, created, **kwargs):
     if created:
-        lesson = instance.lesson
-        # Only notify if the comment author is not the lesson submitter
-        if instance.author != lesson.submitted_by:
-            subject = f'New comment on your lesson: {lesson.title}'
-            
-            html_message = render_to_string('lessons/email/comment_notification.html', {
-                'lesson': lesson,
-                'comment': instance,
-                'author': instance.author,
-                'site_url': settings.SITE_URL,
-            })
-            
-            plain_message = strip_tags(html_message)
-            
-            send_mail(
-                subject,
-                plain_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [lesson.submitted_by.email],
-                html_message=html_message,
-            )
\ No newline at end of file
+        transaction.on_commit(lambda: notifications.notify_lesson_owner(instance))
+
+@receiver(post_init, sender=Lesson)
+def remember_stats_key(sender, instance, **kwargs):
+    # Remember which rollup row the lesson was counted in when it was loaded
+    instance._stats_key = stats_key(instance)
+
+@receiver(post_save, sender=Lesson)
+def update_stats_on_save(sender, instance, created, update_fields=None, **kwargs):
+    new_key = stats_key(instance)
+    if created:
+        adjust_project_stats(new_key, 1)
+    elif update_fields is not None and not set(update_fields) & STATS_FIELD_NAMES:
+        # None of the counted fields were written
+        return
+    else:
+        old_key = getattr(instance, '_stats_key', None)
+        if old_key is None or new_key is None:
+            # The original values were not loaded, so recount the affected projects
+            project_ids = {key[0] for key in (old_key, new_key) if key} or {instance.project_id}
+            rebuild_project_stats(project_ids)
+        elif old_key != new_key:
+            adjust_project_stats(old_key, -1)
+            adjust_project_stats(new_key, 1)
+    instance._stats_key = new_key
+
+@receiver(post_delete, sender=Lesson)
+def update_stats_on_delete(sender, instance, **kwargs):
+    key = getattr(instance, '_stats_key', None) or stats_key(instance)
+    if key is not None:
+        adjust_project_stats(key, -1)
+
+@receiver(pre_delete, sender=Category)
+def remember_category_projects(sender, instance, **kwargs):
+    # Deleting a category nulls Lesson.category with a bulk UPDATE that sends
+    # no Lesson signals, so note which projects need recounting afterwards.
+    instance._stats_project_ids = list(
+        Lesson.objects.filter(category=instance).values_list('project_id', flat=True).distinct()
+    )
+
+@receiver(post_delete, sender=Category)
+def update_stats_on_category_delete(sender, instance, **kwargs):
+    project_ids = getattr(instance, '_stats_project_ids', None)
+    if project_ids:
+        rebuild_project_stats(project_ids)
+
+@receiver(post_save, sender=Lesson)
+def update_search_index(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & INDEXED_FIELDS:
+        return
+    if not created and any(field not in instance.__dict__ for field in INDEXED_FIELDS):
+        # Deferred text fields were not changed through this instance
+        return
+    index_lesson(instance)
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_lesson_counts(sender, **kwargs):
+    bump_lesson_generation()
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_on_category_change(sender, **kwargs):
+    # Category names appear on lesson pages whose ETags use the generation
+    bump_lesson_generation()
+
+@receiver(post_save, sender=User)
+def invalidate_on_user_change(sender, update_fields=None, **kwargs):
+    # Usernames appear in lesson lists and API responses; logins only write last_login
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_lesson_generation()
+
+@receiver(m2m_changed, sender=Lesson.starred_by.through)
+def invalidate_starred_counts(sender, action, **kwargs):
+    # Starred lessons can be filtered on, so cached totals depend on stars too
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_lesson_generation()
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_lesson_fragments(sender, instance, **kwargs):
+    bump_lesson_version(instance.pk)
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Attachment)
+@receiver(post_delete, sender=Attachment)
+def invalidate_lesson_fragments_on_related_change(sender, instance, **kwargs):
+    bump_lesson_version(instance.lesson_id)
+
+@receiver(m2m_changed, sender=Lesson.tags.through)
+def invalidate_lesson_fragments_on_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # The untagged lessons are only known before the rows are removed
+        instance._cleared_tag_lesson_ids = list(instance.tagged_lessons.values_list('pk', flat=True))
+    elif action == 'post_clear' and reverse:
+        bump_lesson_version(*getattr(instance, '_cleared_tag_lesson_ids', []))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        bump_lesson_version(*(pk_set or []) if reverse else [instance.pk])
+
+@receiver(post_save, sender=Project)
+def invalidate_lesson_fragments_on_project_change(sender, instance, created, **kwargs):
+    # The project name is rendered inside the cached lesson fragments
+    if not created:
+        bump_lesson_version(*instance.lessons.values_list('pk', flat=True))
+
+@receiver(post_save, sender=Category)
+def invalidate_lesson_fragments_on_category_change(sender, instance, created, **kwargs):
+    if not created:
+        bump_lesson_version(*Lesson.objects.filter(category=instance).values_list('pk', flat=True))
+
+@receiver(pre_delete, sender=Category)
+def remember_category_lessons(sender, instance, **kwargs):
+    instance._fragment_lesson_ids = list(
+        Lesson.objects.filter(category=instance).values_list('pk', flat=True)
+    )
+
+@receiver(post_delete, sender=Category)
+def invalidate_lesson_fragments_on_category_delete(sender, instance, **kwargs):
+    bump_lesson_version(*getattr(instance, '_fragment_lesson_ids', []))
+
+def lessons_showing_user(user_id):
+    """Lessons whose cached fragments show the user as submitter, tag or commenter."""
+    return Lesson.objects.filter(
+        Q(submitted_by_id=user_id) | Q(tags__id=user_id) | Q(comments__author_id=user_id)
+    ).values_list('pk', flat=True).distinct()
+
+@receiver(post_save, sender=User)
+def invalidate_lesson_fragments_on_user_change(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    bump_lesson_version(*lessons_showing_user(instance.pk))
+
+@receiver(post_save, sender=Profile)
+def invalidate_lesson_fragments_on_profile_change(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and not set(update_fields) & FRAGMENT_PROFILE_FIELDS):
+        return
+    # Job titles and profile images appear next to names in the fragments
+    bump_lesson_version(*lessons_showing_user(instance.user_id))
+
+@receiver(lessons_bulk_updated)
+def update_derived_data_on_bulk_update(sender, lesson_ids, project_ids, fields, **kwargs):
+    # One bulk UPDATE replaces the per-lesson post_save receivers above
+    if fields & STATS_FIELD_NAMES:
+        rebuild_project_stats(project_ids)
+    if fields & INDEXED_FIELDS:
+        rebuild_search_index(Lesson.objects.filter(pk__in=lesson_ids))
+    bump_lesson_generation()
+    bump_lesson_version(*lesson_ids)
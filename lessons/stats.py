@@ -0,0 +1,192 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from projects.models import Project
+from .models import Lesson, ProjectLessonStats
+
+# Lesson attributes that identify a ProjectLessonStats row
+STATS_KEY_FIELDS = ('project_id', 'status', 'impact', 'category_id')
+
+
+def summarize_lessons(queryset):
+    """
+    Compute the counters shown on the dashboard and project pages.
+
+    Totals, per-status and per-impact counts come from a single conditional
+    aggregation; the category breakdown needs one extra GROUP BY query, which
+    is skipped entirely when there are no lessons. The query count therefore
+    stays fixed no matter how many lessons the queryset covers.
+    """
+    aggregates = {'total': Count('id')}
+    for code, _ in Lesson.STATUS_CHOICES:
+        aggregates[f'status_{code}'] = Count('id', filter=Q(status=code))
+    for code, _ in Lesson.IMPACT_CHOICES:
+        aggregates[f'impact_{code}'] = Count('id', filter=Q(impact=code))
+
+    counts = queryset.order_by().aggregate(**aggregates)
+
+    by_category = {}
+    if counts['total']:
+        category_counts = queryset.order_by().values('category__name').annotate(
+            count=Count('id')
+        ).order_by('-count')
+        for item in category_counts:
+            category_name = item['category__name'] or 'Uncategorized'
+            by_category[category_name] = by_category.get(category_name, 0) + item['count']
+
+    return {
+        'total': counts['total'],
+        'by_status': {code: counts[f'status_{code}'] for code, _ in Lesson.STATUS_CHOICES},
+        'by_impact': {code: counts[f'impact_{code}'] for code, _ in Lesson.IMPACT_CHOICES},
+        'by_category': by_category,
+    }
+
+
+def summarize_projects(projects):
+    """
+    Same result as summarize_lessons(), read from the ProjectLessonStats
+    rollup in a single query instead of scanning lessons.
+    """
+    rows = ProjectLessonStats.objects.filter(project__in=projects).order_by().values(
+        'status', 'impact', 'category__name'
+    ).annotate(total=Sum('count'))
+
+    stats = {
+        'total': 0,
+        'by_status': {code: 0 for code, _ in Lesson.STATUS_CHOICES},
+        'by_impact': {code: 0 for code, _ in Lesson.IMPACT_CHOICES},
+        'by_category': {},
+    }
+    by_category = {}
+    for row in rows:
+        if not row['total']:
+            continue
+        stats['total'] += row['total']
+        stats['by_status'][row['status']] = stats['by_status'].get(row['status'], 0) + row['total']
+        stats['by_impact'][row['impact']] = stats['by_impact'].get(row['impact'], 0) + row['total']
+        category_name = row['category__name'] or 'Uncategorized'
+        by_category[category_name] = by_category.get(category_name, 0) + row['total']
+
+    stats['by_category'] = dict(sorted(by_category.items(), key=lambda item: -item[1]))
+    return stats
+
+
+def annotate_project_metrics(projects):
+    """
+    Annotate projects with member_count, lesson_count, high_impact_count and
+    latest_lesson_date for list pages.
+
+    Each metric is a correlated subquery (the lesson counts read the
+    ProjectLessonStats rollup), so one query covers every project and the
+    counts do not multiply each other as JOINed COUNTs would.
+    """
+    def rollup_total(**filters):
+        return Coalesce(Subquery(
+            ProjectLessonStats.objects.filter(project=OuterRef('pk'), **filters).order_by()
+            .values('project').annotate(total=Sum('count')).values('total')
+        ), 0)
+
+    members = Project.team_members.through.objects.filter(project=OuterRef('pk')).order_by().values(
+        'project'
+    ).annotate(total=Count('id')).values('total')
+    latest = Lesson.objects.filter(project=OuterRef('pk')).order_by('-created_date').values('created_date')[:1]
+
+    return projects.annotate(
+        member_count=Coalesce(Subquery(members), 0),
+        lesson_count=rollup_total(),
+        high_impact_count=rollup_total(impact='HIGH'),
+        latest_lesson_date=Subquery(latest),
+    )
+
+
+def stats_key(lesson):
+    """
+    Return the rollup row key for a lesson, or None if any of the key fields
+    were deferred when the instance was loaded.
+    """
+    if any(field not in lesson.__dict__ for field in STATS_KEY_FIELDS):
+        return None
+    return tuple(lesson.__dict__[field] for field in STATS_KEY_FIELDS)
+
+
+def adjust_project_stats(key, delta):
+    """Add delta to the rollup row identified by key, creating it if needed."""
+    project_id, status, impact, category_id = key
+    rows = ProjectLessonStats.objects.filter(
+        project_id=project_id, status=status, impact=impact, category_id=category_id
+    )
+    updated = rows.update(count=F('count') + delta)
+    if updated or delta <= 0:
+        return
+    # Another process may insert the same row between the UPDATE and here;
+    # the unique constraints turn that into an IntegrityError, after which the
+    # row exists and the UPDATE can be retried.
+    try:
+        with transaction.atomic():
+            _, created = ProjectLessonStats.objects.get_or_create(
+                project_id=project_id, status=status, impact=impact,
+                category_id=category_id, defaults={'count': delta}
+            )
+    except IntegrityError:
+        created = False
+    if not created:
+        rows.update(count=F('count') + delta)
+
+
+def count_project_stats(project_ids=None):
+    """Recount the rollup from the lessons table, keyed like STATS_KEY_FIELDS."""
+    lessons = Lesson.objects.order_by()
+    if project_ids is not None:
+        lessons = lessons.filter(project_id__in=project_ids)
+    rows = lessons.values(*STATS_KEY_FIELDS).annotate(total=Count('id'))
+    return {tuple(row[field] for field in STATS_KEY_FIELDS): row['total'] for row in rows}
+
+
+def stored_project_stats(project_ids=None):
+    """Read the rollup as currently stored, keyed like STATS_KEY_FIELDS."""
+    stored = ProjectLessonStats.objects.order_by()
+    if project_ids is not None:
+        stored = stored.filter(project_id__in=project_ids)
+    rows = stored.values(*STATS_KEY_FIELDS).annotate(total=Sum('count'))
+    return {
+        tuple(row[field] for field in STATS_KEY_FIELDS): row['total']
+        for row in rows if row['total']
+    }
+
+
+def find_stats_drift(project_ids=None):
+    """Return {key: (expected, stored)} for every rollup row that is out of date."""
+    expected = count_project_stats(project_ids)
+    stored = stored_project_stats(project_ids)
+    return {
+        key: (expected.get(key, 0), stored.get(key, 0))
+        for key in set(expected) | set(stored)
+        if expected.get(key, 0) != stored.get(key, 0)
+    }
+
+
+def rebuild_project_stats(project_ids=None):
+    """Replace the rollup rows for the given projects (or all projects) from scratch."""
+    expected = count_project_stats(project_ids)
+    with transaction.atomic():
+        stored = ProjectLessonStats.objects.all()
+        if project_ids is not None:
+            stored = stored.filter(project_id__in=project_ids)
+        stored.delete()
+        ProjectLessonStats.objects.bulk_create([
+            ProjectLessonStats(
+                project_id=project_id, status=status, impact=impact,
+                category_id=category_id, count=total
+            )
+            for (project_id, status, impact, category_id), total in expected.items()
+        ], batch_size=1000)
+    return len(expected)
+
+
+def status_breakdown(stats):
+    """Map status display names to counts, skipping statuses with no lessons."""
+    return {
+        label: stats['by_status'][code]
+        for code, label in Lesson.STATUS_CHOICES
+        if stats['by_status'][code]
+    }
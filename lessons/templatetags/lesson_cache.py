@@ -0,0 +1,46 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from lessons.fragments import record_fragment
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        value = cache.get(key)
+        record_fragment(self.fragment_name, value is not None)
+        if value is None:
+            value = self.nodelist.render(context)
+            cache.set(key, value, settings.LESSON_FRAGMENT_CACHE_TIMEOUT)
+        return value
+
+
+@register.tag('fragmentcache')
+def do_fragmentcache(parser, token):
+    """
+    Like {% cache %}, but counts hits and misses per fragment name (see
+    lessons.fragments.fragment_stats) and takes its timeout from
+    LESSON_FRAGMENT_CACHE_TIMEOUT.
+
+        {% fragmentcache lesson_body lesson.pk lesson_version %}
+            ...
+        {% endfragmentcache %}
+    """
+    nodelist = parser.parse(('endfragmentcache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 2:
+        raise template.TemplateSyntaxError(f"'{tokens[0]}' tag requires at least 1 argument.")
+    return FragmentCacheNode(
+        nodelist, tokens[1], [parser.compile_filter(token) for token in tokens[2:]]
+    )
@@ -1,5 +1,5 @@
 # lessons/tests.py
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -7,13 +7,64 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from datetime import timedelta
 import tempfile
 import os
+import shutil
 
 from projects.models import Project, ProjectRole
 from lessons.models import Category, Lesson, Attachment, Comment
 from lessons.forms import LessonForm, AttachmentForm, CommentForm
 from lessons.filters import LessonFilter
+from lessons.stats import (
+    summarize_lessons, summarize_projects, status_breakdown,
+    rebuild_project_stats, find_stats_drift, adjust_project_stats
+)
+from lessons.models import ProjectLessonStats, LessonSearchTerm, ExportJob
+from lessons.search import tokenize, search_lessons, rebuild_search_index
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import StringIO
+from django.http import StreamingHttpResponse
+from lessons.views import export_lessons_csv
+import csv
+import time
+from django.db import connection, IntegrityError, transaction
+from unittest.mock import patch
+from unittest import skipUnless
+from types import SimpleNamespace
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from lessons.models import OutboxEmail, NotificationEvent
+from lessons.outbox import enqueue_email, dispatch_outbox
+from lessons.exports import claim_export_jobs, request_export, REQUEUED_EXPORT_ERROR
+from django.conf import settings
+from lessons.notifications import send_digests
+from lessons.fragments import fragment_stats, lesson_version, reset_fragment_stats
+from lessons.pagination import encode_cursor, decode_cursor
+from lessons.management.commands.benchmark_views import percentile
+import json
+from lessons_learned.query_budget import QueryBudgetTestMixin
+from lessons.imports import LessonImporter, read_rows
+from lessons.pagination import lesson_generation
+from lessons.bulk import lessons_bulk_updated
+from django.db.models.signals import post_save
 
-class LessonsModelTests(TestCase):
+
+class TemporaryMediaRootMixin:
+    """Store the files a test class uploads in a MEDIA_ROOT removed afterwards."""
+    
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        cls.addClassCleanup(media_override.disable)
+        super().setUpClass()
+
+
+class LessonsModelTests(TemporaryMediaRootMixin, TestCase):
     """Tests for the lessons models."""
     
     def setUp(self):
@@ -703,3 +754,2020 @@ class LessonsFilterTests(TestCase):
         self.assertNotIn(self.lesson1, f.qs)
         self.assertIn(self.lesson2, f.qs)
         self.assertNotIn(self.lesson3, f.qs)
+
+
+class LessonsStatsTests(TestCase):
+    """Tests for the lesson statistics engine."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        
+        self.project = Project.objects.create(
+            name='Stats Project',
+            description='Project for statistics tests',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user)
+        
+        self.category = Category.objects.create(name='Technical')
+        
+    def create_lessons(self, count, start=0):
+        statuses = ['NEW', 'ACKNOWLEDGED', 'IMPLEMENTED']
+        impacts = ['HIGH', 'MEDIUM', 'LOW']
+        Lesson.objects.bulk_create([
+            Lesson(
+                project=self.project,
+                category=self.category if i % 2 == 0 else None,
+                title=f'Lesson {i}',
+                date_identified=timezone.now().date(),
+                description='Description',
+                recommendations='Recommendations',
+                impact=impacts[i % 3],
+                status=statuses[i % 3],
+                submitted_by=self.user
+            )
+            for i in range(start, start + count)
+        ])
+        # bulk_create bypasses the signals that maintain the rollup
+        rebuild_project_stats([self.project.id])
+        
+    def test_summarize_lessons_counts(self):
+        """Test that the aggregated counters match the lesson data."""
+        self.create_lessons(6)
+        stats = summarize_lessons(Lesson.objects.filter(project=self.project))
+        
+        self.assertEqual(stats['total'], 6)
+        self.assertEqual(stats['by_status']['NEW'], 2)
+        self.assertEqual(stats['by_status']['IMPLEMENTED'], 2)
+        self.assertEqual(stats['by_status']['ARCHIVED'], 0)
+        self.assertEqual(stats['by_impact']['HIGH'], 2)
+        self.assertEqual(stats['by_category'], {'Technical': 3, 'Uncategorized': 3})
+        self.assertEqual(
+            status_breakdown(stats),
+            {'New': 2, 'Acknowledged': 2, 'Implemented': 2}
+        )
+        
+    def test_summarize_lessons_empty(self):
+        """Test that an empty queryset skips the category query."""
+        with self.assertNumQueries(1):
+            stats = summarize_lessons(Lesson.objects.filter(project=self.project))
+        self.assertEqual(stats['total'], 0)
+        self.assertEqual(stats['by_category'], {})
+        
+    def test_summarize_lessons_query_count_is_constant(self):
+        """Test that the query count does not grow with lesson volume."""
+        queryset = Lesson.objects.filter(project__in=self.user.projects.all())
+        for volume in (10, 100):
+            self.create_lessons(volume, start=volume)
+            with self.assertNumQueries(2):
+                summarize_lessons(queryset)
+                
+    def test_dashboard_query_count_is_constant(self):
+        """Test that the dashboard issues the same number of queries as lessons grow."""
+        self.client.login(username='testuser', password='testpassword')
+        self.create_lessons(5)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('dashboard'))
+        self.create_lessons(50, start=5)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(response.context['total_lessons'], 55)
+        self.assertEqual(response.context['high_impact_count'], 19)
+
+
+class ProjectLessonStatsTests(TestCase):
+    """Tests for the incrementally maintained per-project rollup."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        
+        self.project = Project.objects.create(
+            name='Rollup Project',
+            description='Project for rollup tests',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user)
+        
+        self.other_project = Project.objects.create(
+            name='Other Project',
+            description='Another project',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        
+        self.category = Category.objects.create(name='Technical')
+        
+        self.lesson = Lesson.objects.create(
+            project=self.project,
+            category=self.category,
+            title='Rollup Lesson',
+            date_identified=timezone.now().date(),
+            description='Description',
+            recommendations='Recommendations',
+            impact='HIGH',
+            status='NEW',
+            submitted_by=self.user
+        )
+        
+    def assertRollupMatches(self):
+        self.assertEqual(find_stats_drift(), {})
+        self.assertEqual(
+            summarize_projects(Project.objects.all()),
+            summarize_lessons(Lesson.objects.all())
+        )
+        
+    def test_create_increments_rollup(self):
+        """Test that creating a lesson adds it to the rollup."""
+        stats = summarize_projects([self.project])
+        self.assertEqual(stats['total'], 1)
+        self.assertEqual(stats['by_status']['NEW'], 1)
+        self.assertEqual(stats['by_impact']['HIGH'], 1)
+        self.assertEqual(stats['by_category'], {'Technical': 1})
+        self.assertRollupMatches()
+        
+    def test_update_moves_lesson_between_rows(self):
+        """Test that changing status, impact, category or project moves the count."""
+        self.lesson.status = 'IMPLEMENTED'
+        self.lesson.impact = 'LOW'
+        self.lesson.save()
+        self.assertRollupMatches()
+        
+        self.lesson.category = None
+        self.lesson.project = self.other_project
+        self.lesson.save()
+        self.assertRollupMatches()
+        self.assertEqual(summarize_projects([self.project])['total'], 0)
+        self.assertEqual(summarize_projects([self.other_project])['by_category'], {'Uncategorized': 1})
+        
+    def test_update_of_unrelated_field_skips_rollup(self):
+        """Test that saving only uncounted fields does not touch the rollup."""
+        self.lesson.date_identified = timezone.now().date() - timedelta(days=1)
+        with self.assertNumQueries(1):
+            self.lesson.save(update_fields=['date_identified'])
+        self.assertRollupMatches()
+        
+    def test_update_of_deferred_instance(self):
+        """Test that saving a lesson loaded with deferred fields recounts the project."""
+        lesson = Lesson.objects.only('id', 'title').get(pk=self.lesson.pk)
+        lesson.status = 'ARCHIVED'
+        lesson.save()
+        self.assertRollupMatches()
+        
+    def test_delete_decrements_rollup(self):
+        """Test that deleting a lesson removes it from the rollup."""
+        self.lesson.delete()
+        self.assertEqual(summarize_projects([self.project])['total'], 0)
+        self.assertRollupMatches()
+        
+    def test_category_delete_recounts(self):
+        """Test that deleting a category moves its lessons to Uncategorized."""
+        self.category.delete()
+        self.assertEqual(summarize_projects([self.project])['by_category'], {'Uncategorized': 1})
+        self.assertRollupMatches()
+        
+    def test_uncategorized_rows_are_unique(self):
+        """Test that the rollup cannot hold two rows for the same uncategorized key."""
+        ProjectLessonStats.objects.create(project=self.project, status='NEW', impact='LOW', count=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ProjectLessonStats.objects.create(project=self.project, status='NEW', impact='LOW', count=1)
+        
+    def test_concurrent_first_insert_is_counted_once(self):
+        """Test that losing the race to create a rollup row adds to the winner's row."""
+        key = (self.project.pk, 'NEW', 'LOW', None)
+        get_or_create = ProjectLessonStats.objects.get_or_create
+        
+        def insert_from_other_process(**kwargs):
+            # The other process inserts the row after this one's UPDATE found none
+            ProjectLessonStats.objects.create(project=self.project, status='NEW', impact='LOW', count=1)
+            return get_or_create(**kwargs)
+        
+        with patch.object(ProjectLessonStats.objects, 'get_or_create', side_effect=insert_from_other_process):
+            adjust_project_stats(key, 1)
+        row = ProjectLessonStats.objects.get(project=self.project, category__isnull=True)
+        self.assertEqual((row.status, row.impact, row.count), ('NEW', 'LOW', 2))
+        
+    def test_project_delete_cascades(self):
+        """Test that deleting a project removes its rollup rows."""
+        self.project.delete()
+        self.assertFalse(ProjectLessonStats.objects.exists())
+        
+    def test_rebuild_command_checks_and_fixes_drift(self):
+        """Test that the management command reports and repairs drift."""
+        Lesson.objects.filter(pk=self.lesson.pk).update(status='IMPLEMENTED')
+        
+        with self.assertRaises(CommandError):
+            call_command('rebuild_lesson_stats', '--check', stdout=StringIO())
+        
+        call_command('rebuild_lesson_stats', stdout=StringIO())
+        out = StringIO()
+        call_command('rebuild_lesson_stats', '--check', stdout=out)
+        self.assertIn('up to date', out.getvalue())
+        self.assertRollupMatches()
+        
+    def test_project_detail_reads_rollup(self):
+        """Test that project_detail reads its counters without scanning lessons."""
+        ProjectLessonStats.objects.update(count=7)
+        self.client.login(username='testuser', password='testpassword')
+        response = self.client.get(reverse('project-detail', args=[self.project.id]))
+        self.assertEqual(response.context['lesson_stats']['total'], 7)
+        self.assertEqual(response.context['lesson_stats']['high_impact'], 7)
+
+
+class LessonSearchTests(TestCase):
+    """Tests for the full-text search index."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        
+        self.project = Project.objects.create(
+            name='Search Project',
+            description='Project for search tests',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user)
+        
+        self.vendor_lesson = Lesson.objects.create(
+            project=self.project,
+            title='Vendor onboarding delays',
+            date_identified=timezone.now().date(),
+            description='<p>Contracts with the <strong>vendor</strong> took&nbsp;months.</p>',
+            recommendations='<p>Start procurement early.</p>',
+            submitted_by=self.user
+        )
+        
+        self.testing_lesson = Lesson.objects.create(
+            project=self.project,
+            title='Regression testing gaps',
+            date_identified=timezone.now().date(),
+            description='<p>Manual testing missed a vendor integration bug.</p>',
+            recommendations='<p>Automate the regression suite.</p>',
+            implementation_notes='<p>Pipeline added in sprint 4.</p>',
+            submitted_by=self.user
+        )
+        
+    def search(self, query):
+        return list(search_lessons(Lesson.objects.all(), query).order_by('-search_rank'))
+        
+    def test_tokenize_strips_html(self):
+        """Test that Summernote markup and entities are stripped before indexing."""
+        self.assertEqual(
+            tokenize('<p>The <strong>Vendor</strong>&nbsp;API</p>'),
+            ['vendor', 'api']
+        )
+        
+    def test_search_covers_all_text_fields(self):
+        """Test that description, recommendations and notes are searchable."""
+        self.assertEqual(self.search('procurement'), [self.vendor_lesson])
+        self.assertEqual(self.search('pipeline'), [self.testing_lesson])
+        
+    def test_search_requires_every_term(self):
+        """Test that multi-word queries match lessons containing all terms."""
+        self.assertEqual(self.search('vendor automate'), [self.testing_lesson])
+        
+    def test_search_ranks_title_matches_first(self):
+        """Test that title matches outrank body matches."""
+        self.assertEqual(self.search('vendor'), [self.vendor_lesson, self.testing_lesson])
+        
+    def test_search_matches_last_term_as_prefix(self):
+        """Test that partially typed words still match."""
+        self.assertEqual(self.search('regression test'), [self.testing_lesson])
+        
+    def test_short_queries_fall_back_to_substring_match(self):
+        """Test that queries without indexable terms do not return every lesson."""
+        csharp_lesson = Lesson.objects.create(
+            project=self.project,
+            title='Upgrading C# tooling',
+            date_identified=timezone.now().date(),
+            description='<p>The build needed a newer SDK.</p>',
+            recommendations='<p>Pin the SDK version.</p>',
+            submitted_by=self.user
+        )
+        self.assertEqual(list(search_lessons(Lesson.objects.all(), 'C#')), [csharp_lesson])
+        self.assertEqual(list(search_lessons(Lesson.objects.all(), 'x')), [])
+        self.assertEqual(search_lessons(Lesson.objects.all(), '  ').count(), 3)
+        
+    def test_index_follows_updates_and_deletes(self):
+        """Test that the index is maintained when lessons change."""
+        self.vendor_lesson.title = 'Supplier onboarding delays'
+        self.vendor_lesson.description = '<p>Contracts took months.</p>'
+        self.vendor_lesson.save()
+        self.assertEqual(self.search('supplier'), [self.vendor_lesson])
+        self.assertEqual(self.search('vendor'), [self.testing_lesson])
+        
+        self.testing_lesson.delete()
+        self.assertEqual(self.search('vendor'), [])
+        
+    def test_rebuild_search_index(self):
+        """Test that the index can be rebuilt from scratch."""
+        LessonSearchTerm.objects.all().delete()
+        self.assertEqual(rebuild_search_index(), 2)
+        self.assertEqual(self.search('procurement'), [self.vendor_lesson])
+        
+    def test_lesson_list_q_filter(self):
+        """Test that lesson_list accepts a q= search and orders by rank."""
+        self.client.login(username='testuser', password='testpassword')
+        response = self.client.get(reverse('lesson-list'), {'q': 'vendor'})
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.vendor_lesson, self.testing_lesson]
+        )
+        
+        response = self.client.get(reverse('lesson-list'), {'q': 'pipeline'})
+        self.assertEqual(list(response.context['page_obj']), [self.testing_lesson])
+
+
+class LessonsExportTests(TestCase):
+    """Tests for the streaming CSV export."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        
+        self.project = Project.objects.create(
+            name='Export Project',
+            description='Project for export tests',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user)
+        
+        self.category = Category.objects.create(name='Technical')
+        
+        Lesson.objects.bulk_create([
+            Lesson(
+                project=self.project,
+                category=self.category if i % 2 else None,
+                title=f'Export Lesson {i}',
+                date_identified=timezone.now().date(),
+                description=f'Description {i}',
+                recommendations=f'Recommendations {i}',
+                impact='HIGH',
+                status='IN_PROGRESS',
+                submitted_by=self.user
+            )
+            for i in range(3000)
+        ])
+        
+    def test_export_is_streamed(self):
+        """Test that the export streams every lesson with display values."""
+        response = export_lessons_csv(Lesson.objects.filter(project=self.project))
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual(rows[0][0], 'Project')
+        self.assertEqual(len(rows), 3001)
+        self.assertEqual(rows[1][4], 'In Progress')
+        self.assertEqual(rows[1][5], 'High')
+        self.assertEqual(rows[1][8], 'testuser')
+        self.assertEqual({row[2] for row in rows[1:]}, {'', 'Technical'})
+        
+    def test_export_time_to_first_byte(self):
+        """Test that the header is sent before any lesson rows are fetched."""
+        start = time.perf_counter()
+        response = export_lessons_csv(Lesson.objects.filter(project=self.project))
+        chunks = iter(response.streaming_content)
+        
+        with self.assertNumQueries(0):
+            first_chunk = next(chunks)
+        time_to_first_byte = time.perf_counter() - start
+        
+        self.assertTrue(first_chunk.startswith(b'Project,Title'))
+        
+        remaining = sum(1 for _ in chunks)
+        total_time = time.perf_counter() - start
+        self.assertEqual(remaining, 3000)
+        self.assertLess(time_to_first_byte, total_time)
+        
+    def test_export_reads_rows_in_chunks(self):
+        """Test that rows are read as tuples without building model instances."""
+        response = export_lessons_csv(Lesson.objects.filter(project=self.project))
+        with CaptureQueriesContext(connection) as ctx:
+            b''.join(response.streaming_content)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('"lessons_lesson"."implementation_notes"', ctx.captured_queries[0]['sql'])
+        
+    def test_lesson_list_csv_export(self):
+        """Test that lesson_list?export=csv returns a streaming response."""
+        self.client.login(username='testuser', password='testpassword')
+        response = self.client.get(reverse('lesson-list'), {'export': 'csv', 'status': 'IN_PROGRESS'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="lessons_learned.csv"')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 3001)
+
+
+@override_settings(EXPORT_BACKGROUND_THRESHOLD=5)
+class ExportJobTests(TemporaryMediaRootMixin, TestCase):
+    """Tests for background export jobs."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.user2 = User.objects.create_user(
+            username='testuser2',
+            email='test2@example.com',
+            password='testpassword'
+        )
+        
+        self.project = Project.objects.create(
+            name='Export Project',
+            description='Project for export job tests',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user, self.user2)
+        
+        for i in range(8):
+            Lesson.objects.create(
+                project=self.project,
+                title=f'Queued Lesson {i}',
+                date_identified=timezone.now().date(),
+                description='Description',
+                recommendations='Recommendations',
+                impact='HIGH' if i % 2 else 'LOW',
+                submitted_by=self.user
+            )
+        
+        self.client.login(username='testuser', password='testpassword')
+        
+    def run_worker(self):
+        call_command('run_export_worker', '--once', '--workers', '0', stdout=StringIO())
+        
+    def test_small_exports_stay_synchronous(self):
+        """Test that exports under the threshold are returned directly."""
+        response = self.client.get(reverse('lesson-list'), {'export': 'csv', 'impact': 'HIGH'})
+        self.assertTrue(response.streaming)
+        self.assertFalse(ExportJob.objects.exists())
+        
+    def test_large_export_is_queued_and_served(self):
+        """Test that large exports are queued, rendered by the worker and downloadable."""
+        response = self.client.get(reverse('lesson-list'), {'export': 'csv'})
+        job = ExportJob.objects.get()
+        self.assertRedirects(response, reverse('export-job-status', args=[job.pk]))
+        self.assertEqual(job.status, 'PENDING')
+        
+        status = self.client.get(reverse('export-job-status', args=[job.pk]), {'format': 'json'}).json()
+        self.assertEqual(status['status'], 'PENDING')
+        self.assertIsNone(status['download_url'])
+        
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'DONE')
+        self.assertEqual(job.row_count, 8)
+        self.assertTrue(job.file.name.startswith('exports/'))
+        
+        response = self.client.get(reverse('export-job-download', args=[job.pk]))
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(content.splitlines()), 9)
+        self.assertIn('Queued Lesson 0', content)
+        
+    def test_pdf_export_job(self):
+        """Test that the HTML report can be rendered in the background."""
+        self.client.get(reverse('lesson-list'), {'export': 'pdf'})
+        self.run_worker()
+        job = ExportJob.objects.get()
+        self.assertEqual(job.status, 'DONE')
+        response = self.client.get(reverse('export-job-download', args=[job.pk]))
+        self.assertIn(b'Queued Lesson 0', b''.join(response.streaming_content))
+        
+    def test_identical_exports_reuse_artifact(self):
+        """Test that repeated exports of unchanged data reuse the stored file."""
+        self.client.get(reverse('lesson-list'), {'export': 'csv'})
+        self.client.get(reverse('lesson-list'), {'export': 'csv'})
+        self.assertEqual(ExportJob.objects.count(), 1)
+        self.run_worker()
+        job = ExportJob.objects.get()
+        
+        response = self.client.get(reverse('lesson-list'), {'export': 'csv', 'page': '2'})
+        self.assertRedirects(
+            response, reverse('export-job-download', args=[job.pk]), fetch_redirect_response=False
+        )
+        
+        # Another member with the same project scope shares the artifact
+        self.client.login(username='testuser2', password='testpassword')
+        self.client.get(reverse('lesson-list'), {'export': 'csv'})
+        shared = ExportJob.objects.get(user=self.user2)
+        self.assertEqual(shared.status, 'DONE')
+        self.assertEqual(shared.file.name, job.file.name)
+        
+    def test_changed_data_invalidates_artifact(self):
+        """Test that editing a lesson produces a new export."""
+        self.client.get(reverse('lesson-list'), {'export': 'csv'})
+        self.run_worker()
+        
+        lesson = Lesson.objects.first()
+        lesson.title = 'Edited title'
+        lesson.save()
+        
+        self.client.get(reverse('lesson-list'), {'export': 'csv'})
+        self.assertEqual(ExportJob.objects.filter(status='PENDING').count(), 1)
+        
+    def test_renamed_project_invalidates_artifact(self):
+        """Test that renaming the project or a submitter produces a new export."""
+        self.client.get(reverse('lesson-list'), {'export': 'csv'})
+        self.run_worker()
+        
+        self.project.name = 'Renamed Project'
+        self.project.save()
+        self.client.get(reverse('lesson-list'), {'export': 'csv'})
+        self.assertEqual(ExportJob.objects.filter(status='PENDING').count(), 1)
+        self.run_worker()
+        
+        self.user.username = 'renameduser'
+        self.user.save()
+        self.client.get(reverse('lesson-list'), {'export': 'csv'})
+        self.assertEqual(ExportJob.objects.filter(status='PENDING').count(), 1)
+        
+    def test_starred_exports_are_not_shared(self):
+        """Test that users in the same projects get their own starred-lesson exports."""
+        first, second = Lesson.objects.order_by('pk')[:2]
+        first.starred_by.add(self.user)
+        second.starred_by.add(self.user2)
+        # Same count and latest modified_date for both starred sets
+        Lesson.objects.update(modified_date=timezone.now())
+        
+        job = request_export(self.user, 'csv', QueryDict('is_starred=on'))
+        self.run_worker()
+        other_job = request_export(self.user2, 'csv', QueryDict('is_starred=on'))
+        self.assertNotEqual(other_job.cache_key, job.cache_key)
+        self.assertEqual(other_job.status, 'PENDING')
+        
+        self.run_worker()
+        other_job.refresh_from_db()
+        content = other_job.file.read().decode()
+        self.assertIn(second.title, content)
+        self.assertNotIn(first.title, content)
+        
+    def test_stale_running_jobs_are_requeued_once(self):
+        """Test that jobs abandoned by a crashed worker are retried, then failed."""
+        self.client.get(reverse('lesson-list'), {'export': 'csv'})
+        job = ExportJob.objects.get()
+        abandoned = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT + 1)
+        ExportJob.objects.filter(pk=job.pk).update(status='RUNNING', started_date=abandoned)
+        
+        self.assertEqual(claim_export_jobs(1), [job.pk])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('RUNNING', REQUEUED_EXPORT_ERROR))
+        
+        # A job that is still running within the timeout is left alone
+        self.assertEqual(claim_export_jobs(1), [])
+        
+        ExportJob.objects.filter(pk=job.pk).update(started_date=abandoned)
+        self.assertEqual(claim_export_jobs(1), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+        
+    def test_requeued_job_clears_error_when_done(self):
+        """Test that a requeued job that finishes is not reported with an error."""
+        self.client.get(reverse('lesson-list'), {'export': 'csv'})
+        abandoned = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT + 1)
+        ExportJob.objects.update(status='RUNNING', started_date=abandoned)
+        self.run_worker()
+        job = ExportJob.objects.get()
+        self.assertEqual((job.status, job.error), ('DONE', ''))
+        
+    def test_jobs_are_private(self):
+        """Test that users cannot see or download other users' exports."""
+        self.client.get(reverse('lesson-list'), {'export': 'csv'})
+        self.run_worker()
+        job = ExportJob.objects.get()
+        
+        self.client.login(username='testuser2', password='testpassword')
+        self.assertEqual(self.client.get(reverse('export-job-status', args=[job.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export-job-download', args=[job.pk])).status_code, 404)
+
+
+class LessonListQueryTests(TestCase):
+    """Regression tests for the number of queries issued by lesson_list."""
+    
+    # session, user, three filter choice lists, paginator count, page of
+    # lessons, bulk action categories
+    EXPECTED_QUERIES = 8
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        
+        self.project = Project.objects.create(
+            name='List Project',
+            description='Project for lesson list query tests',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user)
+        self.category = Category.objects.create(name='Technical')
+        
+        self.client.login(username='testuser', password='testpassword')
+        
+    def create_lessons(self, count):
+        lessons = Lesson.objects.bulk_create([
+            Lesson(
+                project=self.project,
+                category=self.category,
+                title=f'Lesson {i}',
+                date_identified=timezone.now().date(),
+                description='Description',
+                recommendations='Recommendations',
+                submitted_by=self.user
+            )
+            for i in range(count)
+        ])
+        return Lesson.objects.filter(pk__in=[lesson.pk for lesson in lessons])
+        
+    def test_query_count_is_constant(self):
+        """Test that a full page costs the same number of queries as a single lesson."""
+        lessons = self.create_lessons(1)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            self.client.get(reverse('lesson-list'))
+        
+        lessons = self.create_lessons(30)
+        for lesson in lessons[:10]:
+            lesson.starred_by.add(self.user)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(reverse('lesson-list'))
+        self.assertEqual(len(response.context['page_obj']), 12)
+        
+    def test_starred_lessons_are_flagged(self):
+        """Test that the starred flag is computed per lesson for the current user."""
+        lessons = list(self.create_lessons(2).order_by('pk'))
+        lessons[0].starred_by.add(self.user)
+        
+        other = User.objects.create_user(username='other', password='testpassword')
+        lessons[1].starred_by.add(other)
+        
+        response = self.client.get(reverse('lesson-list'))
+        flags = {lesson.pk: lesson.is_starred_by_user for lesson in response.context['page_obj']}
+        self.assertEqual(flags, {lessons[0].pk: True, lessons[1].pk: False})
+        self.assertContains(response, 'fa-star text-warning', count=2)
+
+
+
+class LessonCursorPaginationTests(TestCase):
+    """Tests for keyset (cursor) pagination of the lesson list."""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        
+        self.project = Project.objects.create(
+            name='Cursor Project',
+            description='Project for cursor pagination tests',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user)
+        
+        Lesson.objects.bulk_create([
+            Lesson(
+                project=self.project,
+                title=f'Cursor Lesson {i}',
+                date_identified=timezone.now().date(),
+                description='Description',
+                recommendations='Recommendations',
+                submitted_by=self.user
+            )
+            for i in range(40)
+        ])
+        
+        self.client.login(username='testuser', password='testpassword')
+        
+    def get_page(self, query):
+        return self.client.get(reverse('lesson-list') + query)
+        
+    def test_cursor_round_trip(self):
+        """Test that cursors encode and decode the position and direction."""
+        lesson = Lesson.objects.first()
+        created_date, pk, direction = decode_cursor(encode_cursor(lesson, 'next'))
+        self.assertEqual((created_date, pk, direction), (lesson.created_date, lesson.pk, 'next'))
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        
+    def test_walks_all_lessons_forward_and_back(self):
+        """Test that next and previous links cover every lesson exactly once."""
+        response = self.get_page('?paginate=cursor')
+        self.assertTrue(response.context['cursor_mode'])
+        self.assertIsNone(response.context['previous_url'])
+        
+        pages = [[lesson.pk for lesson in response.context['page_obj']]]
+        while response.context['next_url']:
+            response = self.get_page(response.context['next_url'])
+            pages.append([lesson.pk for lesson in response.context['page_obj']])
+        
+        seen = [pk for page in pages for pk in page]
+        expected = list(Lesson.objects.order_by('-created_date', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(page) for page in pages], [12, 12, 12, 4])
+        
+        # Walking back from the last page returns the same pages in reverse
+        for page in reversed(pages[:-1]):
+            response = self.get_page(response.context['previous_url'])
+            self.assertEqual([lesson.pk for lesson in response.context['page_obj']], page)
+        self.assertIsNone(response.context['previous_url'])
+        
+    def test_invalid_cursor_shows_first_page(self):
+        """Test that a malformed cursor falls back to the first page."""
+        response = self.get_page('?cursor=garbage')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['cursor_mode'])
+        self.assertFalse(response.context['page_obj'].has_previous())
+        self.assertEqual(len(response.context['page_obj']), 12)
+        
+    def test_deep_pages_reuse_cached_count(self):
+        """Test that later pages skip the COUNT query and cost a fixed number of queries."""
+        first = self.get_page('?paginate=cursor')
+        self.assertEqual(first.context['page_obj'].paginator.count, 40)
+        
+        second = self.get_page(first.context['next_url'])
+        with CaptureQueriesContext(connection) as ctx:
+            third = self.get_page(second.context['next_url'])
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in ctx.captured_queries))
+        
+        with CaptureQueriesContext(connection) as deeper:
+            self.get_page(third.context['next_url'])
+        self.assertEqual(len(deeper.captured_queries), len(ctx.captured_queries))
+        
+    def test_cached_count_invalidated_by_new_lesson(self):
+        """Test that creating a lesson refreshes the cached total."""
+        response = self.get_page('?paginate=cursor')
+        self.assertEqual(response.context['page_obj'].paginator.count, 40)
+        
+        Lesson.objects.create(
+            project=self.project,
+            title='Fresh Lesson',
+            date_identified=timezone.now().date(),
+            description='Description',
+            recommendations='Recommendations',
+            submitted_by=self.user
+        )
+        response = self.get_page('?paginate=cursor')
+        self.assertEqual(response.context['page_obj'].paginator.count, 41)
+        self.assertEqual(response.context['page_obj'].object_list[0].title, 'Fresh Lesson')
+        
+    def test_search_keeps_page_numbers(self):
+        """Test that ranked search results fall back to offset pagination."""
+        rebuild_search_index()
+        response = self.get_page('?paginate=cursor&q=cursor')
+        self.assertFalse(response.context['cursor_mode'])
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 4)
+        
+    @override_settings(LESSON_LIST_PAGINATION='cursor')
+    def test_setting_enables_cursor_mode(self):
+        """Test that LESSON_LIST_PAGINATION switches the default mode."""
+        response = self.get_page('')
+        self.assertTrue(response.context['cursor_mode'])
+        self.assertContains(response, 'Older')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plan assertions use SQLite EXPLAIN QUERY PLAN output')
+class LessonIndexTests(TestCase):
+    """EXPLAIN-based checks that the key lesson queries are served by an index."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        
+        self.project = Project.objects.create(
+            name='Index Project',
+            description='Project for query plan tests',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user)
+        self.category = Category.objects.create(name='Technical')
+        
+        Lesson.objects.bulk_create([
+            Lesson(
+                project=self.project,
+                category=self.category,
+                title=f'Index Lesson {i}',
+                date_identified=timezone.now().date() - timedelta(days=i),
+                description='Description',
+                recommendations='Recommendations',
+                impact=('HIGH', 'MEDIUM', 'LOW')[i % 3],
+                status=('NEW', 'IN_PROGRESS', 'IMPLEMENTED')[i % 3],
+                submitted_by=self.user
+            )
+            for i in range(50)
+        ])
+        rebuild_project_stats()
+        
+    def assert_uses_index(self, queryset, index_name=None):
+        """Assert that no table in the plan is read with a full scan."""
+        plan = queryset.explain()
+        for line in plan.splitlines():
+            if ' SCAN ' in f' {line} ':
+                self.assertIn('USING', line, f'Full table scan in plan:\n{plan}')
+        if index_name:
+            self.assertIn(index_name, plan)
+        return plan
+        
+    def lesson_list_queryset(self, params=''):
+        request = SimpleNamespace(user=self.user)
+        lessons = Lesson.objects.filter(project__in=self.user.projects.all())
+        return LessonFilter(QueryDict(params), queryset=lessons, request=request).qs
+        
+    def test_lesson_list_filters_use_composite_indexes(self):
+        """Test that LessonFilter lookups pick the matching (project, ...) index."""
+        cases = {
+            'status=NEW': 'lessons_project_status_idx',
+            'impact=HIGH': 'lessons_project_impact_idx',
+            f'category={self.category.pk}': 'lessons_project_category_idx',
+            'date_from=2024-01-01': 'lessons_project_date_idx',
+        }
+        for params, index_name in cases.items():
+            with self.subTest(params=params):
+                self.assert_uses_index(self.lesson_list_queryset(params), index_name)
+        
+    def test_lesson_list_page_uses_index(self):
+        """Test that the unfiltered, ordered lesson list page avoids a full scan."""
+        queryset = self.lesson_list_queryset().order_by('-created_date')[:12]
+        self.assert_uses_index(queryset)
+        
+    def test_dashboard_queries_use_indexes(self):
+        """Test that the dashboard's rollup and latest-lessons queries use indexes."""
+        projects = self.user.projects.all()
+        self.assert_uses_index(ProjectLessonStats.objects.filter(project__in=projects))
+        self.assert_uses_index(
+            Lesson.objects.filter(project__in=projects).order_by('-created_date')[:5]
+        )
+        
+    def test_project_detail_queries_use_indexes(self):
+        """Test that per-project lesson queries are served by the project indexes."""
+        self.assert_uses_index(
+            self.project.lessons.order_by('-created_date'), 'lessons_project_created_idx'
+        )
+        self.assert_uses_index(self.project.lessons.filter(status='IMPLEMENTED'), 'lessons_project_status_idx')
+        self.assert_uses_index(ProjectLessonStats.objects.filter(project=self.project))
+
+
+class RecordingEmailBackend(LocmemEmailBackend):
+    """Locmem backend that counts connections and rejects chosen recipients."""
+    opened = 0
+    rejected = set()
+    
+    def open(self):
+        RecordingEmailBackend.opened += 1
+        return super().open()
+    
+    def send_messages(self, messages):
+        for message in messages:
+            if set(message.to) & self.rejected:
+                raise ConnectionError('Recipient refused')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='lessons.tests.RecordingEmailBackend',
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_RETRY_DELAY=60,
+)
+class OutboxEmailTests(TestCase):
+    """Tests for the queued notification email pipeline."""
+    
+    def setUp(self):
+        RecordingEmailBackend.opened = 0
+        RecordingEmailBackend.rejected = set()
+        self.owner = User.objects.create_user(
+            username='owner',
+            email='owner@example.com',
+            password='testpassword'
+        )
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        
+        self.project = Project.objects.create(
+            name='Outbox Project',
+            description='Project for outbox tests',
+            start_date=timezone.now().date(),
+            created_by=self.owner
+        )
+        self.project.team_members.add(self.owner, self.user)
+        
+        self.lesson = Lesson.objects.create(
+            project=self.project,
+            title='Outbox Lesson',
+            date_identified=timezone.now().date(),
+            description='Description',
+            recommendations='Recommendations',
+            submitted_by=self.owner
+        )
+        
+        self.client.login(username='testuser', password='testpassword')
+        
+    def test_comment_only_queues_email(self):
+        """Test that posting a comment queues a notification without contacting the mail server."""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('lesson-detail', kwargs={'pk': self.lesson.pk}),
+                {'text': 'A new comment'}
+            )
+        self.assertEqual(response.status_code, 302)
+        
+        queued = OutboxEmail.objects.get()
+        self.assertEqual(queued.recipients, ['owner@example.com'])
+        self.assertEqual(queued.status, 'PENDING')
+        self.assertIn('Outbox Lesson', queued.subject)
+        self.assertEqual(RecordingEmailBackend.opened, 0)
+        self.assertEqual(len(mail.outbox), 0)
+        
+    def test_dispatch_batches_over_one_connection(self):
+        """Test that a batch of emails is sent over a single connection."""
+        for i in range(5):
+            enqueue_email(f'Subject {i}', f'<p>Body {i}</p>', [f'user{i}@example.com'])
+        
+        self.assertEqual(dispatch_outbox(), (5, 0))
+        self.assertEqual(RecordingEmailBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].body, 'Body 0')
+        self.assertEqual(mail.outbox[0].alternatives, [('<p>Body 0</p>', 'text/html')])
+        self.assertFalse(OutboxEmail.objects.exclude(status='SENT').exists())
+        
+        # Nothing is due any more, so no connection is opened
+        self.assertEqual(dispatch_outbox(), (0, 0))
+        self.assertEqual(RecordingEmailBackend.opened, 1)
+        
+    def test_failed_email_is_retried_with_backoff(self):
+        """Test that a refused email is rescheduled with a growing delay, then marked failed."""
+        RecordingEmailBackend.rejected = {'bad@example.com'}
+        enqueue_email('Good', '<p>Good</p>', ['good@example.com'])
+        bad = enqueue_email('Bad', '<p>Bad</p>', ['bad@example.com'])
+        
+        self.assertEqual(dispatch_outbox(), (1, 1))
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), ('PENDING', 1))
+        self.assertIn('Recipient refused', bad.last_error)
+        first_delay = bad.next_attempt_date - timezone.now()
+        self.assertGreater(first_delay, timedelta(seconds=50))
+        
+        # Not due yet
+        self.assertEqual(dispatch_outbox(), (0, 0))
+        
+        OutboxEmail.objects.filter(pk=bad.pk).update(next_attempt_date=timezone.now())
+        self.assertEqual(dispatch_outbox(), (0, 1))
+        bad.refresh_from_db()
+        self.assertGreater(bad.next_attempt_date - timezone.now(), timedelta(seconds=110))
+        
+        OutboxEmail.objects.filter(pk=bad.pk).update(next_attempt_date=timezone.now())
+        dispatch_outbox()
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), ('FAILED', 3))
+        self.assertEqual(len(mail.outbox), 1)
+        
+    def test_send_queued_email_command(self):
+        """Test that the command drains every due email."""
+        for i in range(3):
+            enqueue_email(f'Subject {i}', f'<p>Body {i}</p>', [f'user{i}@example.com'])
+        out = StringIO()
+        call_command('send_queued_email', '--once', '--batch-size', '2', stdout=out)
+        
+        self.assertIn('Sent 3 emails', out.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(RecordingEmailBackend.opened, 2)
+
+
+class TagNotificationTests(TestCase):
+    """Tests for tag and comment notifications, including digest mode."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.tagged = User.objects.create_user(
+            username='tagged',
+            email='tagged@example.com',
+            password='testpassword'
+        )
+        self.digest_user = User.objects.create_user(
+            username='digest',
+            email='digest@example.com',
+            password='testpassword'
+        )
+        self.digest_user.profile.email_digest = True
+        self.digest_user.profile.save()
+        
+        self.project = Project.objects.create(
+            name='Notify Project',
+            description='Project for notification tests',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user, self.tagged, self.digest_user)
+        
+    def create_lesson(self, title='Tagged Lesson', submitted_by=None):
+        return Lesson.objects.create(
+            project=self.project,
+            title=title,
+            date_identified=timezone.now().date(),
+            description='Description',
+            recommendations='Recommendations',
+            submitted_by=submitted_by or self.user
+        )
+        
+    def test_tags_set_after_save_are_notified(self):
+        """Test that users tagged after the lesson is saved receive a queued email."""
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson = self.create_lesson()
+            lesson.tags.set([self.tagged])
+        
+        queued = OutboxEmail.objects.get()
+        self.assertEqual(queued.recipients, ['tagged@example.com'])
+        self.assertIn('Tagged Lesson', queued.subject)
+        
+    def test_notification_waits_for_commit(self):
+        """Test that nothing is queued until the transaction commits."""
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            lesson = self.create_lesson()
+            lesson.tags.set([self.tagged])
+        self.assertFalse(OutboxEmail.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        
+    def test_only_new_tags_are_notified(self):
+        """Test that re-saving a tag list only notifies users who were added."""
+        lesson = self.create_lesson()
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.tags.set([self.tagged])
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.tags.set([self.tagged])
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+        
+        other = User.objects.create_user(username='other', email='other@example.com', password='x')
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.tags.set([self.tagged, other])
+        self.assertEqual(OutboxEmail.objects.latest('id').recipients, ['other@example.com'])
+        
+    def test_saving_a_lesson_does_not_query_tags(self):
+        """Test that a plain lesson save no longer looks up its tags."""
+        lesson = self.create_lesson()
+        with CaptureQueriesContext(connection) as ctx:
+            lesson.save()
+        self.assertFalse(any('lessons_lesson_tags' in query['sql'] for query in ctx.captured_queries))
+        
+    def test_reverse_tagging_notifies_user(self):
+        """Test that tagging from the user side of the relation also notifies."""
+        lesson = self.create_lesson()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tagged.tagged_lessons.add(lesson)
+        self.assertEqual(OutboxEmail.objects.get().recipients, ['tagged@example.com'])
+        
+    def test_digest_users_get_one_email(self):
+        """Test that digest mode collapses tag and comment events into a single email."""
+        for i in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                lesson = self.create_lesson(title=f'Digest Lesson {i}')
+                lesson.tags.set([self.tagged, self.digest_user])
+        
+        own_lesson = self.create_lesson(title='Digest Owner Lesson', submitted_by=self.digest_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(lesson=own_lesson, author=self.user, text='Looks good')
+        
+        # Immediate recipients still get one email per tagging
+        self.assertEqual(OutboxEmail.objects.count(), 3)
+        self.assertEqual(NotificationEvent.objects.filter(recipient=self.digest_user).count(), 4)
+        
+        self.assertEqual(send_digests(), 1)
+        digest = OutboxEmail.objects.latest('id')
+        self.assertEqual(digest.recipients, ['digest@example.com'])
+        self.assertIn('4 new notifications', digest.subject)
+        self.assertIn('Digest Lesson 2', digest.body)
+        self.assertIn('Looks good', digest.body)
+        
+        # Events are only sent once
+        self.assertEqual(send_digests(), 0)
+        
+    def test_digest_command(self):
+        """Test that the digest command reports the digests it queued."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_lesson().tags.set([self.digest_user])
+        out = StringIO()
+        call_command('send_notification_digests', stdout=out)
+        self.assertIn('Queued 1 digest emails', out.getvalue())
+
+
+class LessonDetailFragmentCacheTests(TemporaryMediaRootMixin, TestCase):
+    """Tests for the cached fragments of the lesson detail page."""
+    
+    def setUp(self):
+        cache.clear()
+        reset_fragment_stats()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpassword'
+        )
+        
+        self.project = Project.objects.create(
+            name='Fragment Project',
+            description='Project for fragment cache tests',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user, self.other_user)
+        
+        self.lesson = Lesson.objects.create(
+            project=self.project,
+            title='Fragment Lesson',
+            date_identified=timezone.now().date(),
+            description='<p>Original description</p>',
+            recommendations='Recommendations',
+            submitted_by=self.user
+        )
+        Comment.objects.create(lesson=self.lesson, author=self.other_user, text='First comment')
+        self.url = reverse('lesson-detail', kwargs={'pk': self.lesson.pk})
+        
+        self.client.login(username='testuser', password='testpassword')
+        
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+        
+    def test_second_view_is_served_from_cache(self):
+        """Test that a repeat view skips the queries behind the cached fragments."""
+        _, cold = self.count_queries()
+        response, warm = self.count_queries()
+        self.assertLess(warm, cold)
+        self.assertContains(response, 'Original description')
+        self.assertContains(response, 'First comment')
+        
+        stats = fragment_stats()
+        self.assertEqual(stats['lesson_body'], {'hits': 1, 'misses': 1, 'ratio': 0.5})
+        self.assertEqual(set(stats), {'lesson_body', 'lesson_comments', 'lesson_sidebar', 'lesson_related'})
+        
+    def test_lesson_edit_invalidates_fragments(self):
+        """Test that saving the lesson shows the new content straight away."""
+        self.client.get(self.url)
+        self.lesson.description = '<p>Updated description</p>'
+        self.lesson.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Updated description')
+        self.assertNotContains(response, 'Original description')
+        
+    def test_comment_and_attachment_invalidate_fragments(self):
+        """Test that new comments and attachments appear without waiting for expiry."""
+        self.client.get(self.url)
+        Comment.objects.create(lesson=self.lesson, author=self.other_user, text='Second comment')
+        self.assertContains(self.client.get(self.url), 'Second comment')
+        
+        Attachment.objects.create(
+            lesson=self.lesson,
+            file=SimpleUploadedFile('notes.txt', b'notes'),
+            uploaded_by=self.user,
+            description='Meeting notes'
+        )
+        self.assertContains(self.client.get(self.url), 'Meeting notes')
+        
+    def test_tag_changes_invalidate_fragments(self):
+        """Test that tagging and untagging users refreshes the sidebar."""
+        self.client.get(self.url)
+        self.lesson.tags.add(self.other_user)
+        self.assertContains(self.client.get(self.url), 'Tagged Users')
+        
+        self.other_user.tagged_lessons.clear()
+        self.assertNotContains(self.client.get(self.url), 'Tagged Users')
+        
+    def test_related_renames_and_profile_edits_invalidate_fragments(self):
+        """Test that project, category and profile changes refresh the cached fragments."""
+        self.lesson.tags.add(self.other_user)
+        self.lesson.category = Category.objects.create(name='Design')
+        self.lesson.save()
+        self.client.get(self.url)
+        
+        self.lesson.category.name = 'Architecture'
+        self.lesson.category.save()
+        self.assertContains(self.client.get(self.url), 'Architecture')
+        
+        self.project.name = 'Renamed Project'
+        self.project.save()
+        self.assertContains(self.client.get(self.url), 'Renamed Project')
+        
+        self.user.profile.job_title = 'Chief Engineer'
+        self.user.profile.save()
+        self.assertContains(self.client.get(self.url), 'Chief Engineer')
+        
+        self.other_user.first_name = 'Olivia'
+        self.other_user.save()
+        self.assertContains(self.client.get(self.url), 'Olivia')
+        
+    def test_lookups_are_counted_in_process(self):
+        """Test that page views do not write the hit/miss counters to the cache."""
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertIsNone(cache.get('fragments:names'))
+        self.assertEqual(fragment_stats()['lesson_body'], {'hits': 1, 'misses': 1, 'ratio': 0.5})
+        self.assertEqual(cache.get('fragments:names'), {'lesson_body', 'lesson_comments', 'lesson_sidebar', 'lesson_related'})
+        
+    def test_star_state_is_not_cached(self):
+        """Test that the per-user star button reflects the current state on a cache hit."""
+        self.client.get(self.url)
+        self.lesson.starred_by.add(self.user)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Starred')
+        self.assertEqual(fragment_stats()['lesson_body']['hits'], 1)
+        
+    def test_fragment_cache_stats_command(self):
+        """Test that the stats command reports and resets the hit ratios."""
+        self.client.get(self.url)
+        self.client.get(self.url)
+        out = StringIO()
+        call_command('fragment_cache_stats', '--reset', stdout=out)
+        self.assertIn('lesson_body', out.getvalue())
+        self.assertIn('50.0%', out.getvalue())
+        self.assertEqual(fragment_stats(), {})
+
+
+class GenerateTestDataTests(TestCase):
+    """Tests for the generate_test_data management command."""
+    
+    def generate(self, prefix, **options):
+        volumes = dict(users=20, projects=4, memberships=2, lessons=60, comments=1.5, stars=1, tags=0.5)
+        volumes.update(options)
+        out = StringIO()
+        call_command('generate_test_data', prefix=prefix, batch_size=25, stdout=out, **volumes)
+        return out.getvalue()
+    
+    def test_generates_requested_volumes(self):
+        """Test that the command creates the requested rows and derived data."""
+        with self.captureOnCommitCallbacks(execute=True):
+            output = self.generate('gen')
+        self.assertIn('Generated 20 users, 4 projects and 60 lessons', output)
+        
+        users = User.objects.filter(username__startswith='gen_')
+        projects = Project.objects.filter(name__startswith='gen project')
+        lessons = Lesson.objects.filter(project__in=projects)
+        self.assertEqual(users.count(), 20)
+        self.assertEqual(users.filter(profile__isnull=False).count(), 20)
+        self.assertEqual(lessons.count(), 60)
+        self.assertEqual(Comment.objects.filter(lesson__in=lessons).count() // 60, 1)
+        self.assertEqual(Lesson.starred_by.through.objects.filter(lesson__in=lessons).count(), 60)
+        
+        # Every user is on two projects, and lessons only involve project members
+        for user in users:
+            self.assertGreaterEqual(user.projects.count(), 2)
+            self.assertEqual(ProjectRole.objects.filter(user=user).count(), user.projects.count())
+        for lesson in lessons.prefetch_related('project__team_members', 'tags'):
+            team = set(lesson.project.team_members.all())
+            self.assertIn(lesson.submitted_by, team)
+            self.assertTrue(set(lesson.tags.all()) <= team)
+        
+        # Rollup and search index are rebuilt once, with no per-row notifications
+        self.assertEqual(find_stats_drift(), {})
+        self.assertTrue(LessonSearchTerm.objects.filter(lesson__in=lessons).exists())
+        self.assertFalse(NotificationEvent.objects.exists())
+        self.assertFalse(OutboxEmail.objects.exists())
+        
+    def test_same_seed_is_reproducible(self):
+        """Test that a seed always produces the same dataset."""
+        self.generate('first', seed=7, skip_search_index=True)
+        self.generate('second', seed=7, skip_search_index=True)
+        self.generate('third', seed=8, skip_search_index=True)
+        
+        def titles(prefix):
+            return list(Lesson.objects.filter(project__name__startswith=f'{prefix} project')
+                        .order_by('pk').values_list('title', 'status', 'impact'))
+        self.assertEqual(titles('first'), titles('second'))
+        self.assertNotEqual(titles('first'), titles('third'))
+        
+    def test_signals_are_restored(self):
+        """Test that receivers muted for the load are reconnected afterwards."""
+        self.generate('gen', lessons=5, skip_search_index=True)
+        project = Project.objects.filter(name__startswith='gen project').first()
+        lesson = Lesson.objects.create(
+            project=project, title='After generation', date_identified=timezone.now().date(),
+            description='Desc', recommendations='Rec', submitted_by=project.created_by
+        )
+        self.assertTrue(LessonSearchTerm.objects.filter(lesson=lesson).exists())
+        
+    def test_existing_prefix_is_rejected(self):
+        """Test that generating twice with one prefix fails instead of clashing."""
+        self.generate('gen', lessons=5, skip_search_index=True)
+        with self.assertRaises(CommandError):
+            self.generate('gen', lessons=5)
+
+
+class BenchmarkViewsTests(TestCase):
+    """Tests for the benchmark_views management command."""
+    
+    def setUp(self):
+        cache.clear()
+        call_command('generate_test_data', users=5, projects=2, memberships=2, lessons=30,
+                     prefix='bench', stdout=StringIO())
+        self.output = os.path.join(tempfile.mkdtemp(), 'results.json')
+        
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command('benchmark_views', '--repeat', '3', '--warmup', '1', *args, stdout=out)
+        return out.getvalue()
+        
+    def test_percentile(self):
+        """Test the interpolated percentile helper."""
+        samples = [4, 1, 3, 2, 5]
+        self.assertEqual(percentile(samples, 50), 3)
+        self.assertEqual(percentile(samples, 90), 4.6)
+        self.assertEqual(percentile([7], 99), 7)
+        
+    def test_writes_machine_readable_results(self):
+        """Test that every core view is measured and written as JSON."""
+        output = self.benchmark('--output', self.output)
+        self.assertIn('Benchmark complete', output)
+        
+        with open(self.output) as handle:
+            report = json.load(handle)
+        self.assertEqual(report['meta']['lessons'], 30)
+        results = {result['name']: result for result in report['results']}
+        for name in ('dashboard', 'lesson-list', 'lesson-list:status', 'lesson-list:search',
+                     'lesson-detail', 'project-list', 'project-detail', 'export:csv', 'export:pdf'):
+            self.assertIn(name, results)
+            self.assertEqual(results[name]['status'], 200)
+            self.assertEqual(results[name]['runs'], 3)
+            self.assertGreater(results[name]['queries'], 0)
+            self.assertLessEqual(results[name]['p50_ms'], results[name]['p99_ms'])
+        
+    def test_compare_flags_query_regressions(self):
+        """Test that --max-regression fails when a view issues more queries than the baseline."""
+        self.benchmark('--scenario', 'dashboard', '--output', self.output)
+        with open(self.output) as handle:
+            report = json.load(handle)
+        
+        # Unchanged code compares cleanly on query counts
+        report['results'][0]['p50_ms'] = 10 ** 6
+        with open(self.output, 'w') as handle:
+            json.dump(report, handle)
+        self.assertIn('Compared with', self.benchmark(
+            '--scenario', 'dashboard', '--compare', self.output, '--max-regression', '50'
+        ))
+        
+        report['results'][0]['queries'] = 0
+        with open(self.output, 'w') as handle:
+            json.dump(report, handle)
+        with self.assertRaises(CommandError):
+            self.benchmark('--scenario', 'dashboard', '--compare', self.output, '--max-regression', '50')
+
+
+class ViewQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """Tests that the core lesson views stay within their query budgets."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.project = Project.objects.create(
+            name='Test Project',
+            description='Test Description',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user)
+        self.category = Category.objects.create(name='Technical')
+        self.client.login(username='testuser', password='testpassword')
+        
+    def add_lessons(self, count):
+        """Add lessons that each carry their own tags, stars and commenters."""
+        lessons = []
+        for i in range(count):
+            colleague = User.objects.create_user(username=f'colleague{Lesson.objects.count()}')
+            self.project.team_members.add(colleague)
+            lesson = Lesson.objects.create(
+                project=self.project,
+                title=f'Lesson {i}',
+                category=self.category,
+                date_identified=timezone.now().date(),
+                description='Description',
+                recommendations='Recommendations',
+                submitted_by=colleague
+            )
+            lesson.tags.add(colleague, self.user)
+            lesson.starred_by.add(self.user)
+            Comment.objects.create(lesson=lesson, author=colleague, text='Comment')
+            Comment.objects.create(lesson=lesson, author=self.user, text='Reply')
+            lessons.append(lesson)
+        return lessons
+        
+    def test_lesson_list_within_budget(self):
+        """Test that the lesson list does not query per lesson."""
+        self.add_lessons(5)
+        self.assertViewWithinBudget(reverse('lesson-list'))
+        self.assertViewWithinBudget(reverse('lesson-list'), {'is_starred': 'on', 'status': 'NEW'})
+        
+    def test_lesson_detail_within_budget(self):
+        """Test that tagged users and commenters are loaded with their profiles."""
+        lesson = self.add_lessons(5)[0]
+        for i in range(4):
+            lesson.tags.add(User.objects.create_user(username=f'tagged{i}'))
+            Comment.objects.create(lesson=lesson, author=User.objects.create_user(username=f'author{i}'), text='Hi')
+        
+        response = self.assertViewWithinBudget(reverse('lesson-detail', args=[lesson.pk]))
+        self.assertContains(response, 'Tagged Users')
+        self.assertContains(response, 'Comments (6)')
+        
+    def test_dashboard_within_budget(self):
+        """Test that the dashboard cost does not depend on the number of lessons."""
+        self.add_lessons(5)
+        self.assertViewWithinBudget(reverse('dashboard'))
+        
+    def test_budget_detects_n_plus_one(self):
+        """Test that a per-row query pattern fails the mixin's check."""
+        self.add_lessons(3)
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget():
+                for lesson in Lesson.objects.all():
+                    lesson.submitted_by.username
+
+
+class LessonApiTests(TestCase):
+    """Tests for the read-only JSON API."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.other_user = User.objects.create_user(username='otheruser', password='testpassword')
+        self.project = Project.objects.create(
+            name='Test Project',
+            description='Test Description',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user)
+        self.other_project = Project.objects.create(
+            name='Other Project',
+            description='Other Description',
+            start_date=timezone.now().date(),
+            created_by=self.other_user
+        )
+        self.other_project.team_members.add(self.other_user)
+        self.category = Category.objects.create(name='Technical')
+        
+        self.lessons = [self.create_lesson(f'Lesson {i}', status='NEW' if i % 2 else 'IMPLEMENTED') for i in range(5)]
+        self.hidden = self.create_lesson('Hidden', project=self.other_project, user=self.other_user)
+        self.client.login(username='testuser', password='testpassword')
+        
+    def create_lesson(self, title, project=None, user=None, status='NEW'):
+        return Lesson.objects.create(
+            project=project or self.project,
+            title=title,
+            category=self.category,
+            date_identified=timezone.now().date(),
+            description='Description',
+            recommendations='Recommendations',
+            status=status,
+            submitted_by=user or self.user
+        )
+        
+    def test_requires_login(self):
+        """Test that anonymous requests get a JSON 401 instead of a login redirect."""
+        self.client.logout()
+        response = self.client.get(reverse('api-lesson-list'))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('error', response.json())
+        
+    def test_read_only(self):
+        """Test that the API rejects writes."""
+        response = self.client.post(reverse('api-lesson-list'), {'title': 'New'})
+        self.assertEqual(response.status_code, 405)
+        
+    def test_lesson_list_is_scoped_and_filtered(self):
+        """Test that only the user's lessons are listed and LessonFilter parameters apply."""
+        data = self.client.get(reverse('api-lesson-list')).json()
+        self.assertEqual(data['count'], 5)
+        self.assertNotIn('Hidden', [lesson['title'] for lesson in data['results']])
+        self.assertEqual(data['results'][0]['title'], 'Lesson 4')
+        self.assertEqual(data['results'][0]['category_name'], 'Technical')
+        
+        data = self.client.get(reverse('api-lesson-list'), {'status': 'NEW'}).json()
+        self.assertEqual([lesson['title'] for lesson in data['results']], ['Lesson 3', 'Lesson 1'])
+        
+        response = self.client.get(reverse('api-lesson-list'), {'status': 'BOGUS'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json()['error'])
+        
+    def test_sparse_fieldsets(self):
+        """Test that fields= limits the response and the columns read."""
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(reverse('api-lesson-list'), {'fields': 'id,title'}).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'title'})
+        self.assertFalse(any('"description"' in query['sql'] for query in ctx.captured_queries))
+        
+        response = self.client.get(reverse('api-lesson-list'), {'fields': 'title,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+        
+    def test_keyset_pagination(self):
+        """Test that following next visits every lesson once."""
+        url, titles = reverse('api-lesson-list') + '?limit=2&fields=title', []
+        while url:
+            data = self.client.get(url).json()
+            titles.extend(lesson['title'] for lesson in data['results'])
+            url = data['next']
+        self.assertEqual(titles, [f'Lesson {i}' for i in range(4, -1, -1)])
+        
+    def test_conditional_list_requests(self):
+        """Test that an unchanged list answers 304 from the validators alone."""
+        response = self.client.get(reverse('api-lesson-list'))
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        # No timestamp advances when lessons are deleted or names change
+        self.assertNotIn('Last-Modified', response)
+        
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('api-lesson-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        # Session, user and the validator aggregate
+        self.assertEqual(len(ctx.captured_queries), 3)
+        
+        response = self.client.get(reverse('api-lesson-list'), HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        
+        # Other parameters are another representation
+        response = self.client.get(reverse('api-lesson-list'), {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        
+        # Edits and deletions change the validators
+        self.lessons[0].title = 'Edited'
+        self.lessons[0].save()
+        response = self.client.get(reverse('api-lesson-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        Lesson.objects.filter(pk=self.lessons[1].pk).delete()
+        self.assertEqual(self.client.get(reverse('api-lesson-list'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        
+    def test_list_etag_covers_related_names_and_membership(self):
+        """Test that renames of returned related names and membership changes revalidate."""
+        url = reverse('api-lesson-list')
+        
+        def rename(model, pk, **fields):
+            instance = model.objects.get(pk=pk)
+            for name, value in fields.items():
+                setattr(instance, name, value)
+            instance.save()
+        
+        changes = [
+            lambda: rename(Project, self.project.pk, name='Renamed Project'),
+            lambda: rename(Category, self.category.pk, name='Renamed Category'),
+            lambda: rename(User, self.user.pk, username='renamed'),
+            lambda: self.other_project.team_members.add(self.user),
+        ]
+        for change in changes:
+            etag = self.client.get(url)['ETag']
+            change()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        
+    def test_lesson_detail(self):
+        """Test the lesson detail, its 304 and access checks."""
+        url = reverse('api-lesson-detail', args=[self.lessons[0].pk])
+        response = self.client.get(url, {'fields': 'title,status'})
+        self.assertEqual(response.json(), {'title': 'Lesson 0', 'status': 'IMPLEMENTED'})
+        # Renames do not advance modified_date, so only the ETag is a validator
+        self.assertNotIn('Last-Modified', response)
+        
+        response = self.client.get(url, {'fields': 'title,status'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        
+        response = self.client.get(reverse('api-lesson-detail', args=[self.hidden.pk]))
+        self.assertEqual(response.status_code, 404)
+        
+    def test_lesson_comments(self):
+        """Test that comments are paged by id and hidden for other projects."""
+        for i in range(3):
+            Comment.objects.create(lesson=self.lessons[0], author=self.user, text=f'Comment {i}')
+        url = reverse('api-lesson-comments', args=[self.lessons[0].pk])
+        
+        data = self.client.get(url, {'limit': 2, 'fields': 'text'}).json()
+        self.assertEqual([c['text'] for c in data['results']], ['Comment 0', 'Comment 1'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual([c['text'] for c in data['results']], ['Comment 2'])
+        self.assertIsNone(data['next'])
+        
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(reverse('api-lesson-comments', args=[self.hidden.pk])).status_code, 404)
+        
+    def test_projects_and_categories(self):
+        """Test the project and category endpoints."""
+        data = self.client.get(reverse('api-project-list'), {'fields': 'id,name'}).json()
+        self.assertEqual(data['results'], [{'id': self.project.pk, 'name': 'Test Project'}])
+        
+        response = self.client.get(reverse('api-project-detail', args=[self.project.pk]))
+        self.assertEqual(response.json()['description'], 'Test Description')
+        self.assertEqual(self.client.get(reverse('api-project-detail', args=[self.other_project.pk])).status_code, 404)
+        
+        response = self.client.get(reverse('api-category-list'))
+        self.assertEqual(response.json()['results'][0]['name'], 'Technical')
+        self.assertEqual(
+            self.client.get(reverse('api-category-list'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+        )
+        Category.objects.create(name='Process')
+        self.assertEqual(
+            self.client.get(reverse('api-category-list'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200
+        )
+
+
+class ConditionalPageTests(TestCase):
+    """Tests for ETag revalidation of the lesson detail page and dashboard."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.other_user = User.objects.create_user(username='otheruser', password='testpassword')
+        self.project = Project.objects.create(
+            name='Test Project',
+            description='Test Description',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user, self.other_user)
+        self.category = Category.objects.create(name='Technical')
+        self.lesson = Lesson.objects.create(
+            project=self.project,
+            title='Test Lesson',
+            category=self.category,
+            date_identified=timezone.now().date(),
+            description='Description',
+            recommendations='Recommendations',
+            submitted_by=self.user
+        )
+        self.client.login(username='testuser', password='testpassword')
+        self.detail_url = reverse('lesson-detail', args=[self.lesson.pk])
+        
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        
+    def test_unchanged_lesson_is_not_rendered_again(self):
+        """Test that a matching If-None-Match gets a 304 before any rendering."""
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertTrue(response.has_header('Last-Modified'))
+        
+        with self.assertNumQueries(3):  # session, user and the lesson itself
+            repeat = self.revalidate(self.detail_url, response)
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat['ETag'], response['ETag'])
+        self.assertEqual(repeat.content, b'')
+        self.assertTemplateNotUsed(repeat, 'lessons/lesson_detail.html')
+        
+    def test_lesson_changes_change_the_etag(self):
+        """Test that edits, comments, stars and category renames all revalidate."""
+        changes = [
+            lambda: Lesson.objects.get(pk=self.lesson.pk).save(),
+            lambda: Comment.objects.create(lesson=self.lesson, author=self.other_user, text='New comment'),
+            lambda: self.lesson.starred_by.add(self.user),
+            lambda: Category.objects.filter(pk=self.category.pk).get().save(),
+            lambda: Project.objects.get(pk=self.project.pk).save(),
+        ]
+        for change in changes:
+            response = self.client.get(self.detail_url)
+            change()
+            self.assertEqual(self.revalidate(self.detail_url, response).status_code, 200)
+            
+    def test_etag_is_per_user(self):
+        """Test that one user's ETag does not match another user's page."""
+        response = self.client.get(self.detail_url)
+        self.client.login(username='otheruser', password='testpassword')
+        self.assertEqual(self.revalidate(self.detail_url, response).status_code, 200)
+        
+    def test_pending_messages_are_rendered(self):
+        """Test that a flash message forces a full render even if the data is unchanged."""
+        response = self.client.get(self.detail_url)
+        self.client.post(self.detail_url, {'text': 'A comment'})
+        repeat = self.revalidate(self.detail_url, response)
+        self.assertEqual(repeat.status_code, 200)
+        self.assertContains(repeat, 'Your comment has been added.')
+        
+    def test_star_toggle_is_never_short_circuited(self):
+        """Test that ?star still toggles the star when the page is unchanged."""
+        response = self.client.get(self.detail_url)
+        star = self.client.get(self.detail_url + '?star=1', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(star.status_code, 302)
+        self.assertTrue(self.lesson.starred_by.filter(pk=self.user.pk).exists())
+        
+    def test_dashboard_revalidation(self):
+        """Test that the dashboard answers 304 until a lesson or membership changes."""
+        url = reverse('dashboard')
+        response = self.client.get(url)
+        repeat = self.revalidate(url, response)
+        self.assertEqual(repeat.status_code, 304)
+        self.assertTemplateNotUsed(repeat, 'lessons/dashboard.html')
+        
+        Lesson.objects.create(
+            project=self.project,
+            title='Another Lesson',
+            date_identified=timezone.now().date(),
+            description='Description',
+            recommendations='Recommendations',
+            submitted_by=self.other_user
+        )
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+        
+        response = self.client.get(url)
+        self.project.team_members.remove(self.user)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+
+class LessonImportTests(TemporaryMediaRootMixin, TestCase):
+    """Tests for the bulk lesson import."""
+    
+    HEADER = 'Title,Project,Category,Date Identified,Description,Recommendations,Impact,Status,Submitted By,Tags\n'
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpassword')
+        self.colleague = User.objects.create_user(username='colleague', email='colleague@example.com')
+        self.outsider = User.objects.create_user(username='outsider', password='testpassword')
+        self.project = Project.objects.create(
+            name='Test Project',
+            description='Test Description',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user, self.colleague)
+        self.other_project = Project.objects.create(
+            name='Other Project',
+            description='Other Description',
+            start_date=timezone.now().date(),
+            created_by=self.outsider
+        )
+        self.category = Category.objects.create(name='Technical')
+        
+    def csv_file(self, rows, name='lessons.csv'):
+        return SimpleUploadedFile(name, (self.HEADER + ''.join(rows)).encode())
+        
+    def csv_rows(self, count, project='Test Project', tags=''):
+        return [
+            f'Imported lesson {i},{project},technical,2024-01-{i % 28 + 1:02d},Vendor delays,Plan ahead,'
+            f'High,In Progress,colleague,{tags}\n'
+            for i in range(count)
+        ]
+        
+    def run_import(self, file, file_format='csv', **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return LessonImporter(**kwargs).run(read_rows(file, file_format))
+        
+    def test_import_csv(self):
+        """Test that rows become lessons with derived data brought up to date."""
+        generation = lesson_generation()
+        result = self.run_import(self.csv_file(self.csv_rows(3, tags='testuser; colleague')))
+        
+        self.assertTrue(result.committed)
+        self.assertEqual(result.created, 3)
+        lesson = Lesson.objects.get(title='Imported lesson 1')
+        self.assertEqual(lesson.project, self.project)
+        self.assertEqual(lesson.category, self.category)
+        self.assertEqual(lesson.impact, 'HIGH')
+        self.assertEqual(lesson.status, 'IN_PROGRESS')
+        self.assertEqual(lesson.submitted_by, self.colleague)
+        self.assertEqual(set(lesson.tags.values_list('username', flat=True)), {'testuser', 'colleague'})
+        
+        self.assertEqual(find_stats_drift(), {})
+        self.assertEqual(search_lessons(Lesson.objects.all(), 'vendor').count(), 3)
+        self.assertNotEqual(lesson_generation(), generation)
+        # One email per tagged user, not one per lesson
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+        
+    def test_query_count_does_not_grow_with_rows(self):
+        """Test that lookups are preloaded instead of queried per row."""
+        with CaptureQueriesContext(connection) as small:
+            self.run_import(self.csv_file(self.csv_rows(5)))
+        with CaptureQueriesContext(connection) as large:
+            self.run_import(self.csv_file(self.csv_rows(30)))
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Lesson.objects.count(), 35)
+        
+    def test_invalid_row_aborts_import(self):
+        """Test that one invalid row imports nothing and is reported with its line."""
+        rows = self.csv_rows(2) + ['Bad lesson,Unknown Project,,not a date,,Plan,Severe,NEW,nobody,\n']
+        result = self.run_import(self.csv_file(rows))
+        
+        self.assertFalse(result.committed)
+        self.assertEqual(result.invalid, 1)
+        self.assertEqual(Lesson.objects.count(), 0)
+        number, message = result.errors[0]
+        self.assertEqual(number, 4)
+        for problem in ("unknown project 'Unknown Project'", 'invalid date_identified', 'description is required',
+                        "invalid impact 'Severe'", "unknown user 'nobody'"):
+            self.assertIn(problem, message)
+        
+    def test_skip_invalid_and_dry_run(self):
+        """Test that skip_invalid imports the valid rows and dry_run writes nothing."""
+        rows = self.csv_rows(2) + ['Bad lesson,Test Project,,2024-01-01,Description,Plan,,,,\n']
+        result = self.run_import(self.csv_file(rows), dry_run=True)
+        self.assertEqual((result.rows, result.valid, result.created), (3, 2, 0))
+        self.assertEqual(Lesson.objects.count(), 0)
+        
+        result = self.run_import(self.csv_file(rows), skip_invalid=True)
+        self.assertEqual(result.created, 2)
+        self.assertIn('submitted_by is required', result.errors[0][1])
+        
+    def test_user_import_is_limited_to_their_projects(self):
+        """Test that a user cannot import lessons into projects they are not in."""
+        result = self.run_import(self.csv_file(self.csv_rows(1, project='Other Project')), user=self.user)
+        self.assertIn("unknown project 'Other Project'", result.errors[0][1])
+        
+    def test_user_import_cannot_impersonate_or_tag_outsiders(self):
+        """Test that members submit as themselves and only tag their project's members."""
+        rows = ['Lesson,Test Project,,2024-01-01,Description,Plan,,,colleague,outsider\n']
+        result = self.run_import(self.csv_file(rows), user=self.user, skip_invalid=True)
+        
+        message = result.errors[0][1]
+        self.assertIn("you cannot import lessons submitted by 'colleague'", message)
+        self.assertIn("'outsider' in tags is not a member of the project", message)
+        self.assertEqual(Lesson.objects.count(), 0)
+        self.assertEqual(OutboxEmail.objects.count(), 0)
+        
+        self.user.is_staff = True
+        rows = ['Lesson,Test Project,,2024-01-01,Description,Plan,,,colleague,testuser\n']
+        result = self.run_import(self.csv_file(rows), user=self.user)
+        self.assertEqual(Lesson.objects.get().submitted_by, self.colleague)
+        
+    def test_import_json_with_command(self):
+        """Test the import_lessons command with a JSON file and a default submitter."""
+        records = [{
+            'title': 'JSON lesson',
+            'project': self.project.pk,
+            'date_identified': '2024-02-01',
+            'description': 'Description',
+            'recommendations': 'Recommendations',
+            'tags': ['colleague'],
+        }]
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as handle:
+            json.dump(records, handle)
+        self.addCleanup(os.remove, handle.name)
+        
+        out = StringIO()
+        call_command('import_lessons', handle.name, '--submitted-by', 'testuser', '--no-notify', stdout=out)
+        self.assertIn('Imported 1 lessons', out.getvalue())
+        lesson = Lesson.objects.get(title='JSON lesson')
+        self.assertEqual(lesson.submitted_by, self.user)
+        self.assertEqual(lesson.impact, 'MEDIUM')
+        self.assertEqual(OutboxEmail.objects.count(), 0)
+        
+        with self.assertRaises(CommandError):
+            call_command('import_lessons', handle.name, stdout=StringIO(), stderr=StringIO())
+        
+    def test_upload_view(self):
+        """Test importing through the upload form as the submitting user."""
+        self.client.login(username='testuser', password='testpassword')
+        rows = ['Uploaded lesson,Test Project,,2024-03-01,Description,Recommendations,,,,\n']
+        response = self.client.post(reverse('lesson-import'), {'file': self.csv_file(rows)})
+        self.assertRedirects(response, reverse('lesson-list'))
+        self.assertEqual(Lesson.objects.get(title='Uploaded lesson').submitted_by, self.user)
+        
+        response = self.client.post(reverse('lesson-import'), {'file': SimpleUploadedFile('lessons.txt', b'x')})
+        self.assertContains(response, 'Unsupported file type')
+        
+        response = self.client.post(reverse('lesson-import'), {'file': SimpleUploadedFile('lessons.csv', b'title\n')})
+        self.assertContains(response, 'Missing required columns')
+
+
+class BulkLessonUpdateTests(TestCase):
+    """Tests for bulk status, impact, category and archive changes."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.other_user = User.objects.create_user(username='otheruser', password='testpassword')
+        self.project = Project.objects.create(
+            name='Test Project',
+            description='Test Description',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user, self.other_user)
+        self.category = Category.objects.create(name='Technical')
+        self.lessons = [self.create_lesson(self.user, f'Lesson {i}') for i in range(5)]
+        self.others = [self.create_lesson(self.other_user, f'Other lesson {i}') for i in range(2)]
+        self.client.login(username='testuser', password='testpassword')
+        
+    def create_lesson(self, user, title):
+        return Lesson.objects.create(
+            project=self.project,
+            title=title,
+            category=self.category,
+            date_identified=timezone.now().date(),
+            description='Description',
+            recommendations='Recommendations',
+            status='ACKNOWLEDGED',
+            submitted_by=user
+        )
+        
+    def post(self, lessons, **data):
+        data.setdefault('lessons', [lesson.pk for lesson in lessons])
+        return self.client.post(reverse('lesson-bulk-update'), data, follow=True)
+        
+    def test_status_change_is_one_update(self):
+        """Test that the selection is changed with one UPDATE and one consolidated signal."""
+        saves, bulk_events = [], []
+        post_save_receiver = lambda **kwargs: saves.append(kwargs)
+        bulk_receiver = lambda **kwargs: bulk_events.append(kwargs)
+        post_save.connect(post_save_receiver, sender=Lesson)
+        lessons_bulk_updated.connect(bulk_receiver)
+        self.addCleanup(post_save.disconnect, post_save_receiver, sender=Lesson)
+        self.addCleanup(lessons_bulk_updated.disconnect, bulk_receiver)
+        generation = lesson_generation()
+        versions = [lesson_version(lesson.pk) for lesson in self.lessons]
+        modified = Lesson.objects.get(pk=self.lessons[0].pk).modified_date
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(self.lessons, action='status', status='IMPLEMENTED')
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "lessons_lesson"')]
+        self.assertEqual(len(updates), 1)
+        self.assertContains(response, 'Updated 5 lessons.')
+        
+        self.assertEqual(Lesson.objects.filter(status='IMPLEMENTED').count(), 5)
+        self.assertEqual(saves, [])
+        self.assertEqual(len(bulk_events), 1)
+        self.assertEqual(bulk_events[0]['project_ids'], {self.project.pk})
+        self.assertEqual(find_stats_drift(), {})
+        self.assertNotEqual(lesson_generation(), generation)
+        self.assertNotEqual([lesson_version(lesson.pk) for lesson in self.lessons], versions)
+        self.assertGreater(Lesson.objects.get(pk=self.lessons[0].pk).modified_date, modified)
+        
+    def test_only_own_lessons_are_changed(self):
+        """Test that lessons the user may not edit are skipped and reported."""
+        response = self.post(self.lessons[:2] + self.others, action='impact', impact='HIGH')
+        self.assertContains(response, 'Updated 2 lessons.')
+        self.assertContains(response, 'Skipped 2 selected lessons')
+        self.assertEqual(Lesson.objects.filter(impact='HIGH').count(), 2)
+        self.assertFalse(Lesson.objects.filter(pk__in=[lesson.pk for lesson in self.others], impact='HIGH').exists())
+        
+    def test_archive_and_clear_category(self):
+        """Test the archive action and moving lessons to no category."""
+        self.post(self.lessons[:3], action='archive')
+        self.assertEqual(Lesson.objects.filter(status='ARCHIVED').count(), 3)
+        
+        self.post(self.lessons, action='category', category='')
+        self.assertEqual(Lesson.objects.filter(category=None).count(), 5)
+        self.assertEqual(find_stats_drift(), {})
+        
+    def test_unchanged_lessons_are_not_touched(self):
+        """Test that lessons already in the target state keep their modified date."""
+        modified = Lesson.objects.get(pk=self.lessons[0].pk).modified_date
+        response = self.post(self.lessons, action='status', status='ACKNOWLEDGED')
+        self.assertContains(response, 'Updated 0 lessons.')
+        self.assertEqual(Lesson.objects.get(pk=self.lessons[0].pk).modified_date, modified)
+        
+    def test_invalid_requests(self):
+        """Test that an empty selection or a missing value changes nothing."""
+        response = self.post([], action='archive')
+        self.assertContains(response, 'Select at least one lesson.')
+        response = self.post(self.lessons, action='status')
+        self.assertContains(response, 'Choose a value to set.')
+        self.assertFalse(Lesson.objects.exclude(status='ACKNOWLEDGED').exists())
+        
+    def test_admin_action(self):
+        """Test the LessonAdmin bulk actions."""
+        admin = User.objects.create_superuser(username='admin', password='adminpassword')
+        self.client.force_login(admin)
+        response = self.client.post(reverse('admin:lessons_lesson_changelist'), {
+            'action': 'set_status_implemented',
+            '_selected_action': [lesson.pk for lesson in self.others],
+        }, follow=True)
+        self.assertContains(response, 'Updated 2 lessons.')
+        self.assertEqual(Lesson.objects.filter(status='IMPLEMENTED').count(), 2)
+        self.assertEqual(find_stats_drift(), {})
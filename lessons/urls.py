@@ -5,8 +5,12 @@ urlpatterns = [
     path('', views.lesson_list, name='lesson-list'),
     path('<int:pk>/', views.lesson_detail, name='lesson-detail'),
     path('new/', views.lesson_create, name='lesson-create'),
+    path('import/', views.lesson_import, name='lesson-import'),
+    path('bulk/', views.lesson_bulk_update, name='lesson-bulk-update'),
     path('<int:pk>/edit/', views.lesson_update, name='lesson-update'),
     path('<int:pk>/delete/', views.delete_lesson, name='lesson-delete'),
     path('attachment/<int:pk>/delete/', views.delete_attachment, name='attachment-delete'),
     path('category/create/', views.create_category, name='category-create'),
+    path('exports/<int:pk>/', views.export_job_status, name='export-job-status'),
+    path('exports/<int:pk>/download/', views.export_job_download, name='export-job-download'),
 ]
\ No newline at end of file
@@ -1,11 +1,16 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse, JsonResponse, FileResponse, Http404, QueryDict
+from django.urls import reverse
+from django.conf import settings
 from django.core.paginator import Paginator
-from .models import Lesson, Category, Attachment, Comment
-from .forms import LessonForm, AttachmentForm, CommentForm
+from .models import Lesson, Category, Attachment, Comment, ExportJob
+from .forms import LessonForm, AttachmentForm, CommentForm, LessonImportForm, LessonBulkActionForm
+from .bulk import bulk_update_lessons
+from .imports import LessonImportError, LessonImporter, read_rows, REQUIRED_COLUMNS, OPTIONAL_COLUMNS
 from projects.models import Project
+from projects.access import get_project_access, project_generation
 from django_filters.views import FilterView
 from .filters import LessonFilter
 import csv
@@ -13,8 +18,16 @@ from django.template.loader import render_to_string
 # Comment out WeasyPrint to avoid dependency issues on Windows
 # from weasyprint import HTML
 import tempfile
-from django.db.models import Count, Q
+import json
+from django.db.models import Count, Q, Exists, OuterRef, Subquery
+from .stats import summarize_projects
+from .exports import Echo, export_rows, render_lessons_html, request_export, normalize_export_params
+from .pagination import CursorPaginator, lesson_count_cache_key, lesson_generation
+from .fragments import lesson_version
+from .conditional import page_etag, page_not_modified, set_validators
+from lessons_learned.query_budget import query_budget
 
+@query_budget(10)
 @login_required
 def lesson_list(request):
     # Get all lessons from user's projects with optimized query
@@ -31,35 +44,103 @@ def lesson_list(request):
         export_format = request.GET.get('export')
         filtered_lessons = lesson_filter.qs
         
+        if export_format in ('csv', 'pdf'):
+            # Large exports are rendered by the run_export_worker command
+            threshold = settings.EXPORT_BACKGROUND_THRESHOLD
+            if filtered_lessons[:threshold + 1].count() > threshold:
+                job = request_export(request.user, export_format, request.GET)
+                if job.status == 'DONE':
+                    return redirect('export-job-download', pk=job.pk)
+                messages.info(request, "Your export is being prepared in the background.")
+                return redirect('export-job-status', pk=job.pk)
+        
         if export_format == 'csv':
             return export_lessons_csv(filtered_lessons)
         elif export_format == 'pdf':
             return export_lessons_pdf(filtered_lessons)
     
-    # Pagination
-    paginator = Paginator(lesson_filter.qs.order_by('-created_date'), 12)  # Show 12 lessons per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Rank full-text matches first when a search was made
+    if 'search_rank' in lesson_filter.qs.query.annotations:
+        ordered_lessons = lesson_filter.qs.order_by('-search_rank', '-created_date')
+    else:
+        ordered_lessons = lesson_filter.qs.order_by('-created_date')
+    
+    # Flag the lessons the current user has starred in the same query
+    ordered_lessons = ordered_lessons.annotate(
+        is_starred_by_user=Exists(Lesson.starred_by.through.objects.filter(
+            lesson_id=OuterRef('pk'), user_id=request.user.id
+        ))
+    )
+    
+    # Pagination: keyset cursors keep deep pages fast, but ranked search
+    # results have no stable key to page on and always use page numbers.
+    pagination_mode = request.GET.get('paginate') or (
+        'cursor' if 'cursor' in request.GET else settings.LESSON_LIST_PAGINATION
+    )
+    cursor_mode = pagination_mode == 'cursor' and 'search_rank' not in lesson_filter.qs.query.annotations
+    
+    next_url = previous_url = None
+    if cursor_mode:
+        count_key = lesson_count_cache_key(request.user, normalize_export_params(request.GET))
+        paginator = CursorPaginator(ordered_lessons, 12, count_cache_key=count_key)
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+        
+        params = request.GET.copy()
+        params.pop('page', None)
+        params['paginate'] = 'cursor'
+        if page_obj.next_cursor:
+            params['cursor'] = page_obj.next_cursor
+            next_url = f'?{params.urlencode()}'
+        if page_obj.previous_cursor:
+            params['cursor'] = page_obj.previous_cursor
+            previous_url = f'?{params.urlencode()}'
+    else:
+        paginator = Paginator(ordered_lessons, 12)  # Show 12 lessons per page
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
     
     context = {
         'filter': lesson_filter,
         'page_obj': page_obj,
+        'bulk_form': LessonBulkActionForm(),
+        'bulk_categories': Category.objects.order_by('name').values_list('pk', 'name'),
+        'cursor_mode': cursor_mode,
+        'next_url': next_url,
+        'previous_url': previous_url,
     }
     
     return render(request, 'lessons/lesson_list.html', context)
 
+@query_budget(12)
 @login_required
 def lesson_detail(request, pk):
+    latest_comment = Comment.objects.filter(lesson=OuterRef('pk')).order_by('-created_date').values('created_date')[:1]
     lesson = get_object_or_404(
-        Lesson.objects.select_related('project', 'category', 'submitted_by'), 
+        Lesson.objects.select_related('project', 'category', 'submitted_by__profile').annotate(
+            latest_comment=Subquery(latest_comment)
+        ),
         pk=pk
     )
     
     # Check if user has access to this lesson's project
-    if request.user not in lesson.project.team_members.all():
+    access = get_project_access(request)
+    if not access.is_member(lesson.project_id):
         messages.error(request, "You don't have access to this lesson.")
         return redirect('lesson-list')
     
+    # Answer a revalidation before anything else is queried or rendered.
+    # lesson_version covers comments, attachments and tags; the generations
+    # cover stars, related lessons and project and category names.
+    if 'star' not in request.GET:
+        last_modified = max(filter(None, [lesson.modified_date, lesson.latest_comment]))
+        etag = page_etag(
+            request, 'lesson', lesson.pk, lesson.modified_date, lesson.latest_comment,
+            lesson_version(lesson.pk), lesson_generation(), project_generation(), access.role(lesson.project_id)
+        )
+        response = page_not_modified(request, etag, last_modified)
+        if response:
+            return response
+    
     # Handle comment form
     if request.method == 'POST':
         comment_form = CommentForm(request.POST)
@@ -85,16 +166,24 @@ def lesson_detail(request, pk):
     
     context = {
         'lesson': lesson,
-        'comments': lesson.comments.select_related('author').order_by('-created_date'),
+        'comments': lesson.comments.select_related('author__profile').order_by('-created_date'),
         'comment_form': comment_form,
         'is_starred': lesson.starred_by.filter(id=request.user.id).exists(),
+        # Keys for the cached fragments of lesson_detail.html; the querysets
+        # below are only evaluated when a fragment has to be re-rendered
+        'lesson_version': lesson_version(lesson.pk),
+        'related_version': lesson_generation(),
         'attachments': lesson.attachments.select_related('uploaded_by'),
+        'tagged_users': lesson.tags.select_related('profile'),
         'related_lessons': Lesson.objects.filter(
             project=lesson.project
         ).exclude(pk=lesson.pk).order_by('-created_date')[:3],
     }
     
-    return render(request, 'lessons/lesson_detail.html', context)
+    response = render(request, 'lessons/lesson_detail.html', context)
+    if request.method in ('GET', 'HEAD'):
+        set_validators(response, etag, last_modified)
+    return response
 
 @login_required
 def lesson_create(request):
@@ -140,6 +229,73 @@ def lesson_create(request):
     
     return render(request, 'lessons/lesson_form.html', context)
 
+@login_required
+def lesson_import(request):
+    """Bulk-import lessons into the user's projects from an uploaded file."""
+    result = None
+    if request.method == 'POST':
+        form = LessonImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            importer = LessonImporter(
+                user=request.user,
+                skip_invalid=form.cleaned_data['skip_invalid'],
+                dry_run=form.cleaned_data['dry_run'],
+            )
+            try:
+                result = importer.run(read_rows(form.cleaned_data['file'], form.file_format))
+            except LessonImportError as e:
+                form.add_error('file', str(e))
+            else:
+                if result.committed and not importer.dry_run:
+                    messages.success(request, f"Imported {result.created} lessons.")
+                    if not result.invalid:
+                        return redirect('lesson-list')
+    else:
+        form = LessonImportForm()
+    
+    context = {
+        'form': form,
+        'result': result,
+        'columns': REQUIRED_COLUMNS + OPTIONAL_COLUMNS,
+        'required_columns': REQUIRED_COLUMNS,
+    }
+    return render(request, 'lessons/lesson_import.html', context)
+
+def editable_lessons(user):
+    """Lessons the user may edit: their own, or any lesson for staff."""
+    if user.is_staff:
+        return Lesson.objects.all()
+    return Lesson.objects.filter(submitted_by=user)
+
+@login_required
+def lesson_bulk_update(request):
+    """Apply one status, impact, category or archive change to the lessons ticked in the list."""
+    if request.method != 'POST':
+        return redirect('lesson-list')
+    
+    # Return to the list with the filters and page it was submitted from
+    list_url = reverse('lesson-list')
+    if request.POST.get('query'):
+        list_url = f"{list_url}?{QueryDict(request.POST['query']).urlencode()}"
+    
+    form = LessonBulkActionForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect(list_url)
+    
+    # Check permissions for the whole selection in one query, not per lesson
+    selected = form.cleaned_data['lessons']
+    allowed = list(editable_lessons(request.user).filter(pk__in=selected).values_list('pk', flat=True))
+    updated = bulk_update_lessons(Lesson.objects.filter(pk__in=allowed), **form.changes)
+    
+    messages.success(request, f"Updated {updated} lesson{'s' if updated != 1 else ''}.")
+    skipped = len(selected) - len(allowed)
+    if skipped:
+        messages.warning(request, f"Skipped {skipped} selected lesson{'s' if skipped != 1 else ''}: you can only change lessons you submitted.")
+    return redirect(list_url)
+
 @login_required
 def lesson_update(request, pk):
     lesson = get_object_or_404(Lesson, pk=pk)
@@ -223,25 +379,12 @@ def delete_lesson(request, pk):
     })
 
 def export_lessons_csv(queryset):
-    response = HttpResponse(content_type='text/csv')
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in export_rows(queryset)),
+        content_type='text/csv'
+    )
     response['Content-Disposition'] = 'attachment; filename="lessons_learned.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Project', 'Title', 'Category', 'Date Identified', 'Status', 'Impact', 'Description', 'Recommendations', 'Submitted By'])
-    
-    for lesson in queryset:
-        writer.writerow([
-            lesson.project.name,
-            lesson.title,
-            lesson.category.name if lesson.category else '',
-            lesson.date_identified,
-            lesson.get_status_display(),
-            lesson.get_impact_display(),
-            lesson.description,
-            lesson.recommendations,
-            lesson.submitted_by.username,
-        ])
-    
     return response
 
 # Alternative PDF export that doesn't use WeasyPrint
@@ -249,35 +392,55 @@ def export_lessons_pdf(queryset):
     """
     HTML-based alternative to WeasyPrint PDF export
     """
-    html_string = render_to_string('lessons/pdf_template.html', {'lessons': queryset})
-    
     response = HttpResponse(content_type='text/html')
     response['Content-Disposition'] = 'attachment; filename="lessons_learned.html"'
+    response.write(render_lessons_html(queryset))
+    return response
+
+@login_required
+def export_job_status(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk, user=request.user)
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'id': job.pk,
+            'status': job.status,
+            'format': job.export_format,
+            'row_count': job.row_count,
+            'error': job.error,
+            'download_url': reverse('export-job-download', args=[job.pk]) if job.status == 'DONE' else None,
+        })
+    
+    return render(request, 'lessons/export_status.html', {'job': job})
+
+@login_required
+def export_job_download(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk, user=request.user, status='DONE')
     
-    # Add print script to automatically print when opened
-    print_script = """
-    <script>
-        window.onload = function() {
-            document.title = "Lessons Learned Report";
-            setTimeout(function() {
-                window.print();
-            }, 500);
-        }
-    </script>
-    """
-    
-    # Insert the script right before the closing </body> tag
-    modified_html = html_string.replace('</body>', f'{print_script}</body>')
+    if not job.file or not job.file.storage.exists(job.file.name):
+        raise Http404("This export is no longer available.")
     
-    response.write(modified_html)
-    return response
+    if job.export_format == 'csv':
+        filename, content_type = 'lessons_learned.csv', 'text/csv'
+    else:
+        filename, content_type = 'lessons_learned.html', 'text/html'
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=filename, content_type=content_type)
 
+@query_budget(8)
 @login_required
 def dashboard(request):
+    # Everything below is derived from the user's projects and their lessons;
+    # membership changes bump the project generation
+    etag = page_etag(request, 'dashboard', lesson_generation(), project_generation())
+    response = page_not_modified(request, etag)
+    if response:
+        return response
+    
     user_projects = request.user.projects.all()
     
-    # Check if there are any lessons at all
-    total_lessons = Lesson.objects.filter(project__in=user_projects).count()
+    # Read every counter on the page from the per-project rollup
+    stats = summarize_projects(user_projects)
+    total_lessons = stats['total']
     
     # Get latest lessons with optimized query
     latest_lessons = Lesson.objects.filter(project__in=user_projects).select_related(
@@ -301,49 +464,27 @@ def dashboard(request):
     
     # Only gather statistics if there are lessons
     if total_lessons > 0:
-        # Get lessons by category
-        category_counts = Lesson.objects.filter(
-            project__in=user_projects
-        ).values('category__name').annotate(count=Count('category')).order_by('-count')
-        
-        for item in category_counts:
-            category_name = item['category__name'] or 'Uncategorized'
-            lessons_by_category[category_name] = item['count']
+        lessons_by_category = stats['by_category']
         
-        # Get lessons by status
-        status_counts = Lesson.objects.filter(
-            project__in=user_projects
-        ).values('status').annotate(count=Count('status')).order_by('status')
-        
-        for item in status_counts:
-            status_code = item['status']
-            status_display = dict(Lesson.STATUS_CHOICES).get(status_code, status_code)
+        for status_code, status_display in Lesson.STATUS_CHOICES:
+            count = stats['by_status'][status_code]
+            if not count:
+                continue
             
             # Store with display name
-            lessons_by_status[status_display] = item['count']
+            lessons_by_status[status_display] = count
             
             # Also store with a normalized key format suitable for template access
-            status_key = status_code.lower()
-            lessons_by_status[status_key] = item['count']
-        
-        # Get high impact lessons count
-        high_impact_count = Lesson.objects.filter(
-            project__in=user_projects, 
-            impact='HIGH'
-        ).count()
+            lessons_by_status[status_code.lower()] = count
         
-        # Get explicit count of NEW lessons
-        new_lessons_count = Lesson.objects.filter(
-            project__in=user_projects,
-            status='NEW'
-        ).count()
+        high_impact_count = stats['by_impact']['HIGH']
+        new_lessons_count = stats['by_status']['NEW']
         
         # Only add new_count if there are actually lessons
         if new_lessons_count > 0:
             lessons_by_status['new_count'] = new_lessons_count
         
         # Prepare JSON data for charts
-        import json
         category_labels = list(lessons_by_category.keys())
         category_data = list(lessons_by_category.values())
         category_json_labels = json.dumps(category_labels)
@@ -370,7 +511,7 @@ def dashboard(request):
         'has_lessons': total_lessons > 0,
     }
     
-    return render(request, 'lessons/dashboard.html', context)
+    return set_validators(render(request, 'lessons/dashboard.html', context), etag)
 
 @login_required
 def create_category(request):
@@ -0,0 +1,153 @@
+"""
+Query budgets: catch N+1 queries per request.
+
+Views declare the most queries one request may issue with @query_budget(n).
+In development QueryBudgetMiddleware records every request's queries, adds an
+X-Query-Count header and logs a warning when a view exceeds its budget or
+repeats the same SQL (the shape of an N+1 loop in a template). Tests use
+QueryBudgetTestMixin to fail on the same conditions.
+"""
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+import logging
+import re
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import resolve
+
+logger = logging.getLogger('lessons_learned.queries')
+
+# Literals and placeholder lists that vary between otherwise identical queries
+IN_LIST_RE = re.compile(r'\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)')
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+\b')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def query_budget(max_queries):
+    """Declare the most queries one request to the decorated view may issue."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def normalize_sql(sql):
+    """Reduce a query to its shape, so repeats with different values compare equal."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return WHITESPACE_RE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """Record the SQL run on every database connection inside a with block."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self, threshold=None):
+        """{query shape: times run} for every shape run at least threshold times."""
+        threshold = threshold or settings.QUERY_BUDGET_DUPLICATE_THRESHOLD
+        shapes = Counter(normalize_sql(sql) for sql, _ in self.queries)
+        return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+
+def budget_problems(recorder, budget, threshold=None):
+    """Human-readable descriptions of the budget and duplicate-query violations."""
+    problems = []
+    if budget is not None and recorder.count > budget:
+        problems.append(f'{recorder.count} queries exceed the budget of {budget}')
+    for shape, count in sorted(recorder.duplicates(threshold).items(), key=lambda item: -item[1]):
+        problems.append(f'{count}x {shape}')
+    return problems
+
+
+class QueryBudgetMiddleware:
+    """
+    Development middleware enforcing @query_budget and flagging repeated SQL.
+
+    Enabled by QUERY_BUDGET_ENABLED (defaults to DEBUG). Queries issued while a
+    streaming response is consumed happen after the middleware returns and are
+    not counted.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_budget = None
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        response['X-Query-Count'] = str(recorder.count)
+        problems = budget_problems(recorder, request.query_budget)
+        if problems:
+            logger.warning(
+                'Query budget problems on %s %s:\n  %s',
+                request.method, request.path, '\n  '.join(problems)
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase mixin failing tests on N+1 queries or views over their budget.
+
+        with self.assertQueryBudget(5):
+            render_something()
+
+        self.assertViewWithinBudget(reverse('lesson-list'))
+    """
+
+    duplicate_query_threshold = None
+
+    @contextmanager
+    def assertQueryBudget(self, budget=None, threshold=None):
+        with QueryRecorder() as recorder:
+            yield recorder
+        problems = budget_problems(recorder, budget, threshold or self.duplicate_query_threshold)
+        if problems:
+            self.fail('Query budget problems:\n  ' + '\n  '.join(problems))
+
+    def assertViewWithinBudget(self, path, data=None, threshold=None):
+        """GET path with self.client and check it against the view's declared budget."""
+        budget = getattr(resolve(urlsplit(path).path).func, 'query_budget', None)
+        with self.assertQueryBudget(budget, threshold):
+            response = self.client.get(path, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response
@@ -9,7 +9,9 @@ https://docs.djangoproject.com/en/5.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
+import hashlib
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,6 +53,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'lessons_learned.query_budget.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -90,6 +93,39 @@ DATABASES = {
     }
 }
 
+# Cache
+# CACHE_BACKEND selects where cached lookups (allowed email domains, project
+# access, list totals, page fragments) live:
+#   sqlite - a SQLite file shared by every worker process on this host (default)
+#   file   - Django's file-based cache in a shared directory
+#   redis  - a Redis-compatible server at CACHE_LOCATION (needs the redis package)
+#   locmem - per-process memory; used for test runs so tests never share state
+TESTING = sys.argv[1:2] == ['test']
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem' if TESTING else 'sqlite')
+CACHE_BACKENDS = {
+    'sqlite': ('lessons_learned.cache_backends.SQLiteCache', BASE_DIR / 'cache.sqlite3'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', BASE_DIR / 'cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'lessons-learned'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(CACHE_BACKENDS[CACHE_BACKEND][1])),
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'lessons'),
+    }
+}
+# Redis evicts by its own maxmemory policy and rejects unknown OPTIONS
+if CACHE_BACKEND != 'redis':
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000)),
+    }
+
+# Query budgets (see lessons_learned/query_budget.py): in development, log
+# requests over their view's @query_budget or repeating the same SQL this often
+QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET_ENABLED', str(DEBUG and not TESTING)).lower() == 'true'
+QUERY_BUDGET_DUPLICATE_THRESHOLD = int(os.environ.get('QUERY_BUDGET_DUPLICATE_THRESHOLD', 3))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -158,3 +194,36 @@ ALLOWED_EMAIL_DOMAINS = ['company.com', 'organization.org', 'gmail.com']  # Incl
 
 # Email settings (for development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Notification email outbox, drained by the send_queued_email command
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 100))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_RETRY_DELAY = int(os.environ.get('EMAIL_OUTBOX_RETRY_DELAY', 60))
+EMAIL_OUTBOX_MAX_RETRY_DELAY = int(os.environ.get('EMAIL_OUTBOX_MAX_RETRY_DELAY', 3600))
+EMAIL_OUTBOX_LEASE = int(os.environ.get('EMAIL_OUTBOX_LEASE', 300))
+
+# Exports covering more lessons than this are rendered by the run_export_worker command
+EXPORT_BACKGROUND_THRESHOLD = int(os.environ.get('EXPORT_BACKGROUND_THRESHOLD', 5000))
+
+# Seconds after which a RUNNING export job is assumed lost with its worker and requeued
+EXPORT_JOB_TIMEOUT = int(os.environ.get('EXPORT_JOB_TIMEOUT', 1800))
+
+# Lesson list pagination: 'offset' (page numbers) or 'cursor' (keyset, fast for deep pages)
+LESSON_LIST_PAGINATION = os.environ.get('LESSON_LIST_PAGINATION', 'offset')
+
+# Seconds a cached lesson list total may be reused in cursor pagination mode
+LESSON_COUNT_CACHE_TIMEOUT = int(os.environ.get('LESSON_COUNT_CACHE_TIMEOUT', 300))
+
+# Seconds a user's cached project memberships and roles may be reused
+PROJECT_ACCESS_CACHE_TIMEOUT = int(os.environ.get('PROJECT_ACCESS_CACHE_TIMEOUT', 60))
+
+# Seconds a rendered lesson_detail fragment may be served from the cache
+LESSON_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('LESSON_FRAGMENT_CACHE_TIMEOUT', 3600))
+
+# Mixed into the ETags of HTML pages; set RELEASE_VERSION on deploy so template changes revalidate
+PAGE_ETAG_SALT = os.environ.get('PAGE_ETAG_SALT') or hashlib.sha256(
+    f"{SECRET_KEY}:{os.environ.get('RELEASE_VERSION', '')}".encode()
+).hexdigest()
+
+# Base URL used for links in notification emails
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')
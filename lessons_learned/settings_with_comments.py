@@ -15,7 +15,9 @@ For production deployment, several settings should be modified:
 Environment variables can be used to override these settings for different environments.
 """
 
+import hashlib
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -63,6 +65,7 @@ INSTALLED_APPS = [
 # These are executed in order for each request/response cycle
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',           # Security enhancements
+    'lessons_learned.query_budget.QueryBudgetMiddleware',     # Query budgets (development)
     'django.contrib.sessions.middleware.SessionMiddleware',    # Session support
     'django.middleware.common.CommonMiddleware',               # Common features
     'django.middleware.csrf.CsrfViewMiddleware',               # CSRF protection
@@ -108,6 +111,50 @@ DATABASES = {
     }
 }
 
+# Cache configuration
+# Without a shared cache every gunicorn worker keeps its own copy of cached
+# lookups (allowed email domains, project access, list totals, page fragments)
+# and invalidates it independently. CACHE_BACKEND selects where they live:
+#   sqlite - a SQLite file shared by every worker process on this host (default)
+#   file   - Django's file-based cache in a shared directory
+#   redis  - a Redis-compatible server at CACHE_LOCATION (needs the redis package)
+#   locmem - per-process memory; used for test runs so tests never share state
+# CACHE_LOCATION overrides the file path, directory or server URL, e.g.
+# CACHE_BACKEND=redis CACHE_LOCATION=redis://cache.internal:6379/0
+TESTING = sys.argv[1:2] == ['test']
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem' if TESTING else 'sqlite')
+CACHE_BACKENDS = {
+    'sqlite': ('lessons_learned.cache_backends.SQLiteCache', BASE_DIR / 'cache.sqlite3'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', BASE_DIR / 'cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'lessons-learned'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(CACHE_BACKENDS[CACHE_BACKEND][1])),
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'lessons'),
+    }
+}
+# MAX_ENTRIES bounds the size of the SQLite, file and local-memory caches.
+# Redis evicts keys by its own maxmemory policy instead, and RedisCache hands
+# every OPTIONS entry to the redis connection, which rejects unknown ones.
+if CACHE_BACKEND != 'redis':
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000)),
+    }
+
+# Query budgets
+# QueryBudgetMiddleware records the queries of every request, adds an
+# X-Query-Count response header and logs a warning (logger
+# 'lessons_learned.queries') when a view issues more queries than its
+# @query_budget allows, or runs the same SQL shape at least
+# QUERY_BUDGET_DUPLICATE_THRESHOLD times - the usual sign of an N+1 loop in a
+# template. It is on in development and removed at startup otherwise; tests
+# use lessons_learned.query_budget.QueryBudgetTestMixin instead.
+QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET_ENABLED', str(DEBUG and not TESTING)).lower() == 'true'
+QUERY_BUDGET_DUPLICATE_THRESHOLD = int(os.environ.get('QUERY_BUDGET_DUPLICATE_THRESHOLD', 3))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -176,9 +223,63 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@lessonslearned.example.com')
 
+# Notification email outbox
+# Signal handlers only queue OutboxEmail rows; the send_queued_email command
+# sends them in batches over one connection and retries failures with
+# exponential backoff (RETRY_DELAY doubling per attempt, capped at
+# MAX_RETRY_DELAY) until MAX_ATTEMPTS is reached. LEASE is how long a
+# claimed email is hidden from other dispatchers while it is being sent.
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 100))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_RETRY_DELAY = int(os.environ.get('EMAIL_OUTBOX_RETRY_DELAY', 60))
+EMAIL_OUTBOX_MAX_RETRY_DELAY = int(os.environ.get('EMAIL_OUTBOX_MAX_RETRY_DELAY', 3600))
+EMAIL_OUTBOX_LEASE = int(os.environ.get('EMAIL_OUTBOX_LEASE', 300))
+
 # Site URL for links in emails
 SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')
 
+# Exports covering more lessons than this are queued and rendered by the
+# run_export_worker management command instead of inside the request
+EXPORT_BACKGROUND_THRESHOLD = int(os.environ.get('EXPORT_BACKGROUND_THRESHOLD', 5000))
+
+# Seconds a job may stay RUNNING before the worker assumes the process that
+# claimed it crashed or was killed. Such a job is put back in the queue once;
+# if it goes stale a second time it is marked FAILED so an export that keeps
+# killing its worker is not retried forever. Keep this well above the time
+# the largest export takes to render.
+EXPORT_JOB_TIMEOUT = int(os.environ.get('EXPORT_JOB_TIMEOUT', 1800))
+
+# Lesson list pagination: 'offset' shows page numbers; 'cursor' pages on
+# (created_date, id) so deep pages are as fast as the first one
+LESSON_LIST_PAGINATION = os.environ.get('LESSON_LIST_PAGINATION', 'offset')
+
+# Seconds a cached lesson list total may be reused in cursor pagination mode
+LESSON_COUNT_CACHE_TIMEOUT = int(os.environ.get('LESSON_COUNT_CACHE_TIMEOUT', 300))
+
+# Seconds a user's project memberships and roles are cached for access checks
+# (projects.access). Membership and role changes invalidate the entry at once;
+# the timeout only bounds staleness from bulk updates that bypass signals.
+PROJECT_ACCESS_CACHE_TIMEOUT = int(os.environ.get('PROJECT_ACCESS_CACHE_TIMEOUT', 60))
+
+# Seconds a rendered lesson_detail fragment may be served from the cache.
+# Fragments are keyed on a per-lesson version that lesson, comment, attachment
+# and tag changes bump, as do renames of the lesson's project or category and
+# profile edits of the users it shows, so edits show up immediately; the
+# timeout only bounds staleness from bulk updates that bypass signals.
+# Hit ratios are reported by `manage.py fragment_cache_stats` and are added to
+# the shared counters by each process about once a minute.
+LESSON_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('LESSON_FRAGMENT_CACHE_TIMEOUT', 3600))
+
+# Mixed into the ETags of the lesson detail, project detail and dashboard
+# pages. Those ETags are built from data version counters, so a deploy that
+# only changes templates would otherwise let browsers keep showing the old
+# markup. The default is derived from SECRET_KEY and RELEASE_VERSION, so every
+# worker and restart of one release issues the same ETags; set RELEASE_VERSION
+# (e.g. to the git revision) on deploy, or PAGE_ETAG_SALT to override outright.
+PAGE_ETAG_SALT = os.environ.get('PAGE_ETAG_SALT') or hashlib.sha256(
+    f"{SECRET_KEY}:{os.environ.get('RELEASE_VERSION', '')}".encode()
+).hexdigest()
+
 # Summernote configuration
 SUMMERNOTE_CONFIG = {
     'summernote': {
@@ -0,0 +1,218 @@
+import importlib.util
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.redis import RedisCache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from accounts.utils import get_allowed_email_domains
+from lessons import views as lesson_views
+from projects.models import Project
+from .cache_backends import SQLiteCache
+from .query_budget import QueryRecorder, normalize_sql
+
+# Run by separate Python processes in SQLiteCacheTests
+INCREMENT_SCRIPT = """
+import sys
+from lessons_learned.cache_backends import SQLiteCache
+cache = SQLiteCache(sys.argv[1], {})
+for _ in range(int(sys.argv[2])):
+    cache.incr('counter')
+"""
+
+
+class CacheBackendContractMixin:
+    """Behaviour every configurable CACHE_BACKEND must provide."""
+    
+    def make_cache(self):
+        raise NotImplementedError
+    
+    def setUp(self):
+        self.cache = self.make_cache()
+        self.cache.clear()
+        
+    def test_set_get_and_delete(self):
+        """Test basic storage and removal of values."""
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.cache.delete_many(['key'])
+        self.assertIsNone(self.cache.get('key'))
+        
+    def test_add_and_incr(self):
+        """Test add only writes missing keys and incr works on stored integers."""
+        self.assertTrue(self.cache.add('counter', 1, None))
+        self.assertFalse(self.cache.add('counter', 5, None))
+        self.assertEqual(self.cache.incr('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        
+    def test_entries_expire(self):
+        """Test that values disappear after their timeout."""
+        self.cache.set('short', 'value', 1)
+        time.sleep(1.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertTrue(self.cache.add('short', 'again', 60))
+
+
+class SQLiteCacheTests(CacheBackendContractMixin, TestCase):
+    """Tests for the SQLite-backed cache shared between worker processes."""
+    
+    def make_cache(self):
+        self.location = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
+        return SQLiteCache(self.location, {})
+        
+    def test_entries_are_shared_between_instances(self):
+        """Test that a second worker sees entries written by the first."""
+        other_worker = SQLiteCache(self.location, {})
+        self.cache.set('shared', 'hit')
+        self.assertEqual(other_worker.get('shared'), 'hit')
+        
+    def test_increments_are_atomic_across_processes(self):
+        """Test that concurrent increments from several processes are not lost."""
+        self.cache.set('counter', 0, None)
+        workers = [
+            subprocess.Popen([sys.executable, '-c', INCREMENT_SCRIPT, self.location, '50'], cwd=settings.BASE_DIR)
+            for _ in range(3)
+        ]
+        for worker in workers:
+            self.assertEqual(worker.wait(timeout=60), 0)
+        self.assertEqual(self.cache.get('counter'), 150)
+        
+    def test_culls_when_full(self):
+        """Test that the cache stays near MAX_ENTRIES."""
+        cache = SQLiteCache(self.location, {'OPTIONS': {'MAX_ENTRIES': 30, 'CULL_FREQUENCY': 3}})
+        for i in range(90):
+            cache.set(f'key{i}', i)
+        count = cache._db.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        self.assertLessEqual(count, 33)
+        
+    def test_allowed_domains_lookup_is_shared(self):
+        """Test that one worker's cached domain list is a hit for the others."""
+        caches_setting = {'default': {
+            'BACKEND': 'lessons_learned.cache_backends.SQLiteCache',
+            'LOCATION': self.location,
+        }}
+        with override_settings(CACHES=caches_setting):
+            domains = get_allowed_email_domains()
+        self.assertEqual(SQLiteCache(self.location, {}).get('allowed_email_domains'), domains)
+
+
+class FileBasedCacheTests(CacheBackendContractMixin, TestCase):
+    """Tests for CACHE_BACKEND=file."""
+    
+    def make_cache(self):
+        return FileBasedCache(tempfile.mkdtemp(), {})
+
+
+@skipUnless(
+    os.environ.get('CACHE_TEST_REDIS_URL') and importlib.util.find_spec('redis'),
+    'Set CACHE_TEST_REDIS_URL to a Redis-compatible server (redis-server, KeyDB, ...) to run'
+)
+class RedisCacheTests(CacheBackendContractMixin, TestCase):
+    """Tests for CACHE_BACKEND=redis against a local stand-in server."""
+    
+    def make_cache(self):
+        return RedisCache(os.environ.get('CACHE_TEST_REDIS_URL', ''), {'KEY_PREFIX': 'lessons-test'})
+
+
+def load_settings(**environ):
+    """Evaluate lessons_learned/settings.py afresh under the given environment."""
+    with patch.dict(os.environ, environ):
+        return runpy.run_module('lessons_learned.settings')
+
+
+class CacheSettingsTests(TestCase):
+    """Tests for the CACHES dict that settings builds for each CACHE_BACKEND."""
+    
+    def test_max_entries_for_local_backends(self):
+        for backend in ('sqlite', 'file', 'locmem'):
+            config = load_settings(CACHE_BACKEND=backend, CACHE_MAX_ENTRIES='500')['CACHES']['default']
+            cache = import_string(config['BACKEND'])(config['LOCATION'], config)
+            self.assertEqual(cache._max_entries, 500, backend)
+    
+    def test_redis_gets_no_unsupported_options(self):
+        config = load_settings(CACHE_BACKEND='redis')['CACHES']['default']
+        self.assertNotIn('OPTIONS', config)
+        if importlib.util.find_spec('redis'):
+            # Build a connection the way the first cache access does, without connecting
+            cache = RedisCache(config['LOCATION'], config)
+            cache._cache._get_connection_pool(write=True).make_connection()
+
+
+class PageEtagSaltTests(TestCase):
+    """Tests for the default PAGE_ETAG_SALT shared by every worker process."""
+    
+    def test_salt_is_stable_across_reloads(self):
+        salt = load_settings(RELEASE_VERSION='1.0')['PAGE_ETAG_SALT']
+        self.assertEqual(load_settings(RELEASE_VERSION='1.0')['PAGE_ETAG_SALT'], salt)
+        self.assertNotEqual(load_settings(RELEASE_VERSION='1.1')['PAGE_ETAG_SALT'], salt)
+        self.assertEqual(load_settings(PAGE_ETAG_SALT='fixed')['PAGE_ETAG_SALT'], 'fixed')
+
+
+class QueryBudgetTests(TestCase):
+    """Tests for the query budget middleware and helpers."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.project = Project.objects.create(
+            name='Test Project',
+            description='Test Description',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user)
+        
+    def test_normalize_sql(self):
+        """Test that queries differing only in values share one shape."""
+        self.assertEqual(
+            normalize_sql('SELECT * FROM "t" WHERE "id" = 12 AND "name" = \'it\'\'s\'  LIMIT 21'),
+            'SELECT * FROM "t" WHERE "id" = ? AND "name" = ? LIMIT ?'
+        )
+        self.assertEqual(
+            normalize_sql('SELECT 1 FROM "t" WHERE "id" IN (%s, %s, %s)'),
+            normalize_sql('SELECT 1 FROM "t" WHERE "id" IN (%s)')
+        )
+        
+    def test_recorder_reports_duplicates(self):
+        """Test that the recorder flags a query repeated per row."""
+        for i in range(3):
+            User.objects.create_user(username=f'member{i}')
+        with QueryRecorder() as recorder:
+            for user in User.objects.all():
+                Project.objects.filter(team_members=user).exists()
+        self.assertEqual(recorder.count, 5)
+        self.assertEqual(list(recorder.duplicates(threshold=3).values()), [4])
+        self.assertEqual(recorder.duplicates(threshold=5), {})
+        
+    @override_settings(QUERY_BUDGET_ENABLED=True)
+    def test_middleware_reports_query_count(self):
+        """Test that the middleware adds the query count and logs budget overruns."""
+        client = Client()
+        client.login(username='testuser', password='testpassword')
+        
+        response = client.get(reverse('lesson-list'))
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        
+        with patch.object(lesson_views.lesson_list, 'query_budget', 1), \
+             self.assertLogs('lessons_learned.queries', 'WARNING') as logs:
+            client.get(reverse('lesson-list'))
+        self.assertIn('exceed the budget of 1', logs.output[0])
+        
+    def test_middleware_disabled_outside_development(self):
+        """Test that the middleware is removed when query budgets are disabled."""
+        client = Client()
+        client.login(username='testuser', password='testpassword')
+        response = client.get(reverse('lesson-list'))
+        self.assertNotIn('X-Query-Count', response)
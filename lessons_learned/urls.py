@@ -48,6 +48,7 @@ urlpatterns = [
     path('', dashboard, name='dashboard'),
     path('projects/', include('projects.urls')),
     path('lessons/', include('lessons.urls')),
+    path('api/', include('lessons.api_urls')),
     
     # Summernote
     path('summernote/', include('django_summernote.urls')),
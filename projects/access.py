@@ -0,0 +1,85 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Project, ProjectRole
+
+# Roles that may edit a project and manage its team
+MANAGER_ROLES = {'OWNER', 'MANAGER'}
+
+
+# Counter bumped whenever a project, its team or a role changes; pages that
+# show project details include it in their ETags
+PROJECT_GENERATION_KEY = 'projects:generation'
+
+
+def access_cache_key(user_id):
+    return f'projects:access:{user_id}'
+
+
+class ProjectAccess:
+    """
+    A user's project memberships and roles, loaded once and then answered
+    with dictionary lookups instead of per-check queries.
+    """
+
+    def __init__(self, member_of, roles):
+        self.member_of = frozenset(member_of)
+        self.roles = dict(roles)
+
+    @classmethod
+    def load(cls, user):
+        member_of = Project.team_members.through.objects.filter(
+            user_id=user.pk
+        ).values_list('project_id', flat=True)
+        roles = ProjectRole.objects.filter(user_id=user.pk).values_list('project_id', 'role')
+        return cls(member_of, roles)
+
+    def is_member(self, project):
+        return getattr(project, 'pk', project) in self.member_of
+
+    def role(self, project):
+        return self.roles.get(getattr(project, 'pk', project))
+
+    def can_manage(self, project):
+        return self.role(project) in MANAGER_ROLES
+
+
+def get_project_access(request):
+    """
+    Return the ProjectAccess for request.user. It is resolved at most once
+    per request, and shared between requests through the cache for
+    PROJECT_ACCESS_CACHE_TIMEOUT seconds; projects.signals drops the cached
+    entry whenever the user's memberships or roles change.
+    """
+    access = getattr(request, '_project_access', None)
+    if access is None:
+        key = access_cache_key(request.user.pk)
+        cached = cache.get(key)
+        if cached is None:
+            access = ProjectAccess.load(request.user)
+            cache.set(key, (access.member_of, access.roles), settings.PROJECT_ACCESS_CACHE_TIMEOUT)
+        else:
+            access = ProjectAccess(*cached)
+        request._project_access = access
+    return access
+
+
+def invalidate_project_access(user_ids):
+    cache.delete_many([access_cache_key(user_id) for user_id in user_ids])
+
+
+def project_generation():
+    generation = cache.get(PROJECT_GENERATION_KEY)
+    if generation is None:
+        cache.add(PROJECT_GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(PROJECT_GENERATION_KEY)
+    return generation
+
+
+def bump_project_generation():
+    try:
+        cache.incr(PROJECT_GENERATION_KEY)
+    except ValueError:
+        cache.set(PROJECT_GENERATION_KEY, time.time_ns(), None)
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.contrib.auth.models import User
+from django.dispatch import receiver
+from .models import Project, ProjectRole
+from .access import invalidate_project_access, bump_project_generation
+
+@receiver(m2m_changed, sender=Project.team_members.through)
+def invalidate_access_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and not reverse:
+        # The cleared members are only known before the rows are removed
+        instance._cleared_member_ids = list(instance.team_members.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_project_access([instance.pk] if reverse else pk_set)
+    elif action == 'post_clear':
+        invalidate_project_access([instance.pk] if reverse else getattr(instance, '_cleared_member_ids', []))
+
+@receiver(post_save, sender=ProjectRole)
+@receiver(post_delete, sender=ProjectRole)
+def invalidate_access_on_role_change(sender, instance, **kwargs):
+    invalidate_project_access([instance.user_id])
+
+@receiver(pre_delete, sender=Project)
+def invalidate_access_on_project_delete(sender, instance, **kwargs):
+    # Membership rows are removed by the cascade without m2m_changed
+    invalidate_project_access(instance.team_members.values_list('pk', flat=True))
+
+@receiver(post_save, sender=User)
+def invalidate_access_for_new_user(sender, instance, created, **kwargs):
+    # Never let a new account inherit an entry cached under a reused id
+    if created:
+        invalidate_project_access([instance.pk])
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=ProjectRole)
+@receiver(post_delete, sender=ProjectRole)
+def bump_generation_on_project_change(sender, **kwargs):
+    bump_project_generation()
+
+@receiver(m2m_changed, sender=Project.team_members.through)
+def bump_generation_on_membership_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_project_generation()
@@ -7,6 +7,15 @@ from datetime import date, timedelta
 
 from .models import Project, ProjectRole
 from .forms import ProjectForm, ProjectRoleForm
+from .access import get_project_access
+from .views import PROJECTS_PER_PAGE, PROJECT_LESSONS_PER_PAGE
+from lessons.models import Lesson
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from types import SimpleNamespace
+import re
+from lessons_learned.query_budget import QueryBudgetTestMixin
 
 class ProjectsModelTests(TestCase):
     """Tests for the projects models."""
@@ -278,4 +287,300 @@ class ProjectsViewsTests(TestCase):
         response = self.client.get(add_url)
         
         # Should redirect with an error message
-        self.assertEqual(response.status_code, 302)
\ No newline at end of file
+        self.assertEqual(response.status_code, 302)
+
+class ProjectAccessTests(TestCase):
+    """Tests for the cached project membership and role checks."""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpassword'
+        )
+        
+        self.project = Project.objects.create(
+            name='Access Project',
+            description='Project for access tests',
+            start_date=timezone.now().date(),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user)
+        ProjectRole.objects.create(user=self.user, project=self.project, role='OWNER')
+        
+        # A large team should not change the cost of an access check
+        members = [User(username=f'member{i}') for i in range(200)]
+        User.objects.bulk_create(members)
+        self.project.team_members.add(*User.objects.filter(username__startswith='member'))
+        
+        self.request = SimpleNamespace(user=self.user)
+        
+    def test_access_is_resolved_once_per_request(self):
+        """Test that repeated checks on one request reuse the loaded memberships."""
+        with self.assertNumQueries(2):
+            access = get_project_access(self.request)
+        with self.assertNumQueries(0):
+            self.assertIs(get_project_access(self.request), access)
+            self.assertTrue(access.is_member(self.project))
+            self.assertTrue(access.can_manage(self.project.pk))
+            self.assertEqual(access.role(self.project), 'OWNER')
+        
+    def test_access_is_shared_through_cache(self):
+        """Test that a later request reads the memberships from the cache."""
+        get_project_access(self.request)
+        with self.assertNumQueries(0):
+            access = get_project_access(SimpleNamespace(user=self.user))
+        self.assertTrue(access.is_member(self.project))
+        
+    def test_membership_change_invalidates_cache(self):
+        """Test that adding, removing and clearing members drops cached access."""
+        request = SimpleNamespace(user=self.other_user)
+        self.assertFalse(get_project_access(request).is_member(self.project))
+        
+        self.project.team_members.add(self.other_user)
+        self.assertTrue(get_project_access(SimpleNamespace(user=self.other_user)).is_member(self.project))
+        
+        self.other_user.projects.remove(self.project)
+        self.assertFalse(get_project_access(SimpleNamespace(user=self.other_user)).is_member(self.project))
+        
+        self.assertTrue(get_project_access(SimpleNamespace(user=self.user)).is_member(self.project))
+        self.project.team_members.clear()
+        self.assertFalse(get_project_access(SimpleNamespace(user=self.user)).is_member(self.project))
+        
+    def test_role_change_invalidates_cache(self):
+        """Test that saving or deleting a ProjectRole drops cached access."""
+        self.assertTrue(get_project_access(self.request).can_manage(self.project))
+        
+        role = ProjectRole.objects.get(user=self.user, project=self.project)
+        role.role = 'VIEWER'
+        role.save()
+        self.assertFalse(get_project_access(SimpleNamespace(user=self.user)).can_manage(self.project))
+        
+        role.delete()
+        self.assertIsNone(get_project_access(SimpleNamespace(user=self.user)).role(self.project))
+        
+    def test_detail_views_do_not_load_team_members(self):
+        """Test that access checks in the detail views never fetch the member list."""
+        self.client.login(username='testuser', password='testpassword')
+        lesson = Lesson.objects.create(
+            project=self.project,
+            title='Access Lesson',
+            date_identified=timezone.now().date(),
+            description='Description',
+            recommendations='Recommendations',
+            submitted_by=self.user
+        )
+        for url in (
+            reverse('project-detail', kwargs={'pk': self.project.pk}),
+            reverse('project-update', kwargs={'pk': self.project.pk}),
+            reverse('add-team-member', kwargs={'pk': self.project.pk}),
+            reverse('lesson-detail', kwargs={'pk': lesson.pk}),
+        ):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                member_queries = [
+                    query['sql'] for query in ctx.captured_queries
+                    if 'INNER JOIN "projects_project_team_members"' in query['sql']
+                    and 'FROM "auth_user"' in query['sql']
+                ]
+                self.assertEqual(member_queries, [])
+        
+    def test_non_member_is_redirected(self):
+        """Test that users outside the project are still turned away."""
+        self.client.login(username='otheruser', password='testpassword')
+        response = self.client.get(reverse('project-detail', kwargs={'pk': self.project.pk}))
+        self.assertRedirects(response, reverse('project-list'))
+        response = self.client.get(reverse('project-update', kwargs={'pk': self.project.pk}))
+        self.assertRedirects(response, reverse('project-detail', kwargs={'pk': self.project.pk}), fetch_redirect_response=False)
+
+
+class ProjectListTests(QueryBudgetTestMixin, TestCase):
+    """Tests for the annotated, sorted and paginated project list."""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.colleague = User.objects.create_user(username='colleague')
+        self.client.login(username='testuser', password='testpassword')
+        
+    def create_project(self, name, members=(), lessons=(), start_date=None):
+        project = Project.objects.create(
+            name=name,
+            description='Description',
+            start_date=start_date or date(2024, 1, 1),
+            created_by=self.user
+        )
+        project.team_members.add(self.user, *members)
+        for impact in lessons:
+            Lesson.objects.create(
+                project=project,
+                title=f'{name} lesson',
+                date_identified=date(2024, 1, 1),
+                description='Description',
+                recommendations='Recommendations',
+                impact=impact,
+                submitted_by=self.user
+            )
+        return project
+        
+    def test_metrics_are_annotated(self):
+        """Test that member, lesson and high-impact counts and the latest lesson come with the page."""
+        project = self.create_project('Alpha', members=[self.colleague], lessons=['HIGH', 'HIGH', 'LOW'])
+        self.create_project('Empty')
+        
+        response = self.client.get(reverse('project-list'))
+        projects = {p.name: p for p in response.context['projects']}
+        alpha = projects['Alpha']
+        self.assertEqual((alpha.member_count, alpha.lesson_count, alpha.high_impact_count), (2, 3, 2))
+        self.assertEqual(alpha.latest_lesson_date, project.lessons.latest('created_date').created_date)
+        self.assertEqual((projects['Empty'].lesson_count, projects['Empty'].latest_lesson_date), (0, None))
+        self.assertContains(response, '2 high impact')
+        self.assertContains(response, 'None yet')
+        
+    def test_query_count_does_not_grow_with_projects(self):
+        """Test that the list issues a fixed number of queries however many projects it shows."""
+        for i in range(20):
+            self.create_project(f'Project {i}', members=[self.colleague], lessons=['HIGH', 'MEDIUM'])
+        self.assertViewWithinBudget(reverse('project-list'))
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('project-list'))
+        for i in range(20, 24):
+            self.create_project(f'Project {i}', lessons=['LOW'])
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(reverse('project-list'))
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+        
+    def test_sorting(self):
+        """Test sorting by each metric, with empty projects last."""
+        self.create_project('Busy', lessons=['LOW'] * 3, start_date=date(2023, 1, 1))
+        self.create_project('Critical', members=[self.colleague], lessons=['HIGH'])
+        self.create_project('Quiet', start_date=date(2025, 1, 1))
+        
+        def names(sort):
+            response = self.client.get(reverse('project-list'), {'sort': sort})
+            return [project.name for project in response.context['projects']]
+        self.assertEqual(names('name'), ['Busy', 'Critical', 'Quiet'])
+        self.assertEqual(names('-lessons'), ['Busy', 'Critical', 'Quiet'])
+        self.assertEqual(names('-high_impact'), ['Critical', 'Busy', 'Quiet'])
+        self.assertEqual(names('-members'), ['Critical', 'Busy', 'Quiet'])
+        self.assertEqual(names('-latest_lesson'), ['Critical', 'Busy', 'Quiet'])
+        self.assertEqual(names('latest_lesson'), ['Busy', 'Critical', 'Quiet'])
+        self.assertEqual(names('-start_date'), ['Quiet', 'Critical', 'Busy'])
+        # Unknown sort keys fall back to the name
+        self.assertEqual(names('password'), ['Busy', 'Critical', 'Quiet'])
+        
+    def test_pagination(self):
+        """Test that the list is split into pages that keep the sort order."""
+        for i in range(PROJECTS_PER_PAGE + 2):
+            self.create_project(f'Project {i:02d}')
+        
+        response = self.client.get(reverse('project-list'), {'sort': '-name', 'page': 2})
+        self.assertEqual([p.name for p in response.context['projects']], ['Project 01', 'Project 00'])
+        self.assertContains(response, 'Page 2 of 2')
+        self.assertContains(response, '?sort=-name&page=1')
+
+
+class ProjectDetailLessonsTests(QueryBudgetTestMixin, TestCase):
+    """Tests for the paginated lesson table on the project detail page."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.outsider = User.objects.create_user(username='outsider', password='testpassword')
+        self.project = Project.objects.create(
+            name='Large Project',
+            description='Description',
+            start_date=date(2024, 1, 1),
+            created_by=self.user
+        )
+        self.project.team_members.add(self.user)
+        ProjectRole.objects.create(user=self.user, project=self.project, role='OWNER')
+        self.client.login(username='testuser', password='testpassword')
+        
+    def add_lessons(self, count):
+        start = Lesson.objects.count()
+        for i in range(start, start + count):
+            Lesson.objects.create(
+                project=self.project,
+                title=f'Lesson {i:03d}',
+                date_identified=date(2024, 1, 1),
+                description='Description',
+                recommendations='Recommendations',
+                submitted_by=User.objects.create_user(username=f'author{i}')
+            )
+        
+    def test_first_page_only(self):
+        """Test that only the newest page of lessons is rendered."""
+        self.add_lessons(PROJECT_LESSONS_PER_PAGE + 5)
+        response = self.client.get(reverse('project-detail', args=[self.project.pk]))
+        
+        page = response.context['lessons_page']
+        self.assertEqual(len(page), PROJECT_LESSONS_PER_PAGE)
+        self.assertEqual(page.object_list[0].title, f'Lesson {PROJECT_LESSONS_PER_PAGE + 4:03d}')
+        self.assertNotContains(response, 'Lesson 004')
+        self.assertContains(response, 'Load more lessons')
+        
+    def test_query_count_does_not_grow_with_project_size(self):
+        """Test that the page issues a fixed number of queries for large projects."""
+        self.add_lessons(5)
+        self.assertViewWithinBudget(reverse('project-detail', args=[self.project.pk]))
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('project-detail', args=[self.project.pk]))
+        self.add_lessons(PROJECT_LESSONS_PER_PAGE * 3)
+        response = self.assertViewWithinBudget(reverse('project-detail', args=[self.project.pk]))
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(reverse('project-detail', args=[self.project.pk]))
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(response.context['lesson_stats']['total'], 5 + PROJECT_LESSONS_PER_PAGE * 3)
+        
+    def test_load_more_walks_every_lesson(self):
+        """Test that following next_url returns each remaining lesson exactly once."""
+        self.add_lessons(PROJECT_LESSONS_PER_PAGE * 2 + 3)
+        response = self.client.get(reverse('project-detail', args=[self.project.pk]))
+        seen = [lesson.title for lesson in response.context['lessons_page']]
+        url = response.context['more_lessons_url']
+        
+        pages = 0
+        while url:
+            with self.assertQueryBudget(6):
+                data = self.client.get(url).json()
+            seen.extend(re.findall(r'Lesson \d{3}', data['html']))
+            url = data['next_url']
+            pages += 1
+        self.assertEqual(pages, 2)
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(seen, [f'Lesson {i:03d}' for i in range(PROJECT_LESSONS_PER_PAGE * 2 + 2, -1, -1)])
+        
+    def test_load_more_requires_membership(self):
+        """Test that non-members cannot page through a project's lessons."""
+        self.add_lessons(1)
+        self.client.login(username='outsider', password='testpassword')
+        response = self.client.get(reverse('project-lessons', args=[self.project.pk]))
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('html', response.json())
+        
+    def test_unchanged_project_is_not_rendered_again(self):
+        """Test that the detail page revalidates to 304 until its lessons or team change."""
+        self.add_lessons(2)
+        url = reverse('project-detail', args=[self.project.pk])
+        response = self.client.get(url)
+        repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+        self.assertTemplateNotUsed(repeat, 'projects/project_detail.html')
+        
+        self.add_lessons(1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        
+        response = self.client.get(url)
+        ProjectRole.objects.filter(user=self.user, project=self.project).update(role='MEMBER')
+        ProjectRole.objects.get(user=self.user, project=self.project).save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
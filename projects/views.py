@@ -3,64 +3,125 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Project, ProjectRole
 from .forms import ProjectForm, ProjectRoleForm
-from django.db.models import Count, Q
+from django.core.paginator import Paginator
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.db.models import Count, F, Q
+from lessons.conditional import page_etag, page_not_modified, set_validators
+from lessons.pagination import CursorPaginator, lesson_generation
+from lessons.stats import annotate_project_metrics, summarize_projects, status_breakdown
+from lessons_learned.query_budget import query_budget
+from .access import get_project_access, project_generation
+import json
+from urllib.parse import urlencode
 
+# ?sort= values for the project list; prefix with '-' for descending order
+PROJECT_SORT_FIELDS = {
+    'name': 'name',
+    'start_date': 'start_date',
+    'members': 'member_count',
+    'lessons': 'lesson_count',
+    'high_impact': 'high_impact_count',
+    'latest_lesson': 'latest_lesson_date',
+}
+
+PROJECTS_PER_PAGE = 24
+
+@query_budget(6)
 @login_required
 def project_list(request):
-    user_projects = Project.objects.filter(team_members=request.user)
+    # Counts come from subqueries in the page query, not from the template
+    user_projects = annotate_project_metrics(Project.objects.filter(team_members=request.user))
+    
+    sort = request.GET.get('sort', 'name')
+    field = PROJECT_SORT_FIELDS.get(sort.lstrip('-'))
+    if field is None:
+        sort, field = 'name', 'name'
+    ordering = F(field).desc(nulls_last=True) if sort.startswith('-') else F(field).asc(nulls_last=True)
+    user_projects = user_projects.order_by(ordering, 'pk')
+    
+    paginator = Paginator(user_projects, PROJECTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    
     context = {
-        'projects': user_projects
+        'projects': page_obj,
+        'page_obj': page_obj,
+        'sort': sort,
+        'sort_options': [
+            ('name', 'Name'),
+            ('-latest_lesson', 'Latest lesson'),
+            ('-lessons', 'Most lessons'),
+            ('-high_impact', 'Most high-impact lessons'),
+            ('-members', 'Most members'),
+            ('-start_date', 'Newest'),
+        ],
     }
     return render(request, 'projects/project_list.html', context)
 
+PROJECT_LESSONS_PER_PAGE = 20
+
+def project_lessons_page(project, cursor=None):
+    """
+    One keyset page of a project's lessons, newest first, with the related
+    rows the lesson table shows loaded in the same query.
+    """
+    lessons = project.lessons.select_related('category', 'submitted_by').defer(
+        'recommendations', 'implementation_notes'
+    )
+    return CursorPaginator(lessons, PROJECT_LESSONS_PER_PAGE).get_page(cursor)
+
+def project_lessons_url(project, page):
+    if not page.next_cursor:
+        return None
+    return f"{reverse('project-lessons', args=[project.pk])}?{urlencode({'cursor': page.next_cursor})}"
+
+@query_budget(10)
 @login_required
 def project_detail(request, pk):
     project = get_object_or_404(Project, pk=pk)
     
     # Check if user has access to this project
-    if request.user not in project.team_members.all():
+    access = get_project_access(request)
+    if not access.is_member(project):
         messages.error(request, "You don't have access to this project.")
         return redirect('project-list')
     
     # Get project role
-    try:
-        user_role = ProjectRole.objects.get(user=request.user, project=project).role
-    except ProjectRole.DoesNotExist:
-        user_role = None
+    user_role = access.role(project)
+    
+    # Lessons and the team are versioned by the two generation counters
+    etag = page_etag(request, 'project', project.pk, user_role, project_generation(), lesson_generation())
+    response = page_not_modified(request, etag)
+    if response:
+        return response
     
-    # Get project statistics
+    # Get project statistics from the per-project rollup
+    stats = summarize_projects([project])
     lesson_stats = {
-        'total': project.lessons.count(),
-        'implemented': project.lessons.filter(status='IMPLEMENTED').count(),
-        'high_impact': project.lessons.filter(impact='HIGH').count(),
+        'total': stats['total'],
+        'implemented': stats['by_status']['IMPLEMENTED'],
+        'high_impact': stats['by_impact']['HIGH'],
     }
     
-    # Get category distribution for chart
-    category_counts = project.lessons.values('category__name').annotate(count=Count('category')).order_by('-count')
-    categories_data = {}
-    for item in category_counts:
-        category_name = item['category__name'] or 'Uncategorized'
-        categories_data[category_name] = item['count']
-    
-    # Get status distribution for chart
-    status_counts = project.lessons.values('status').annotate(count=Count('status')).order_by('status')
-    status_data = {}
-    for item in status_counts:
-        status_code = item['status']
-        from lessons.models import Lesson
-        status_display = dict(Lesson.STATUS_CHOICES).get(status_code, status_code)
-        status_data[status_display] = item['count']
+    # Category and status distributions for charts
+    categories_data = stats['by_category']
+    status_data = status_breakdown(stats)
     
     # Convert to JSON for JS charts
-    import json
     category_labels = list(categories_data.keys())
     category_values = list(categories_data.values())
     status_labels = list(status_data.keys())
     status_values = list(status_data.values())
     
+    # Only the first page of lessons is rendered; the rest load on demand
+    lessons_page = project_lessons_page(project)
+    
     context = {
         'project': project,
         'user_role': user_role,
+        'lessons_page': lessons_page,
+        'more_lessons_url': project_lessons_url(project, lessons_page),
         'lesson_stats': lesson_stats,
         'team_members': ProjectRole.objects.filter(project=project).select_related('user'),
         'category_labels_json': json.dumps(category_labels),
@@ -71,7 +132,21 @@ def project_detail(request, pk):
         'has_status_data': len(status_labels) > 0,
     }
     
-    return render(request, 'projects/project_detail.html', context)
+    return set_validators(render(request, 'projects/project_detail.html', context), etag)
+
+@login_required
+def project_lessons(request, pk):
+    """Next page of a project's lesson table as JSON, for the "load more" button."""
+    project = get_object_or_404(Project, pk=pk)
+    if not get_project_access(request).is_member(project):
+        return JsonResponse({'error': "You don't have access to this project."}, status=403)
+    
+    page = project_lessons_page(project, request.GET.get('cursor'))
+    return JsonResponse({
+        'html': render_to_string('projects/project_lesson_rows.html', {'lessons': page}, request=request),
+        'count': len(page),
+        'next_url': project_lessons_url(project, page),
+    })
 
 @login_required
 def project_create(request):
@@ -104,12 +179,7 @@ def project_update(request, pk):
     project = get_object_or_404(Project, pk=pk)
     
     # Check if user has permission to edit project
-    try:
-        user_role = ProjectRole.objects.get(user=request.user, project=project).role
-        if user_role not in ['OWNER', 'MANAGER']:
-            messages.error(request, "You don't have permission to edit this project.")
-            return redirect('project-detail', pk=project.pk)
-    except ProjectRole.DoesNotExist:
+    if not get_project_access(request).can_manage(project):
         messages.error(request, "You don't have permission to edit this project.")
         return redirect('project-detail', pk=project.pk)
     
@@ -132,12 +202,7 @@ def add_team_member(request, pk):
     project = get_object_or_404(Project, pk=pk)
     
     # Check if user has permission to add members
-    try:
-        user_role = ProjectRole.objects.get(user=request.user, project=project).role
-        if user_role not in ['OWNER', 'MANAGER']:
-            messages.error(request, "You don't have permission to add team members.")
-            return redirect('project-detail', pk=project.pk)
-    except ProjectRole.DoesNotExist:
+    if not get_project_access(request).can_manage(project):
         messages.error(request, "You don't have permission to add team members.")
         return redirect('project-detail', pk=project.pk)
     
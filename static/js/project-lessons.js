@@ -0,0 +1,36 @@
+/**
+ * Project Lessons "Load more"
+ * Appends the next page of the project detail lesson table, fetched as JSON
+ * from the project-lessons endpoint, until there are no more lessons.
+ */
+
+document.addEventListener('DOMContentLoaded', function() {
+    var button = document.getElementById('loadMoreLessons');
+    var rows = document.getElementById('projectLessonRows');
+    if (!button || !rows) {
+        return;
+    }
+
+    button.addEventListener('click', function() {
+        button.disabled = true;
+        fetch(button.dataset.url, {headers: {'Accept': 'application/json'}})
+            .then(function(response) {
+                if (!response.ok) {
+                    throw new Error('Could not load more lessons');
+                }
+                return response.json();
+            })
+            .then(function(data) {
+                rows.insertAdjacentHTML('beforeend', data.html);
+                if (data.next_url) {
+                    button.dataset.url = data.next_url;
+                    button.disabled = false;
+                } else {
+                    button.remove();
+                }
+            })
+            .catch(function() {
+                button.disabled = false;
+            });
+    });
+});